@@ -0,0 +1,248 @@
+# bot/callback_benchmark.py
+"""
+Стоимость маршрутизации callback-запросов со всеми роутерами бота.
+
+    python -m bot.callback_benchmark
+    python -m bot.callback_benchmark --rounds 200
+
+"До" - регистрации F.data / StateFilter, какими они были до перехода на
+таблицу (список BASELINE_CALLBACK_FILTERS, фильтры проверяются aiogram по
+очереди), "после" - таблица CallbackRoutes из текущих обработчиков. Хендлеры
+заменены заглушками, поэтому замер feed_update включает middleware
+диспетчера и поиск хендлера. Отдельно замеряется сам поиск:
+CallbackRoutes.resolve против перебора тех же фильтров по очереди. Заодно
+проверяется, что таблица выбирает тот же хендлер, что и прежние фильтры.
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.filters import StateFilter
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+BENCHMARK_USER_ID = 100500
+
+# Callback-регистрации до перехода на таблицу, в порядке роутеров:
+# (хендлер, F.data == ..., F.data.startswith(...), StateFilter(...)).
+# CalendarCallback.filter() и F.data.startswith("back_to_quick") остались
+# обычными хендлерами aiogram и сюда не входят.
+BASELINE_CALLBACK_FILTERS = [
+    ('StartHandlers.new_product_callback', 'new_product', None, None),
+    ('StartHandlers.my_products_callback', 'my_products', None, None),
+    ('StartHandlers.help_callback', 'help', None, None),
+    ('StartHandlers.back_to_main_callback', 'back_to_main', None, None),
+    ('StartHandlers.show_delete_product_menu', 'delete_product', None, None),
+    ('StartHandlers.select_product_to_delete', None, 'delete_select_', None),
+    ('StartHandlers.confirm_delete_product', None, 'confirm_delete_', None),
+    ('StartHandlers.cancel_delete_product', 'cancel_delete', None, None),
+    ('StartHandlers.back_to_products_list', 'back_to_products_list', None, None),
+    ('ProductHandlers.process_main_category', None, 'cat_', None),
+    ('ProductHandlers.process_subcategory', None, 'sub_', 'ProductStates:waiting_for_subcategory'),
+    ('ProductHandlers.process_subsubcategory', None, 'sub_', 'ProductStates:waiting_for_subsubcategory'),
+    ('ProductHandlers.back_to_categories', 'back_categories', None, None),
+    ('ProductHandlers.back_to_subcategories', None, 'back_sub_', None),
+    ('ProductHandlers.process_price_fixed', 'price_fixed', None, None),
+    ('ProductHandlers.process_price_range', 'price_range', None, None),
+    ('ProductHandlers.process_price_skip', 'price_skip', None, None),
+    ('ProductHandlers.process_contact_method', None, 'contact_', None),
+    ('ProductHandlers.process_clothing_size', None, 'clothing_size_', 'ProductStates:waiting_for_clothing_size'),
+    ('ProductHandlers.process_clothing_color', None, 'clothing_color_', 'ProductStates:waiting_for_clothing_color'),
+    ('ProductHandlers.process_clothing_material', None, 'clothing_material_', 'ProductStates:waiting_for_clothing_material'),
+    ('ImageHandlers.process_shuffle_choice', None, 'shuffle_', None),
+    ('LocationHandlers.process_metro_city', None, 'metro_city_', 'ProductStates:waiting_for_metro_city'),
+    ('LocationHandlers.back_to_placement_type', 'back_to_placement_type', None, 'ProductStates:waiting_for_metro_city'),
+    ('LocationHandlers.back_to_metro_city', 'back_to_metro_city', None, 'ProductStates:waiting_for_metro_quantity'),
+    ('LocationHandlers.confirm_city', 'city_confirm', None, 'ProductStates:waiting_for_city_confirmation'),
+    ('LocationHandlers.reject_city', 'city_reject', None, 'ProductStates:waiting_for_city_confirmation'),
+    ('LocationHandlers.restart_city_input', 'cities_restart', None, 'ProductStates:waiting_for_city_input'),
+    ('LocationHandlers.skip_city_input', 'cities_skip', None, 'ProductStates:waiting_for_city_input'),
+    ('DeliveryHandlers.process_delivery_choice', None, 'delivery_', None),
+    ('DeliveryHandlers.process_delivery_service', None, 'service_', None),
+    ('DeliveryHandlers.process_delivery_discount', None, 'discount_', None),
+    ('DeliveryHandlers.process_multioffer', None, 'multioffer_', None),
+    ('CommonHandlers.process_brand', None, 'brand_', None),
+    ('CommonHandlers.process_brand_retry', 'br_retry', None, 'ProductStates:waiting_for_brand'),
+    ('CommonHandlers.process_exact_brand', None, 'exact_brand_', 'ProductStates:waiting_for_brand'),
+    ('CommonHandlers.process_size', None, 'size_', None),
+    ('CommonHandlers.process_condition', None, 'condition_', None),
+    ('CommonHandlers.process_sale_type', None, 'saletype_', None),
+    ('CommonHandlers.process_placement_method', None, 'method_', 'ProductStates:waiting_for_placement_type'),
+    ('CommonHandlers.process_placement_type', None, 'placement_', 'ProductStates:waiting_for_placement_type'),
+    ('CommonHandlers.process_time_selection', None, 'time_', 'ProductStates:waiting_for_start_time'),
+    ('CommonHandlers.process_bag_type', None, 'bag_type_', None),
+    ('CommonHandlers.process_bag_gender', None, 'bag_gender_', None),
+    ('CommonHandlers.process_bag_color', None, 'bag_color_', 'ProductStates:waiting_for_bag_color'),
+    ('CommonHandlers.process_bag_material', None, 'bag_material_', 'ProductStates:waiting_for_bag_material'),
+    ('CommonHandlers.process_shoe_color', None, 'shoe_color_', 'ProductStates:waiting_for_shoe_color'),
+    ('CommonHandlers.process_shoe_material', None, 'shoe_material_', 'ProductStates:waiting_for_shoe_material'),
+    ('CommonHandlers.process_accessory_color', None, 'accessory_color_', 'ProductStates:waiting_for_accessory_color'),
+    ('CommonHandlers.process_accessory_gender', None, 'accessory_gender_', 'ProductStates:waiting_for_accessory_gender'),
+    ('CommonHandlers.process_clothing_size', None, 'clothing_size_', 'ProductStates:waiting_for_clothing_size'),
+    ('CommonHandlers.process_clothing_color', None, 'clothing_color_', 'ProductStates:waiting_for_clothing_color'),
+    ('CommonHandlers.process_clothing_material', None, 'clothing_material_', 'ProductStates:waiting_for_clothing_material'),
+]
+
+
+def _make_recorder(handled: List[str], name: str):
+    async def handler(callback: CallbackQuery):
+        handled.append(name)
+    return handler
+
+
+def _get_route_name(route) -> str:
+    return route.handler.callback.__qualname__
+
+
+def _build_table():
+    from bot.database import db
+    from bot.handlers import create_handlers
+    from bot.handlers.callback_routes import CallbackRoutes
+
+    handlers = create_handlers(db)
+    return handlers, CallbackRoutes.merge(handler.callbacks for handler in handlers)
+
+
+def _build_dispatcher(handled: List[str], use_table: bool) -> Dispatcher:
+    from bot.handlers.callback_routes import CallbackRoutes
+
+    handlers, merged = _build_table()
+    dp = Dispatcher(storage=MemoryStorage())
+
+    if use_table:
+        table = CallbackRoutes()
+        for route in merged.routes:
+            table.register(_make_recorder(handled, _get_route_name(route)),
+                           equals=route.equals, prefix=route.prefix, state=route.state)
+        dp.include_router(table.create_router())
+        for handler in handlers:
+            dp.include_router(handler.router)
+        return dp
+
+    # Прежняя схема: фильтры каждого обработчика - в его роутере
+    for handler in handlers:
+        router = Router()
+        class_name = type(handler).__name__
+        for name, equals, prefix, state in BASELINE_CALLBACK_FILTERS:
+            if name.split('.')[0] != class_name:
+                continue
+            filters = [F.data == equals if equals is not None else F.data.startswith(prefix)]
+            if state is not None:
+                filters.append(StateFilter(state))
+            router.callback_query.register(_make_recorder(handled, name), *filters)
+        router.include_router(handler.router)
+        dp.include_router(router)
+    return dp
+
+
+def _build_samples() -> List[Tuple[str, Optional[str]]]:
+    """(callback_data, состояние) для каждой прежней регистрации, те же данные без состояния и пара промахов"""
+    samples = []
+    for _, equals, prefix, state in BASELINE_CALLBACK_FILTERS:
+        data = equals if equals is not None else f"{prefix}1"
+        samples.append((data, state))
+        if state is not None:
+            samples.append((data, None))
+    samples += [("unknown_action", None), ("br_retry", "ProductStates:waiting_for_title")]
+    return list(dict.fromkeys(samples))
+
+
+def _resolve_sequentially(data: str, raw_state: Optional[str]) -> Optional[str]:
+    """Поиск как у aiogram: фильтры по очереди до первого совпадения"""
+    for name, equals, prefix, state in BASELINE_CALLBACK_FILTERS:
+        if (data == equals if equals is not None else data.startswith(prefix)) and state in (None, raw_state):
+            return name
+    return None
+
+
+def measure_lookup(samples, rounds: int) -> Tuple[float, float]:
+    """Микросекунд на поиск: CallbackRoutes.resolve и перебор фильтров"""
+    _, merged = _build_table()
+
+    started_at = time.perf_counter()
+    for _ in range(rounds):
+        for data, state in samples:
+            merged.resolve(data, state)
+    table = (time.perf_counter() - started_at) / (rounds * len(samples)) * 1e6
+
+    started_at = time.perf_counter()
+    for _ in range(rounds):
+        for data, state in samples:
+            _resolve_sequentially(data, state)
+    sequential = (time.perf_counter() - started_at) / (rounds * len(samples)) * 1e6
+
+    return table, sequential
+
+
+def _make_update(update_id: int, data: str) -> Update:
+    user = User(id=BENCHMARK_USER_ID, is_bot=False, first_name="Bench")
+    chat = Chat(id=BENCHMARK_USER_ID, type="private")
+    message = Message(message_id=1, date=datetime.now(), chat=chat, text="menu")
+    return Update(update_id=update_id, callback_query=CallbackQuery(
+        id=str(update_id), from_user=user, chat_instance="bench", message=message, data=data
+    ))
+
+
+async def measure(samples, rounds: int, use_table: bool) -> Tuple[float, List[Optional[str]]]:
+    """Микросекунд на feed_update и сработавшие хендлеры (для сверки)"""
+    handled: List[str] = []
+    dp = _build_dispatcher(handled, use_table)
+    bot = Bot(token="123456:benchmark")
+    context = dp.fsm.get_context(bot, chat_id=BENCHMARK_USER_ID, user_id=BENCHMARK_USER_ID)
+    updates = [(_make_update(number, data), state) for number, (data, state) in enumerate(samples)]
+
+    # Прогрев и сверка маршрутов
+    routes = []
+    for update, state in updates:
+        await context.set_state(state)
+        handled.clear()
+        await dp.feed_update(bot, update)
+        routes.append(handled[0] if handled else None)
+
+    elapsed = 0.0
+    for _ in range(rounds):
+        for update, state in updates:
+            await context.set_state(state)
+            started_at = time.perf_counter()
+            await dp.feed_update(bot, update)
+            elapsed += time.perf_counter() - started_at
+
+    await bot.session.close()
+    return elapsed / (rounds * len(updates)) * 1e6, routes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Стоимость маршрутизации callback-запросов")
+    parser.add_argument('--rounds', type=int, default=100, help="сколько раз прогнать все маршруты")
+    args = parser.parse_args()
+
+    os.environ.setdefault('REFERENCE_DATA_WATCH_INTERVAL', '0')
+    samples = _build_samples()
+
+    before, before_routes = asyncio.run(measure(samples, args.rounds, use_table=False))
+    after, after_routes = asyncio.run(measure(samples, args.rounds, use_table=True))
+    table_lookup, sequential_lookup = measure_lookup(samples, args.rounds * 10)
+
+    print(f"🔀 Прежних регистраций: {len(BASELINE_CALLBACK_FILTERS)}, "
+          f"callback-запросов в замере: {len(samples) * args.rounds}")
+    print("Полный feed_update (middleware диспетчера + поиск хендлера):")
+    print(f"⏱️ Фильтры aiogram по очереди: {before:.1f} мкс/callback")
+    print(f"⏱️ Таблица (состояние, префикс): {after:.1f} мкс/callback (x{before / after:.2f})")
+    print("Только поиск хендлера:")
+    print(f"⏱️ Перебор фильтров по очереди: {sequential_lookup:.2f} мкс")
+    print(f"⏱️ CallbackRoutes.resolve: {table_lookup:.2f} мкс (x{sequential_lookup / table_lookup:.2f})")
+
+    if before_routes == after_routes:
+        print("✅ Таблица выбирает те же хендлеры, что и прежние фильтры")
+    else:
+        mismatches = [f"{samples[i]}: {a} -> {b}"
+                      for i, (a, b) in enumerate(zip(before_routes, after_routes)) if a != b]
+        print(f"❌ Хендлеры различаются: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
+import asyncio
 import json
 import aiofiles
 import os
 import uuid
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+import config
+from bot.services.user_state_cache import user_state_cache
 
 logger = logging.getLogger(__name__)
 
@@ -87,8 +91,21 @@ class Database:
     def __init__(self):
         self.user_states: Dict[int, UserState] = {}
         self.products: List[Product] = []
-        self.data_file = 'bot_data.json'
+        self.data_file = config.DATA_FILE
         self._loaded = False
+        # (номер шарда, число шардов): процесс-обработчик хранит только своих пользователей
+        self.shard: Optional[Tuple[int, int]] = None
+        self._save_lock = asyncio.Lock()
+
+    def use_shard(self, shard_index: int, shard_count: int):
+        """Работать только с пользователями своего шарда (см. bot/sharding.py)"""
+        self.shard = (shard_index, shard_count)
+
+    def _owns_user(self, user_id) -> bool:
+        if self.shard is None:
+            return True
+        from bot.sharding import shard_for_user
+        return shard_for_user(int(user_id), self.shard[1]) == self.shard[0]
 
     # В вашем классе базы данных добавьте следующие методы:
 
@@ -222,8 +239,11 @@ class Database:
                     if data:
                         json_data = json.loads(data)
                         # Загрузка состояний пользователей
+                        user_state_cache.clear()
                         for user_id_str, state_data in json_data.get('user_states', {}).items():
                             user_id = int(user_id_str)
+                            if not self._owns_user(user_id):
+                                continue
                             self.user_states[user_id] = UserState(
                                 user_id=user_id,
                                 state=state_data.get('state', ''),
@@ -231,6 +251,9 @@ class Database:
                             )
                         # Загрузка товаров
                         for product_data in json_data.get('products', []):
+                            if not self._owns_user(product_data['user_id']):
+                                continue
+
                             # Генерируем новый GUID для старых записей без GUID
                             if 'product_id' not in product_data:
                                 product_data['product_id'] = str(uuid.uuid4())
@@ -349,12 +372,36 @@ class Database:
                     for product in self.products
                 ]
             }
-            async with aiofiles.open(self.data_file, 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(data, ensure_ascii=False, indent=2))
+            if self.shard is not None:
+                async with self._save_lock:
+                    await asyncio.to_thread(self._save_shard_data, data)
+            else:
+                async with aiofiles.open(self.data_file, 'w', encoding='utf-8') as f:
+                    await f.write(json.dumps(data, ensure_ascii=False, indent=2))
             logger.info("Data saved successfully")
         except Exception as e:
             logger.error(f"Error saving data: {e}")
 
+    def _save_shard_data(self, data: dict):
+        """Заменяет в общем файле записи пользователей своего шарда, не трогая остальные"""
+        from bot.services.shared_file import update_json_file
+
+        def merge(current: Optional[dict]) -> dict:
+            current = current or {}
+            user_states = {
+                user_id: state for user_id, state in current.get('user_states', {}).items()
+                if not self._owns_user(user_id)
+            }
+            user_states.update(data['user_states'])
+            products = [
+                product for product in current.get('products', [])
+                if not self._owns_user(product['user_id'])
+            ]
+            products.extend(data['products'])
+            return {'user_states': user_states, 'products': products}
+
+        update_json_file(self.data_file, merge, default={}, indent=2)
+
     # Методы для работы с состояниями пользователей
     async def set_user_state(self, user_id: int, state: str, data: dict = None):
         if user_id not in self.user_states:
@@ -364,12 +411,18 @@ class Database:
             if data is not None:
                 self.user_states[user_id].data = data
             self.user_states[user_id].updated_at = datetime.now()
+        user_state_cache.put(user_id, self.user_states[user_id])
         await self.save_data()
 
     async def get_user_state(self, user_id: int) -> Optional[UserState]:
+        # Чтение через кэш: set_user_state и clear_user_state обновляют его сами
+        return await user_state_cache.get_or_load(user_id, self._load_user_state)
+
+    async def _load_user_state(self, user_id: int) -> Optional[UserState]:
         return self.user_states.get(user_id)
 
     async def clear_user_state(self, user_id: int):
+        user_state_cache.put(user_id, None)
         if user_id in self.user_states:
             del self.user_states[user_id]
             await self.save_data()
@@ -4,22 +4,26 @@ from .image_handlers import ImageHandlers
 from .location_handlers import LocationHandlers
 from .delivery_handlers import DeliveryHandlers
 from .common_handlers import CommonHandlers
+from .callback_routes import CallbackRoutes
+
+
+def create_handlers(db, bot=None):
+    """Экземпляры всех обработчиков в порядке их роутеров"""
+    return [
+        StartHandlers(db),
+        ProductHandlers(db),
+        ImageHandlers(),
+        LocationHandlers(db),
+        DeliveryHandlers(db),
+        CommonHandlers(db, bot)  # ✅ Передаем bot
+    ]
 
 
 def initialize_handlers(db, bot=None):
     """Инициализировать все обработчики"""
-    start_handlers = StartHandlers(db)
-    product_handlers = ProductHandlers(db)
-    image_handlers = ImageHandlers()
-    location_handlers = LocationHandlers(db)
-    delivery_handlers = DeliveryHandlers(db)
-    common_handlers = CommonHandlers(db, bot)  # ✅ Передаем bot
+    handlers = create_handlers(db, bot)
 
-    return [
-        start_handlers.router,
-        product_handlers.router,
-        image_handlers.router,
-        location_handlers.router,
-        delivery_handlers.router,
-        common_handlers.router
-    ]
\ No newline at end of file
+    # Все callback-маршруты - одной таблицей перед остальными роутерами
+    callback_routes = CallbackRoutes.merge(handler.callbacks for handler in handlers)
+
+    return [callback_routes.create_router()] + [handler.router for handler in handlers]
@@ -5,6 +5,7 @@ from aiogram import Router, Bot
 from aiogram.fsm.context import FSMContext
 
 from bot.database import Database
+from bot.handlers.callback_routes import CallbackRoutes
 
 
 class BaseHandler(ABC):
@@ -14,6 +15,8 @@ class BaseHandler(ABC):
         self.router = router
         self.db = db
         self.bot = bot
+        # callback-хендлеры регистрируются в таблице маршрутов, а не в router.callback_query
+        self.callbacks = CallbackRoutes()
         self._register_handlers()
 
 
@@ -0,0 +1,117 @@
+# bot/handlers/callback_routes.py
+"""
+Таблица маршрутов callback-запросов.
+
+callback_data бота имеет вид "<префикс>_<значение>" (size_42, bag_color_red)
+или является точной командой (back_to_main). Вместо того чтобы aiogram
+проверял F.data.startswith(...) и StateFilter каждого хендлера по очереди,
+маршруты хранятся в словарях по ключу (состояние, префикс) и находятся
+несколькими поисками - по одному на каждый "_" в callback_data, независимо
+от числа хендлеров. Из совпавших выбирается зарегистрированный раньше, как
+и при обычном порядке роутеров aiogram.
+"""
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from aiogram import Router
+from aiogram.dispatcher.event.handler import CallableObject
+from aiogram.filters import Filter
+from aiogram.fsm.state import State
+from aiogram.types import CallbackQuery
+
+# Разделитель префикса и значения в callback_data
+SEPARATOR = '_'
+
+
+class CallbackRoute(NamedTuple):
+    index: int
+    handler: CallableObject
+    equals: Optional[str]
+    prefix: Optional[str]
+    # Строка состояния FSM или None - в любом состоянии
+    state: Optional[str]
+
+
+class CallbackRoutes:
+    """Маршруты callback по (состоянию, точному значению или префиксу)"""
+
+    def __init__(self):
+        self.routes: List[CallbackRoute] = []
+        self._exact: Dict[Tuple[Optional[str], str], CallbackRoute] = {}
+        self._prefix: Dict[Tuple[Optional[str], str], CallbackRoute] = {}
+
+    def register(self, handler: Callable, equals: str = None, prefix: str = None,
+                 state: Union[State, str, None] = None):
+        """Аналог callback_query.register(handler, F.data == equals | F.data.startswith(prefix), StateFilter(state))"""
+        if (equals is None) == (prefix is None):
+            raise ValueError("Нужно указать либо equals, либо prefix")
+        if prefix is not None and not prefix.endswith(SEPARATOR):
+            raise ValueError(f"Префикс callback должен заканчиваться на '{SEPARATOR}': {prefix}")
+
+        if isinstance(state, State):
+            state = state.state
+
+        route = CallbackRoute(len(self.routes), CallableObject(handler), equals, prefix, state)
+        self.routes.append(route)
+
+        # Повторная регистрация того же ключа недостижима - как и в aiogram, срабатывает первая
+        if equals is not None:
+            self._exact.setdefault((state, equals), route)
+        else:
+            self._prefix.setdefault((state, prefix), route)
+
+    @classmethod
+    def merge(cls, route_sets: Iterable['CallbackRoutes']) -> 'CallbackRoutes':
+        """Общая таблица; порядок наборов - порядок роутеров"""
+        merged = cls()
+        for route_set in route_sets:
+            for route in route_set.routes:
+                merged.register(route.handler.callback, equals=route.equals, prefix=route.prefix, state=route.state)
+        return merged
+
+    def resolve(self, data: Optional[str], raw_state: Optional[str]) -> Optional[CallbackRoute]:
+        """Маршрут для callback_data в текущем состоянии пользователя"""
+        if data is None:
+            return None
+
+        best = None
+        for route in self._candidates(data, raw_state):
+            if route is not None and (best is None or route.index < best.index):
+                best = route
+        return best
+
+    def _candidates(self, data: str, raw_state: Optional[str]):
+        yield self._exact.get((raw_state, data))
+        yield self._exact.get((None, data))
+
+        end = data.find(SEPARATOR)
+        while end != -1:
+            prefix = data[:end + 1]
+            yield self._prefix.get((raw_state, prefix))
+            yield self._prefix.get((None, prefix))
+            end = data.find(SEPARATOR, end + 1)
+
+    def create_router(self) -> Router:
+        """Роутер с одним хендлером, который вызывает найденный маршрут"""
+        router = Router(name="callback_routes")
+        router.callback_query.register(self._dispatch, CallbackRouteFilter(self))
+        return router
+
+    @staticmethod
+    async def _dispatch(callback: CallbackQuery, callback_route: CallbackRoute, **kwargs):
+        return await callback_route.handler.call(callback, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+
+class CallbackRouteFilter(Filter):
+    """Пропускает callback, для которого в таблице есть маршрут, и передает его хендлеру"""
+
+    def __init__(self, routes: CallbackRoutes):
+        self.routes = routes
+
+    async def __call__(self, callback: CallbackQuery, raw_state: Optional[str] = None) -> Union[bool, dict]:
+        route = self.routes.resolve(callback.data, raw_state)
+        if route is None:
+            return False
+        return {'callback_route': route}
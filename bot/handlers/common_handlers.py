@@ -6,6 +6,7 @@ from random import random
 from typing import Optional
 from xml.dom import minidom
 
+import config
 from bot.database import Database
 from bot.services import XMLGeneratorFactory
 
@@ -18,7 +19,12 @@ import re
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from bot.calendar import CalendarCallback, ProductCalendar
+from bot.keyboards.builders import BAG_MATERIALS, BAG_TYPES, GENDERS, ProductKeyboards
+from bot.services import export_trace
+from bot.services.archive_file import SpooledInputFile
 from bot.services.image_service import ImageService
+from bot.services.metrics import metrics
+from bot.services.category_service import CategoryService
 from bot.services.product_service import ProductService
 from bot.states import ProductStates
 from bot.handlers.base import BaseHandler, StateManager
@@ -37,9 +43,37 @@ class CommonHandlers(BaseHandler):
         if bot:
             from bot.services.image_service import ImageService
             self.image_service = ImageService(bot)
+            self.router.shutdown.register(self.image_service.close)
         else:
             self.image_service = None
 
+    async def _send_hosted_xml(self, message: Message, progress_msg: Message, generator, full_products: list):
+        """Отправка XML со ссылками на изображения во внешнем хостинге"""
+        xml_content = await generator.generate_hosted_xml(full_products)
+
+        await progress_msg.edit_text("✅ XML готов! Отправляю...")
+
+        filename = f"avito_{message.from_user.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xml"
+        xml_bytes = xml_content.encode('utf-8')
+        with export_trace.span('upload', bytes=len(xml_bytes)):
+            await message.answer_document(
+                document=BufferedInputFile(xml_bytes, filename=filename),
+                caption=f"✅ {message.from_user.first_name}, XML для Avito готов!\n\n"
+                        f"• 📄 {len(full_products)} объявлений\n"
+                        f"• 🖼️ Изображения загружены на сервер и указаны ссылками\n\n"
+                        f"💡 Загрузите файл в личном кабинете Avito"
+                        f"{self._format_export_report(generator.last_export_report, with_readme=False)}"
+            )
+
+        await progress_msg.delete()
+
+    def _format_export_report(self, report, with_readme: bool = True) -> str:
+        """Краткий итог скачивания изображений для подписи к архиву"""
+        if report is None or not report.has_problems:
+            return ""
+        details = ". Подробности в README.txt" if with_readme else ""
+        return f"\n\n⚠️ Изображения - {report.summary()}{details}"
+
     def _register_handlers(self):
         # Обработка телефона
         self.router.message.register(
@@ -58,29 +92,29 @@ class CommonHandlers(BaseHandler):
         )
 
         # Обработка брендов
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_brand,
-            F.data.startswith("brand_")
+            prefix="brand_"
         )
         self.router.message.register(
             self.process_brand_input,
             StateFilter(ProductStates.waiting_for_brand)
         )
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_brand_retry,
-            F.data == "br_retry",
-            StateFilter(ProductStates.waiting_for_brand)
+            equals="br_retry",
+            state=ProductStates.waiting_for_brand
         )
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_exact_brand,
-            F.data.startswith("exact_brand_"),
-            StateFilter(ProductStates.waiting_for_brand)
+            prefix="exact_brand_",
+            state=ProductStates.waiting_for_brand
         )
 
         # Обработка размера
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_size,
-            F.data.startswith("size_")
+            prefix="size_"
         )
         self.router.message.register(
             self.process_custom_size,
@@ -88,36 +122,36 @@ class CommonHandlers(BaseHandler):
         )
 
         # Обработка состояния товара
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_condition,
-            F.data.startswith("condition_")
+            prefix="condition_"
         )
 
         # Обработка типа продажи
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_sale_type,
-            F.data.startswith("saletype_")
+            prefix="saletype_"
         )
 
         # Обработка метода размещения (только для мультиобъявлений)
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_placement_method,
-            F.data.startswith("method_"),
-            StateFilter(ProductStates.waiting_for_placement_type)  # Только в этом состоянии
+            prefix="method_",
+            state=ProductStates.waiting_for_placement_type  # Только в этом состоянии
         )
 
         # Обработка типа размещения (города/метро) - только для мультиобъявлений
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_placement_type,
-            F.data.startswith("placement_"),
-            StateFilter(ProductStates.waiting_for_placement_type)  # Только в этом состоянии
+            prefix="placement_",
+            state=ProductStates.waiting_for_placement_type  # Только в этом состоянии
         )
 
         # Обработка времени
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_time_selection,
-            F.data.startswith("time_"),
-            StateFilter(ProductStates.waiting_for_start_time)
+            prefix="time_",
+            state=ProductStates.waiting_for_start_time
         )
         self.router.message.register(
             self.process_time_input_message,
@@ -140,41 +174,45 @@ class CommonHandlers(BaseHandler):
             self.generate_xml_command,
             Command("generate_xml")
         )
-        self.router.callback_query.register(
+        self.router.message.register(
+            self.reload_data_command,
+            Command("reload_data")
+        )
+        self.callbacks.register(
             self.process_bag_type,
-            F.data.startswith("bag_type_")
+            prefix="bag_type_"
         )
 
         # Обработка назначения сумки (для кого)
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_bag_gender,
-            F.data.startswith("bag_gender_")
+            prefix="bag_gender_"
         )
 
         # Обработка цвета сумки
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_bag_color,
-            F.data.startswith("bag_color_"),
-            StateFilter(ProductStates.waiting_for_bag_color)
+            prefix="bag_color_",
+            state=ProductStates.waiting_for_bag_color
         )
 
         # Обработка материала сумки
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_bag_material,
-            F.data.startswith("bag_material_"),
-            StateFilter(ProductStates.waiting_for_bag_material)
+            prefix="bag_material_",
+            state=ProductStates.waiting_for_bag_material
         )
 
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_shoe_color,
-            F.data.startswith("shoe_color_"),
-            StateFilter(ProductStates.waiting_for_shoe_color)  # ✅ Важно: фильтр состояния
+            prefix="shoe_color_",
+            state=ProductStates.waiting_for_shoe_color  # ✅ Важно: фильтр состояния
         )
         # Обработка материала для мужской обуви
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_shoe_material,
-            F.data.startswith("shoe_material_"),
-            StateFilter(ProductStates.waiting_for_shoe_material)
+            prefix="shoe_material_",
+            state=ProductStates.waiting_for_shoe_material
         )
 
         self.router.message.register(
@@ -182,35 +220,35 @@ class CommonHandlers(BaseHandler):
             StateFilter(ProductStates.waiting_for_shoe_manufacturer_color)
         )
 
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_accessory_color,
-            F.data.startswith("accessory_color_"),
-            StateFilter(ProductStates.waiting_for_accessory_color)
+            prefix="accessory_color_",
+            state=ProductStates.waiting_for_accessory_color
         )
 
         # Обработка "Для кого" для аксессуаров
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_accessory_gender,
-            F.data.startswith("accessory_gender_"),
-            StateFilter(ProductStates.waiting_for_accessory_gender)
+            prefix="accessory_gender_",
+            state=ProductStates.waiting_for_accessory_gender
         )
 
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_clothing_size,
-            F.data.startswith("clothing_size_"),
-            StateFilter(ProductStates.waiting_for_clothing_size)
+            prefix="clothing_size_",
+            state=ProductStates.waiting_for_clothing_size
         )
 
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_clothing_color,
-            F.data.startswith("clothing_color_"),
-            StateFilter(ProductStates.waiting_for_clothing_color)
+            prefix="clothing_color_",
+            state=ProductStates.waiting_for_clothing_color
         )
 
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_clothing_material,
-            F.data.startswith("clothing_material_"),
-            StateFilter(ProductStates.waiting_for_clothing_material)
+            prefix="clothing_material_",
+            state=ProductStates.waiting_for_clothing_material
         )
 
         self.router.message.register(
@@ -281,7 +319,7 @@ class CommonHandlers(BaseHandler):
         # Определяем, нужно ли запрашивать материал
         data = await StateManager.get_data_safe(state)
         category_name = data.get('category_name', '')
-        needs_full_properties = self._needs_full_clothing_properties(category_name)
+        needs_full_properties = CategoryService.get_category_kind(category_name).needs_full_clothing_properties
 
         if needs_full_properties:
             # Запрашиваем материал
@@ -293,7 +331,7 @@ class CommonHandlers(BaseHandler):
             await state.set_state(ProductStates.waiting_for_clothing_color)
 
             # Для исключенных категорий цвет можно пропустить
-            can_skip_color = not self._needs_full_clothing_properties(category_name)
+            can_skip_color = not needs_full_properties
             await self._ask_clothing_color(callback.message, user_name, can_skip=can_skip_color)
 
     async def process_clothing_material(self, callback: CallbackQuery, state: FSMContext):
@@ -317,7 +355,7 @@ class CommonHandlers(BaseHandler):
         category_name = data.get('category_name', '')
 
         # Для полных свойств цвет обязателен, для исключенных - можно пропустить
-        can_skip_color = not self._needs_full_clothing_properties(category_name)
+        can_skip_color = not CategoryService.get_category_kind(category_name).needs_full_clothing_properties
         await self._ask_clothing_color(callback.message, user_name, can_skip=can_skip_color)
 
     async def process_clothing_color(self, callback: CallbackQuery, state: FSMContext):
@@ -365,64 +403,16 @@ class CommonHandlers(BaseHandler):
 
     async def _ask_accessory_color(self, message: Message, user_name: str):
         """Запрос цвета для аксессуаров"""
-        from aiogram.utils.keyboard import InlineKeyboardBuilder
-
-        builder = InlineKeyboardBuilder()
-
-        colors = [
-            ("🔴 Красный", "red"),
-            ("⚪ Белый", "white"),
-            ("🎀 Розовый", "pink"),
-            ("🍷 Бордовый", "burgundy"),
-            ("🔵 Синий", "blue"),
-            ("🟡 Жёлтый", "yellow"),
-            ("💙 Голубой", "light_blue"),
-            ("🟣 Фиолетовый", "purple"),
-            ("🟠 Оранжевый", "orange"),
-            ("🌈 Разноцветный", "multicolor"),
-            ("⚫ Чёрный", "black"),
-            ("🟤 Коричневый", "brown"),
-            ("🟢 Зелёный", "green"),
-            ("🔘 Серый", "gray"),
-            ("🥚 Бежевый", "beige"),
-            ("💿 Серебряный", "silver"),
-            ("🌟 Золотой", "gold")
-        ]
-
-        # Добавляем кнопки цветов
-        for color_name, color_code in colors:
-            builder.button(text=color_name, callback_data=f"accessory_color_{color_code}")
-
-        # Добавляем кнопку пропуска
-        builder.button(text="⏩ Пропустить", callback_data="accessory_color_skip")
-
-        builder.adjust(3, 3, 3, 3, 3, 1)
-
         await message.answer(
             f"{user_name}, выберите цвет аксессуара:",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_color_keyboard("accessory_color", skip_text="⏩ Пропустить")
         )
 
     async def _ask_accessory_gender(self, message: Message, user_name: str):
         """Запрос 'Для кого' для аксессуаров"""
-        from aiogram.utils.keyboard import InlineKeyboardBuilder
-
-        builder = InlineKeyboardBuilder()
-
-        genders = [
-            ("👩 Женщины", "women"),
-            ("👨 Мужчины", "men"),
-            ("👥 Унисекс", "unisex")
-        ]
-
-        for gender_name, gender_code in genders:
-            builder.button(text=gender_name, callback_data=f"accessory_gender_{gender_code}")
-
-        builder.adjust(2)
-
         await message.answer(
             f"{user_name}, для кого предназначен аксессуар:",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_options_keyboard("accessory_gender", GENDERS, adjust=2)
         )
 
     async def process_accessory_color(self, callback: CallbackQuery, state: FSMContext):
@@ -507,99 +497,31 @@ class CommonHandlers(BaseHandler):
         from bot.services.product_service import ProductService
         await ProductService.ask_condition(message, user_name)
 
-    def _get_category_right_part(self, category_name: str) -> str:
-        """Получить правую часть категории после дефиса"""
-        if not category_name:
-            return ""
-
-        category_parts = category_name.split('-')
-        if len(category_parts) > 1:
-            return category_parts[-1].strip().lower()
-        else:
-            return category_name.strip().lower()
-
     def _load_shoe_materials(self):
-        """Загрузка материалов из materials.xml"""
-        try:
-            import xml.etree.ElementTree as ET
-            tree = ET.parse('materials.xml')
-            root = tree.getroot()
-
-            materials = []
-            for material_elem in root.findall('.//MaterialsOdezhda'):
-                materials.append(material_elem.text)
-
-            return materials
-        except Exception as e:
-            print(f"Error loading materials from XML: {e}")
-            # Возвращаем базовый список материалов на случай ошибки
-            return [
-                "Алова", "Атлас", "Байка", "Бархат", "Велюр",
-                "Войлок", "Дерево", "Кожа", "Замша", "Текстиль"
-            ]
+        """Материалы для обуви из общего каталога"""
+        from bot.services.material_service import MaterialService
+        return MaterialService.get_shoe_materials()
 
     async def _ask_shoe_color(self, message: Message, user_name: str, is_sport_shoe: bool = False):
         """Запрос цвета для обуви"""
-        from aiogram.utils.keyboard import InlineKeyboardBuilder
-
-        builder = InlineKeyboardBuilder()
-
-        colors = [
-            ("🔴 Красный", "red"),
-            ("⚪ Белый", "white"),
-            ("🎀 Розовый", "pink"),
-            ("🍷 Бордовый", "burgundy"),
-            ("🔵 Синий", "blue"),
-            ("🟡 Жёлтый", "yellow"),
-            ("💙 Голубой", "light_blue"),
-            ("🟣 Фиолетовый", "purple"),
-            ("🟠 Оранжевый", "orange"),
-            ("🌈 Разноцветный", "multicolor"),
-            ("⚫ Чёрный", "black"),
-            ("🟤 Коричневый", "brown"),
-            ("🟢 Зелёный", "green"),
-            ("🔘 Серый", "gray"),
-            ("🥚 Бежевый", "beige"),
-            ("💿 Серебряный", "silver"),
-            ("🌟 Золотой", "gold")
-        ]
-
-        # Добавляем кнопки цветов
-        for color_name, color_code in colors:
-            builder.button(text=color_name, callback_data=f"shoe_color_{color_code}")
-
-        # Для спортивной обуви добавляем кнопку пропуска
-        if is_sport_shoe:
-            builder.button(text="⏩ Пропустить", callback_data="shoe_color_skip")
-
-        builder.adjust(3, 3, 3, 3, 3, 1)  # 5 рядов по 3 кнопки + 1 кнопка пропуска (если есть)
-
+        skip_text = "⏩ Пропустить" if is_sport_shoe else None
         skip_note = "\n💡 Для спортивной обуви цвет можно пропустить" if is_sport_shoe else ""
 
         await message.answer(
             f"{user_name}, выберите цвет обуви:{skip_note}",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_color_keyboard("shoe_color", skip_text=skip_text)
         )
 
     async def _ask_shoe_material(self, message: Message, user_name: str):
         """Запрос материала для мужской обуви"""
         materials = self._load_shoe_materials()
 
-        from aiogram.utils.keyboard import InlineKeyboardBuilder
-        builder = InlineKeyboardBuilder()
-
-        # Добавляем материалы из XML
-        for material in materials:
-            builder.button(text=material, callback_data=f"shoe_material_{material}")
-
-        # Добавляем кнопку пропуска
-        builder.button(text="⏩ Пропустить", callback_data="shoe_material_skip")
-
-        builder.adjust(2)  # По 2 кнопки в ряду
-
         await message.answer(
             f"{user_name}, выберите материал основной части обуви:",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_options_keyboard(
+                "shoe_material", [(material, material) for material in materials],
+                adjust=2, skip_text="⏩ Пропустить"
+            )
         )
 
     async def _ask_shoe_manufacturer_color(self, message: Message, user_name: str):
@@ -655,7 +577,7 @@ class CommonHandlers(BaseHandler):
         """Определить следующий шаг после выбора материала"""
         data = await StateManager.get_data_safe(state)
         category_name = data.get('category_name', '')
-        is_sport_shoe = self._is_sport_shoe_category(category_name)
+        is_sport_shoe = CategoryService.get_category_kind(category_name).is_sport_shoe
 
         if is_sport_shoe:
             # Спортивная обувь - пропускаем цвет от производителя
@@ -705,7 +627,7 @@ class CommonHandlers(BaseHandler):
             # Определяем тип товара для сообщения
             data = await StateManager.get_data_safe(state)
             category_name = data.get('category_name', '')
-            is_backpack = self._is_backpack_category(category_name)
+            is_backpack = CategoryService.get_category_kind(category_name).is_backpack
 
             item_type = "рюкзака" if is_backpack else "сумки"
             await callback.message.edit_text(f"{user_name}, цвет {item_type}: {color_text}")
@@ -788,69 +710,18 @@ class CommonHandlers(BaseHandler):
 
     async def _ask_bag_color(self, message: Message, user_name: str, is_backpack: bool = False):
         """Спросить цвет сумки/рюкзака"""
-        from aiogram.utils.keyboard import InlineKeyboardBuilder
-
-        builder = InlineKeyboardBuilder()
-
-        colors = [
-            ("🔴 Красный", "red"),
-            ("⚪ Белый", "white"),
-            ("🎀 Розовый", "pink"),
-            ("🍷 Бордовый", "burgundy"),
-            ("🔵 Синий", "blue"),
-            ("🟡 Жёлтый", "yellow"),
-            ("💙 Голубой", "light_blue"),
-            ("🟣 Фиолетовый", "purple"),
-            ("🟠 Оранжевый", "orange"),
-            ("🌈 Разноцветный", "multicolor"),
-            ("⚫ Чёрный", "black"),
-            ("🟤 Коричневый", "brown"),
-            ("🟢 Зелёный", "green"),
-            ("🔘 Серый", "gray"),
-            ("🥚 Бежевый", "beige"),
-            ("💿 Серебряный", "silver"),
-            ("🌟 Золотой", "gold")
-        ]
-
-        # Добавляем кнопки цветов (по 3 в ряд)
-        for color_name, color_code in colors:
-            builder.button(text=color_name, callback_data=f"bag_color_{color_code}")
-
-        # Добавляем кнопку пропуска
-        builder.button(text="⏭️ Пропустить", callback_data="bag_color_skip")
-
-        builder.adjust(3, 3, 3, 3, 3, 1)
-
         item_type = "рюкзак" if is_backpack else "сумку"
 
         await message.answer(
             f"{user_name}, выберите цвет {item_type}:",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_color_keyboard("bag_color", skip_text="⏭️ Пропустить")
         )
 
     async def _ask_bag_material(self, message: Message, user_name: str):
         """Спросить материал сумки"""
-        from aiogram.utils.keyboard import InlineKeyboardBuilder
-
-        builder = InlineKeyboardBuilder()
-
-        materials = [
-            ("🐮 Натуральная кожа", "natural_leather"),
-            ("👞 Искусственная кожа", "artificial_leather"),
-            ("📦 Другой материал", "other")
-        ]
-
-        for material_name, material_code in materials:
-            builder.button(text=material_name, callback_data=f"bag_material_{material_code}")
-
-        # Добавляем кнопку пропуска
-        builder.button(text="⏭️ Пропустить", callback_data="bag_material_skip")
-
-        builder.adjust(1)  # Все кнопки в один столбец
-
         await message.answer(
             f"{user_name}, выберите материал сумки:",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_options_keyboard("bag_material", BAG_MATERIALS, skip_text="⏭️ Пропустить")
         )
 
     async def process_bag_type(self, callback: CallbackQuery, state: FSMContext):
@@ -902,7 +773,7 @@ class CommonHandlers(BaseHandler):
             # Определяем тип товара для сообщения
             data = await StateManager.get_data_safe(state)
             category_name = data.get('category_name', '')
-            is_backpack = self._is_backpack_category(category_name)
+            is_backpack = CategoryService.get_category_kind(category_name).is_backpack
 
             item_type = "рюкзака" if is_backpack else "сумки"
             await callback.message.edit_text(f"{user_name}, назначение {item_type}: {bag_gender_text}")
@@ -922,54 +793,18 @@ class CommonHandlers(BaseHandler):
 
     async def _ask_bag_type(self, message: Message, user_name: str):
         """Спросить вид сумки"""
-        from aiogram.utils.keyboard import InlineKeyboardBuilder
-
-        builder = InlineKeyboardBuilder()
-
-        bag_types = [
-            ("👜 Через плечо", "shoulder"),
-            ("🎒 Кросс-боди", "crossbody"),
-            ("⚽ Спортивная", "sport"),
-            ("👛 Клатч", "clutch"),
-            ("💫 Поясная", "waist"),
-            ("🛍️ Шопер", "shopper"),
-            ("🏖️ Пляжная", "beach"),
-            ("👜 С ручками", "with_handles"),
-            ("✨ Аксессуар для сумки", "accessory")
-        ]
-
-        for type_name, type_code in bag_types:
-            builder.button(text=type_name, callback_data=f"bag_type_{type_code}")
-
-        builder.adjust(2)
-
         await message.answer(
             f"{user_name}, выберите вид сумки:",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_options_keyboard("bag_type", BAG_TYPES, adjust=2)
         )
 
     async def _ask_bag_gender(self, message: Message, user_name: str, is_backpack: bool = False):
         """Спросить назначение сумки/рюкзака"""
-        from aiogram.utils.keyboard import InlineKeyboardBuilder
-
-        builder = InlineKeyboardBuilder()
-
-        bag_genders = [
-            ("👩 Женщины", "women"),
-            ("👨 Мужчины", "men"),
-            ("👥 Унисекс", "unisex")
-        ]
-
-        for gender_name, gender_code in bag_genders:
-            builder.button(text=gender_name, callback_data=f"bag_gender_{gender_code}")
-
-        builder.adjust(2)
-
         item_type = "рюкзака" if is_backpack else "сумки"
 
         await message.answer(
             f"{user_name}, для кого предназначен {item_type}:",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_options_keyboard("bag_gender", GENDERS, adjust=2)
         )
 
     async def _continue_after_bag_properties(self, message: Message, state: FSMContext, user_name: str):
@@ -1030,37 +865,31 @@ class CommonHandlers(BaseHandler):
         await message.answer(f"✅ Бренд подтвержден: {brand}")
 
         # Определяем тип категории
-        is_shoe = self._is_shoe_category(category_name)
-        is_accessory = self._is_accessory_category(category_name)
-        is_bag_category = self._is_bag_category(category_name)
-        is_backpack_category = self._is_backpack_category(category_name)
-        is_clothing = self._is_clothing_category(category_name)
+        category_kind = CategoryService.get_category_kind(category_name)
 
-        if is_shoe:
+        if category_kind.is_shoe:
             # Для обуви сначала запрашиваем РАЗМЕР, потом цвет, материал и цвет от производителя
             await state.set_state(ProductStates.waiting_for_size)
             from bot.services.product_service import ProductService
             await ProductService.ask_size(message, user_name)  # Используем существующий метод
-        elif is_accessory:
+        elif category_kind.is_accessory:
             # Для аксессуаров - запрашиваем цвет и "Для кого"
             await state.set_state(ProductStates.waiting_for_accessory_color)
             await self._ask_accessory_color(message, user_name)
-        elif is_backpack_category:
+        elif category_kind.is_backpack:
             # Для рюкзаков запрашиваем цвет и назначение
             await state.set_state(ProductStates.waiting_for_bag_gender)
             await self._ask_bag_gender(message, user_name, is_backpack=True)
-        elif is_bag_category:
+        elif category_kind.is_bag:
             # Для обычных сумок запрашиваем вид
             await state.set_state(ProductStates.waiting_for_bag_type)
             await self._ask_bag_type(message, user_name)
-        elif is_clothing:
+        elif category_kind.is_clothing:
             # Для одежды запрашиваем дополнительные свойства
             await self._handle_clothing_properties(message, state, user_name, category_name)
         else:
             # Для других категорий проверяем нужен ли размер
-            needs_size = self._needs_size_category(category_name)
-
-            if needs_size:
+            if category_kind.needs_size:
                 await state.set_state(ProductStates.waiting_for_size)
                 from bot.services.product_service import ProductService
                 await ProductService.ask_size(message, user_name)
@@ -1069,17 +898,6 @@ class CommonHandlers(BaseHandler):
                 from bot.services.product_service import ProductService
                 await ProductService.ask_condition(message, user_name)
 
-    def _is_clothing_category(self, category_name: str) -> bool:
-        """Проверяет, является ли категория одеждой"""
-        if not category_name:
-            return False
-
-        clothing_keywords = [
-            "Мужская одежда", "Женская одежда", "Одежда"
-        ]
-
-        return any(clothing_keyword in category_name for clothing_keyword in clothing_keywords)
-
     async def _handle_clothing_properties(self, message: Message, state: FSMContext, user_name: str,
                                           category_name: str):
         """Обработка свойств одежды"""
@@ -1089,84 +907,31 @@ class CommonHandlers(BaseHandler):
 
     async def _ask_clothing_size(self, message: Message, user_name: str):
         """Запрос размера одежды"""
-        from aiogram.utils.keyboard import InlineKeyboardBuilder
-
-        builder = InlineKeyboardBuilder()
-
-        clothing_sizes = [
-            "40 (XXS)", "42 (XS)", "44 (XS/S)", "46 (S)", "48 (M)", "50 (L)",
-            "52 (L/XL)", "54 (XL)", "56 (XXL)", "58 (XXL)", "60 (3XL)", "62 (4XL)",
-            "64 (5XL)", "66 (6XL)", "68 (7XL)", "70 (7XL)", "72 (8XL)", "74 (8XL)",
-            "76 (9XL)", "78 (10XL)", "80 (10XL)", "82+ (10XL+)", "One size", "Без размера"
-        ]
-
-        for size in clothing_sizes:
-            builder.button(text=size, callback_data=f"clothing_size_{size}")
-
-        builder.adjust(2)
-
         await message.answer(
             f"{user_name}, выберите размер одежды:",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_clothing_size_keyboard()
         )
 
     async def _ask_clothing_color(self, message: Message, user_name: str, can_skip: bool = False):
         """Запрос цвета одежды"""
-        from aiogram.utils.keyboard import InlineKeyboardBuilder
-
-        builder = InlineKeyboardBuilder()
-
-        colors = [
-            ("🔴 Красный", "red"),
-            ("⚪ Белый", "white"),
-            ("🎀 Розовый", "pink"),
-            ("🍷 Бордовый", "burgundy"),
-            ("🔵 Синий", "blue"),
-            ("🟡 Жёлтый", "yellow"),
-            ("💙 Голубой", "light_blue"),
-            ("🟣 Фиолетовый", "purple"),
-            ("🟠 Оранжевый", "orange"),
-            ("🌈 Разноцветный", "multicolor"),
-            ("⚫ Чёрный", "black"),
-            ("🟤 Коричневый", "brown"),
-            ("🟢 Зелёный", "green"),
-            ("🔘 Серый", "gray"),
-            ("🥚 Бежевый", "beige"),
-            ("💿 Серебряный", "silver"),
-            ("🌟 Золотой", "gold")
-        ]
-
-        for color_name, color_code in colors:
-            builder.button(text=color_name, callback_data=f"clothing_color_{color_code}")
-
-        if can_skip:
-            builder.button(text="⏩ Пропустить", callback_data="clothing_color_skip")
-
-        builder.adjust(3, 3, 3, 3, 3, 1)
-
+        skip_text = "⏩ Пропустить" if can_skip else None
         skip_note = "\n💡 Цвет можно пропустить" if can_skip else ""
 
         await message.answer(
             f"{user_name}, выберите цвет одежды:{skip_note}",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_color_keyboard("clothing_color", skip_text=skip_text)
         )
 
     async def _ask_clothing_material(self, message: Message, user_name: str):
         """Запрос материала одежды"""
         materials = self._load_clothing_materials()
 
-        from aiogram.utils.keyboard import InlineKeyboardBuilder
-        builder = InlineKeyboardBuilder()
-
-        for material in materials:
-            builder.button(text=material, callback_data=f"clothing_material_{material}")
-
-        builder.button(text="⏩ Пропустить", callback_data="clothing_material_skip")
-        builder.adjust(2)
-
         await message.answer(
             f"{user_name}, выберите материал одежды:",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_options_keyboard(
+                "clothing_material", [(material, material) for material in materials],
+                adjust=2, skip_text="⏩ Пропустить"
+            )
         )
 
     async def _ask_clothing_manufacturer_color(self, message: Message, user_name: str):
@@ -1177,152 +942,9 @@ class CommonHandlers(BaseHandler):
         )
 
     def _load_clothing_materials(self):
-        """Загрузка материалов для одежды"""
-        try:
-            import xml.etree.ElementTree as ET
-            tree = ET.parse('materials.xml')
-            root = tree.getroot()
-
-            materials = []
-            for material_elem in root.findall('.//MaterialsOdezhda'):
-                materials.append(material_elem.text)
-
-            return materials
-        except Exception as e:
-            print(f"Error loading materials from XML: {e}")
-            # Возвращаем базовый список материалов
-            return [
-                "Хлопок", "Лён", "Шерсть", "Шёлк", "Кашемир", "Вискоза",
-                "Полиэстер", "Нейлон", "Акрил", "Эластан", "Кожа", "Замша",
-                "Джинса", "Флис", "Вельвет", "Бархат", "Атлас", "Сетка"
-            ]
-
-    def _needs_full_clothing_properties(self, category_name: str) -> bool:
-        """Проверяет, нужны ли полные свойства одежды (материал + размер + цвет)"""
-        if not category_name:
-            return False
-
-        category_lower = category_name.lower()
-
-        # Категории, для которых НЕ нужны полные свойства
-        excluded_categories = [
-            "нижнее бельё", "нижнее белье", "дублёнки", "дубленки", "шубы", "другое"
-        ]
-
-        return not any(excluded in category_lower for excluded in excluded_categories)
-
-    def _is_men_shoe_category(self, category_name: str) -> bool:
-        """Проверяет, является ли категория мужской обувью"""
-        if not category_name:
-            return False
-
-        category_right_part = self._get_category_right_part(category_name)
-
-        men_shoe_keywords = [
-            "кроссовки", "ботинки и полуботинки", "туфли", "кеды",
-            "сапоги и полусапоги", "кроссовки", "кроссовки", "кроссовки"
-        ]
-
-        return any(keyword in category_right_part for keyword in men_shoe_keywords)
-
-    def _is_bag_category(self, category_name: str) -> bool:
-        """Проверяет, является ли категория сумкой"""
-        if not category_name:
-            return False
-
-        # Разделяем по дефису и берем правую часть
-        category_parts = category_name.split('-')
-        if len(category_parts) > 1:
-            # Берем правую часть после дефиса
-            category_for_check = category_parts[-1].strip().lower()
-        else:
-            # Если дефиса нет, используем всю строку
-            category_for_check = category_name.strip().lower()
-
-        bag_keywords = [
-            "сумки"
-        ]
-
-        return any(keyword in category_for_check for keyword in bag_keywords)
-
-    def _is_shoe_category(self, category_name: str) -> bool:
-        """Проверяет, является ли категория обувью (мужской или женской)"""
-        if not category_name:
-            return False
-
-        category_right_part = self._get_category_right_part(category_name)
-
-        shoe_keywords = [
-            "кроссовки", "ботинки и полуботинки", "туфли", "кеды", "сапоги",
-            "сапоги и полусапоги", "мокасины и лоферы", "спортивная обувь", "угги, валенки, дутики",
-            "рабочая обувь", "резиновая обувь", "сандалии", "шлёпанцы и сланцы",
-            "домашняя обувь", "слипоны и эспадрильи", "кроссовки", "уход за обувью",
-            "босоножки", "ботильоны", "кроссовки и кеды", "полусапоги",
-            "балетки", "сабо и мюли"
-        ]
-
-        return any(keyword in category_right_part for keyword in shoe_keywords)
-
-    def _is_accessory_category(self, category_name: str) -> bool:
-        """Проверяет, является ли категория аксессуаром"""
-        if not category_name:
-            return False
-
-        category_right_part = self._get_category_right_part(category_name)
-
-        accessory_keywords = [
-            "аксессуары для волос", "зонты", "украшения", "головные уборы", "ремни, пояса, подтяжки", "перчатки и варежки", "галстуки и бабочки",
-            "другое", "носки, чулки, колготки", "платки и шарфы", "швейная фурнитура", "очки"
-        ]
-
-        return any(keyword in category_right_part.lower() for keyword in accessory_keywords)
-
-    def _is_sport_shoe_category(self, category_name: str) -> bool:
-        """Проверяет, является ли категория спортивной обувью"""
-        if not category_name:
-            return False
-
-        category_right_part = self._get_category_right_part(category_name)
-
-        sport_shoe_keywords = [
-            "спортивная обувь", "рабочая обувь", "резиновая обувь", "домашняя обувь", "уход за обувью"
-        ]
-
-        return any(keyword in category_right_part for keyword in sport_shoe_keywords)
-
-    def _is_backpack_category(self, category_name: str) -> bool:
-        """Проверяет, является ли категория рюкзаком"""
-        if not category_name:
-            return False
-
-        # Разделяем по дефису и берем правую часть
-        category_parts = category_name.split('-')
-        if len(category_parts) > 1:
-            # Берем правую часть после дефиса
-            category_for_check = category_parts[-1].strip().lower()
-        else:
-            # Если дефиса нет, используем всю строку
-            category_for_check = category_name.strip().lower()
-
-        backpack_keywords = [
-            "рюкзак", "чемоданы и дорожные сумки", "портфели и борсетки",
-            "кошельки, визитницы, ключницы", "косметички и бьюти–кейсы"
-        ]
-
-        return any(keyword in category_for_check for keyword in backpack_keywords)
-
-    def _needs_size_category(self, category_name: str) -> bool:
-        """Проверяет, нужен ли размер для категории"""
-        if not category_name:
-            return False
-
-        size_categories = [
-            "Мужская обувь", "Женская обувь", "Мужская одежда", "Женская одежда",
-            "Брюки", "Джинсы", "Шорты", "Пиджаки и костюмы", "Рубашки", "Платья", "Юбки",
-            "Обувь", "Одежда", "Верхняя одежда", "Нижнее белье", "Головные уборы"
-        ]
-
-        return any(size_cat in category_name for size_cat in size_categories)
+        """Материалы для одежды из общего каталога"""
+        from bot.services.material_service import MaterialService
+        return MaterialService.get_clothing_materials()
 
     async def _ask_backpack_properties(self, message: Message, user_name: str):
         """Запрос свойств для рюкзака"""
@@ -1422,6 +1044,13 @@ class CommonHandlers(BaseHandler):
 
     async def generate_xml_command(self, message: Message):
         """Генерация ZIP архива с XML и изображениями для Avito"""
+        export_mode = 'hosted' if config.IMAGE_HOSTING_ENABLED else 'zip'
+        with metrics.track('bot_export', {'mode': export_mode}), \
+                export_trace.start_trace(message.from_user.id, export_mode):
+            await self._generate_export(message)
+
+    async def _generate_export(self, message: Message):
+        """Сборка и отправка архива (или XML со ссылками на изображения)"""
         try:
             user_id = message.from_user.id
             user_name = message.from_user.first_name
@@ -1443,10 +1072,11 @@ class CommonHandlers(BaseHandler):
             full_products = []
             total_images = 0
 
-            for product in products:
-                full_product = await self._get_full_product_data(product)
-                full_products.append(full_product)
-                total_images += len(full_product.get('all_images', []))
+            with export_trace.span('load_products', products=len(products)):
+                for product in products:
+                    full_product = await self._get_full_product_data(product)
+                    full_products.append(full_product)
+                    total_images += len(full_product.get('all_images', []))
 
             await progress_msg.edit_text(
                 f"📊 Найдено {len(full_products)} товаров с {total_images} изображениями\n\n🔄 Генерирую архив...")
@@ -1458,26 +1088,43 @@ class CommonHandlers(BaseHandler):
             if hasattr(self, 'image_service') and self.image_service:
                 generator.image_service = self.image_service
 
+            # Нормализация изображений (размер, EXIF, progressive JPEG) в пуле процессов
+            if config.IMAGE_NORMALIZATION_ENABLED:
+                from bot.services.image_pipeline import image_pipeline
+                generator.image_pipeline = image_pipeline
+
+            # Изображения на внешнем хостинге - отправляем только XML
+            if config.IMAGE_HOSTING_ENABLED:
+                from bot.services.image_hosting import image_hosting
+                generator.image_hosting = image_hosting
+                await self._send_hosted_xml(message, progress_msg, generator, full_products)
+                return
+
             # Асинхронный вызов
-            zip_buffer = await generator.generate_zip_archive(full_products)
+            zip_file = await generator.generate_zip_archive(full_products)
 
             await progress_msg.edit_text("✅ Архив готов! Отправляю...")
 
             # Отправляем архив пользователю
             filename = f"avito_export_{user_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
 
-            await message.answer_document(
-                document=BufferedInputFile(zip_buffer.getvalue(), filename=filename),
-                caption=f"✅ {user_name}, ZIP архив для Avito готов!\n\n"
-                        f"Содержит:\n"
-                        f"• 📄 avito.xml - файл с {len(full_products)} объявлениями\n"
-                        f"• 🖼️ Изображения в формате 1.jpg, 2.jpg...\n"
-                        f"• 📝 README.txt - инструкция\n\n"
-                        f"💡 **Как использовать:**\n"
-                        f"1. Загрузите ВЕСЬ архив в личном кабинете Avito\n"
-                        f"2. Не распаковывайте архив!\n"
-                        f"3. Система автоматически свяжет изображения"
-            )
+            try:
+                with export_trace.span('upload'):
+                    await message.answer_document(
+                        document=SpooledInputFile(zip_file, filename=filename),
+                        caption=f"✅ {user_name}, ZIP архив для Avito готов!\n\n"
+                                f"Содержит:\n"
+                                f"• 📄 avito.xml - файл с {len(full_products)} объявлениями\n"
+                                f"• 🖼️ Изображения в формате 1.jpg, 2.jpg...\n"
+                                f"• 📝 README.txt - инструкция\n\n"
+                                f"💡 **Как использовать:**\n"
+                                f"1. Загрузите ВЕСЬ архив в личном кабинете Avito\n"
+                                f"2. Не распаковывайте архив!\n"
+                                f"3. Система автоматически свяжет изображения"
+                                f"{self._format_export_report(generator.last_export_report)}"
+                    )
+            finally:
+                zip_file.close()
 
             await progress_msg.delete()
 
@@ -1797,8 +1444,9 @@ class CommonHandlers(BaseHandler):
 
         from bot.services.brand_service import BrandService
 
-        if BrandService.is_valid_brand(brand_input):
-            await StateManager.safe_update(state, brand=brand_input)
+        canonical_brand = BrandService.get_canonical_brand(brand_input)
+        if canonical_brand:
+            await StateManager.safe_update(state, brand=canonical_brand)
             await self._process_brand_success(message, state, message.from_user.first_name)
             return
 
@@ -1865,8 +1513,9 @@ class CommonHandlers(BaseHandler):
         data = await StateManager.get_data_safe(state)
         category_name = data.get('category_name', '')
 
-        if self._is_shoe_category(category_name):
-            is_sport_shoe = self._is_sport_shoe_category(category_name)
+        category_kind = CategoryService.get_category_kind(category_name)
+        if category_kind.is_shoe:
+            is_sport_shoe = category_kind.is_sport_shoe
             await state.set_state(ProductStates.waiting_for_shoe_color)
             await self._ask_shoe_color(callback.message, user_name, is_sport_shoe=is_sport_shoe)
         else:
@@ -1886,8 +1535,9 @@ class CommonHandlers(BaseHandler):
         data = await StateManager.get_data_safe(state)
         category_name = data.get('category_name', '')
 
-        if self._is_shoe_category(category_name):
-            is_sport_shoe = self._is_sport_shoe_category(category_name)
+        category_kind = CategoryService.get_category_kind(category_name)
+        if category_kind.is_shoe:
+            is_sport_shoe = category_kind.is_sport_shoe
             await state.set_state(ProductStates.waiting_for_shoe_color)
             await self._ask_shoe_color(message, user_name, is_sport_shoe=is_sport_shoe)
         else:
@@ -2126,6 +1776,25 @@ class CommonHandlers(BaseHandler):
             "❓ Нужна помощь? Напишите <b>/help</b>"
         )
 
+    async def reload_data_command(self, message: Message):
+        """Перезагрузка справочников (бренды, города, материалы...) без перезапуска бота"""
+        if message.from_user.id not in config.ADMIN_IDS:
+            await message.answer("❌ Команда доступна только администраторам")
+            return
+
+        from bot.services.reference_data import reference_data
+
+        parts = message.text.split()[1:]
+        reloaded = await reference_data.reload(parts or None)
+
+        if reloaded:
+            await message.answer(f"🔄 Перезагружены справочники: {', '.join(reloaded)}")
+        else:
+            await message.answer(
+                "❌ Справочники не перезагружены.\n"
+                f"Доступные: {', '.join(reference_data.names)}"
+            )
+
     async def help_command(self, message: Message):
         """Простой обработчик /help"""
         await message.answer(
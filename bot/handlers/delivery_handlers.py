@@ -1,5 +1,5 @@
 # bot/handlers/delivery_handlers.py
-from aiogram import Router, F, Bot
+from aiogram import Router, Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
@@ -18,21 +18,21 @@ class DeliveryHandlers(BaseHandler):
 
     def _register_handlers(self):
         # Авито доставка
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_delivery_choice,
-            F.data.startswith("delivery_")
+            prefix="delivery_"
         )
 
         # Службы доставки
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_delivery_service,
-            F.data.startswith("service_")
+            prefix="service_"
         )
 
         # Скидка на доставку
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_delivery_discount,
-            F.data.startswith("discount_")
+            prefix="discount_"
         )
 
         # Процент скидки на доставку
@@ -42,9 +42,9 @@ class DeliveryHandlers(BaseHandler):
         )
 
         # Мультиобъявление
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_multioffer,
-            F.data.startswith("multioffer_")
+            prefix="multioffer_"
         )
 
     async def process_delivery_choice(self, callback: CallbackQuery, state: FSMContext):
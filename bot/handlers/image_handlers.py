@@ -8,6 +8,7 @@ from datetime import datetime
 
 from bot.states import ProductStates
 from bot.handlers.base import BaseHandler, StateManager
+from bot.middleware.album_middleware import AlbumPhoto
 
 
 class ImageHandlers(BaseHandler):
@@ -45,22 +46,18 @@ class ImageHandlers(BaseHandler):
         )
 
         # Перемешивание изображений
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_shuffle_choice,
-            F.data.startswith("shuffle_")
+            prefix="shuffle_"
         )
 
-    async def handle_main_images(self, message: Message, state: FSMContext, album: List[Message] = None):
+    async def handle_main_images(self, message: Message, state: FSMContext, album: List[AlbumPhoto] = None):
         """Универсальная обработка основных изображений (одиночных и альбомов)"""
         # Получаем альбом из data, если он есть
         if album is None:
-            album = [message]
+            album = [AlbumPhoto.from_message(message)] if message.photo else []
 
-        photo_files = []
-        for msg in album:
-            if msg.photo:
-                largest_photo = msg.photo[-1]
-                photo_files.append(largest_photo.file_id)
+        photo_files = [photo.file_id for photo in album]
 
         if not photo_files:
             return
@@ -86,17 +83,13 @@ class ImageHandlers(BaseHandler):
                 "Продолжайте отправлять фото или нажмите /finish_main_images чтобы завершить."
             )
 
-    async def handle_additional_images(self, message: Message, state: FSMContext, album: List[Message] = None):
+    async def handle_additional_images(self, message: Message, state: FSMContext, album: List[AlbumPhoto] = None):
         """Универсальная обработка дополнительных изображений (одиночных и альбомов)"""
         # Получаем альбом из data, если он есть
         if album is None:
-            album = [message]
+            album = [AlbumPhoto.from_message(message)] if message.photo else []
 
-        photo_files = []
-        for msg in album:
-            if msg.photo:
-                largest_photo = msg.photo[-1]
-                photo_files.append(largest_photo.file_id)
+        photo_files = [photo.file_id for photo in album]
 
         if not photo_files:
             return
@@ -1,5 +1,5 @@
 # bot/handlers/location_handlers.py
-from aiogram import Router, F, Bot
+from aiogram import Router, Bot
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardRemove, KeyboardButton, ReplyKeyboardMarkup
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
@@ -21,24 +21,24 @@ class LocationHandlers(BaseHandler):
 
     def _register_handlers(self):
         # Метро
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_metro_city,
-            F.data.startswith("metro_city_"),
-            StateFilter(ProductStates.waiting_for_metro_city)
+            prefix="metro_city_",
+            state=ProductStates.waiting_for_metro_city
         )
         self.router.message.register(
             self.process_metro_quantity,
             StateFilter(ProductStates.waiting_for_metro_quantity)
         )
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.back_to_placement_type,
-            F.data == "back_to_placement_type",
-            StateFilter(ProductStates.waiting_for_metro_city)
+            equals="back_to_placement_type",
+            state=ProductStates.waiting_for_metro_city
         )
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.back_to_metro_city,
-            F.data == "back_to_metro_city",
-            StateFilter(ProductStates.waiting_for_metro_quantity)
+            equals="back_to_metro_city",
+            state=ProductStates.waiting_for_metro_quantity
         )
 
         # Города
@@ -47,25 +47,25 @@ class LocationHandlers(BaseHandler):
             StateFilter(ProductStates.waiting_for_city_input)
         )
 
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.confirm_city,
-            F.data == "city_confirm",
-            StateFilter(ProductStates.waiting_for_city_confirmation)
+            equals="city_confirm",
+            state=ProductStates.waiting_for_city_confirmation
         )
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.reject_city,
-            F.data == "city_reject",
-            StateFilter(ProductStates.waiting_for_city_confirmation)
+            equals="city_reject",
+            state=ProductStates.waiting_for_city_confirmation
         )
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.restart_city_input,
-            F.data == "cities_restart",
-            StateFilter(ProductStates.waiting_for_city_input)
+            equals="cities_restart",
+            state=ProductStates.waiting_for_city_input
         )
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.skip_city_input,
-            F.data == "cities_skip",
-            StateFilter(ProductStates.waiting_for_city_input)
+            equals="cities_skip",
+            state=ProductStates.waiting_for_city_input
         )
 
         # Количество объявлений
@@ -198,34 +198,40 @@ class LocationHandlers(BaseHandler):
             await message.answer("Введите название города:")
             return
 
-        # Ищем город через Nominatim
-        from нф import validate_city_nominatim
-        result = await validate_city_nominatim(city_name)
+        # Ищем город в локальном справочнике, при необходимости - через Nominatim
+        from bot.services.city_resolver import validate_city
+        result = await validate_city(city_name)
 
         if result['valid']:
-            city_data = result['data']
-            await StateManager.safe_update(state, temp_city=city_data)
-
-            builder = InlineKeyboardBuilder()
-            builder.button(text="✅ Да, верно", callback_data="city_confirm")
-            builder.button(text="❌ Нет, другой город", callback_data="city_reject")
-            builder.adjust(2)
-
-            await message.answer(
-                f"🔍 Найден город:\n"
-                f"🏙️ {city_data['name']}\n"
-                f"📍 {city_data['full_address']}\n\n"
-                "Это правильный город?",
-                reply_markup=builder.as_markup()
-            )
-
-            await state.set_state(ProductStates.waiting_for_city_confirmation)
+            await self._ask_city_confirmation(message, state, result)
         else:
             await message.answer(
                 f"❌ Город '{city_name}' не найден.\n"
                 "Попробуйте ввести другое название:"
             )
 
+    async def _ask_city_confirmation(self, message: Message, state: FSMContext, result: dict):
+        """Показывает найденный город с кнопками city_confirm / city_reject"""
+        city_data = result['data']
+        await StateManager.safe_update(state, temp_city=city_data)
+
+        builder = InlineKeyboardBuilder()
+        builder.button(text="✅ Да, верно", callback_data="city_confirm")
+        builder.button(text="❌ Нет, другой город", callback_data="city_reject")
+        builder.adjust(2)
+
+        # Похожий город из справочника, а не точное совпадение
+        title = "🤔 Возможно, вы имели в виду:" if result.get('needs_confirmation') else "🔍 Найден город:"
+        await message.answer(
+            f"{title}\n"
+            f"🏙️ {city_data['name']}\n"
+            f"📍 {city_data['full_address']}\n\n"
+            "Это правильный город?",
+            reply_markup=builder.as_markup()
+        )
+
+        await state.set_state(ProductStates.waiting_for_city_confirmation)
+
     async def _process_single_city_for_multiple(self, message: Message, state: FSMContext):
         """Обработка одного города для мультиразмещения"""
         city_name = message.text.strip()
@@ -234,45 +240,56 @@ class LocationHandlers(BaseHandler):
             await message.answer("Введите название города:")
             return
 
-        # Ищем город через Nominatim
-        from нф import validate_city_nominatim
-        result = await validate_city_nominatim(city_name)
-
-        if result['valid']:
-            city_data = result['data']
-
-            selected_cities = [{
-                'name': city_data['name'],
-                'full_address': city_data['full_address'],
-                'lat': city_data.get('lat'),
-                'lon': city_data.get('lon'),
-                'type': city_data.get('type')
-            }]
-
-            await StateManager.safe_update(
-                state,
-                selected_cities=selected_cities,
-                cities=[city_data['name']]
-            )
-            await state.set_state(ProductStates.waiting_for_quantity)
+        # Ищем город в локальном справочнике, при необходимости - через Nominatim
+        from bot.services.city_resolver import validate_city
+        result = await validate_city(city_name)
 
-            await message.answer(
-                f"✅ Город подтвержден!\n"
-                f"🏙️ {city_data['name']}\n"
-                f"📍 {city_data['full_address']}\n\n"
-                "Теперь введите количество объявлений для этого города:",
-                reply_markup=ReplyKeyboardRemove()
-            )
+        if result.get('needs_confirmation'):
+            # Похожий город - сохраняем только после подтверждения (см. confirm_city)
+            await self._ask_city_confirmation(message, state, result)
+        elif result['valid']:
+            await self._set_city_for_multiple(message, state, result['data'])
         else:
             await message.answer(
                 f"❌ Город '{city_name}' не найден.\n"
                 "Попробуйте ввести другое название:"
             )
 
+    async def _set_city_for_multiple(self, message: Message, state: FSMContext, city_data: dict):
+        """Сохраняет город мультиразмещения и переходит к количеству"""
+        selected_cities = [{
+            'name': city_data['name'],
+            'full_address': city_data['full_address'],
+            'lat': city_data.get('lat'),
+            'lon': city_data.get('lon'),
+            'type': city_data.get('type')
+        }]
+
+        await StateManager.safe_update(
+            state,
+            selected_cities=selected_cities,
+            cities=[city_data['name']]
+        )
+        await state.set_state(ProductStates.waiting_for_quantity)
+
+        await message.answer(
+            f"✅ Город подтвержден!\n"
+            f"🏙️ {city_data['name']}\n"
+            f"📍 {city_data['full_address']}\n\n"
+            "Теперь введите количество объявлений для этого города:",
+            reply_markup=ReplyKeyboardRemove()
+        )
+
     async def confirm_city(self, callback: CallbackQuery, state: FSMContext):
-        """Подтверждение города для метода exact_cities"""
+        """Подтверждение найденного города"""
         data = await StateManager.get_data_safe(state)
         city_data = data.get('temp_city')
+
+        if data.get('placement_method') == "multiple_in_city":
+            await callback.message.edit_reply_markup(reply_markup=None)
+            await self._set_city_for_multiple(callback.message, state, city_data)
+            return
+
         selected_cities = data.get('selected_cities', [])
 
         selected_cities.append({
@@ -433,17 +450,17 @@ class LocationHandlers(BaseHandler):
         """Обработка количества для метода из XML"""
         try:
             quantity = int(message.text.strip())
-            cities = LocationService.load_cities_from_xml()
+            gazetteer = LocationService.get_gazetteer()
 
             if quantity <= 0:
                 await message.answer("Количество должно быть положительным числом. Введите количество:")
                 return
 
-            if quantity > len(cities):
-                await message.answer(f"Максимальное количество: {len(cities)}. Введите меньшее число:")
+            if quantity > len(gazetteer):
+                await message.answer(f"Максимальное количество: {len(gazetteer)}. Введите меньшее число:")
                 return
 
-            selected_cities = [city['name'] for city in cities[:quantity]]
+            selected_cities = gazetteer.names[:quantity]
 
             await StateManager.safe_update(
                 state,
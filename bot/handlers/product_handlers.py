@@ -1,10 +1,11 @@
-from aiogram import Router, F, Bot
+from aiogram import Router, Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 
 from bot.database import Database
 from bot.states import ProductStates
+from bot.services.category_service import CategoryService
 from bot.services.product_service import ProductService
 from bot.services.location_service import LocationService
 from bot.keyboards.builders import ProductKeyboards
@@ -22,13 +23,13 @@ class ProductHandlers(BaseHandler):
         self.router.message.register(self.new_product_command, Command("new_product"))
 
         # Категории
-        self.router.callback_query.register(self.process_main_category, F.data.startswith("cat_"))
-        self.router.callback_query.register(self.process_subcategory, F.data.startswith("sub_"),
-                                            StateFilter(ProductStates.waiting_for_subcategory))
-        self.router.callback_query.register(self.process_subsubcategory, F.data.startswith("sub_"),
-                                            StateFilter(ProductStates.waiting_for_subsubcategory))
-        self.router.callback_query.register(self.back_to_categories, F.data == "back_categories")
-        self.router.callback_query.register(self.back_to_subcategories, F.data.startswith("back_sub_"))
+        self.callbacks.register(self.process_main_category, prefix="cat_")
+        self.callbacks.register(self.process_subcategory, prefix="sub_",
+                                state=ProductStates.waiting_for_subcategory)
+        self.callbacks.register(self.process_subsubcategory, prefix="sub_",
+                                state=ProductStates.waiting_for_subsubcategory)
+        self.callbacks.register(self.back_to_categories, equals="back_categories")
+        self.callbacks.register(self.back_to_subcategories, prefix="back_sub_")
 
         # Основные данные товара
         self.router.message.register(self.process_product_title, StateFilter(ProductStates.waiting_for_title))
@@ -36,34 +37,34 @@ class ProductHandlers(BaseHandler):
                                      StateFilter(ProductStates.waiting_for_description))
 
         # Цена
-        self.router.callback_query.register(self.process_price_fixed, F.data == "price_fixed")
-        self.router.callback_query.register(self.process_price_range, F.data == "price_range")
-        self.router.callback_query.register(self.process_price_skip, F.data == "price_skip")
+        self.callbacks.register(self.process_price_fixed, equals="price_fixed")
+        self.callbacks.register(self.process_price_range, equals="price_range")
+        self.callbacks.register(self.process_price_skip, equals="price_skip")
         self.router.message.register(self.process_fixed_price, StateFilter(ProductStates.waiting_for_price))
         self.router.message.register(self.process_price_range_input, StateFilter(ProductStates.waiting_for_price_range))
 
         # Контактные данные
-        self.router.callback_query.register(self.process_contact_method, F.data.startswith("contact_"))
+        self.callbacks.register(self.process_contact_method, prefix="contact_")
 
         # Обработка размера одежды
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_clothing_size,
-            F.data.startswith("clothing_size_"),
-            StateFilter(ProductStates.waiting_for_clothing_size)
+            prefix="clothing_size_",
+            state=ProductStates.waiting_for_clothing_size
         )
 
         # Обработка цвета одежды
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_clothing_color,
-            F.data.startswith("clothing_color_"),
-            StateFilter(ProductStates.waiting_for_clothing_color)
+            prefix="clothing_color_",
+            state=ProductStates.waiting_for_clothing_color
         )
 
         # Обработка материала одежды
-        self.router.callback_query.register(
+        self.callbacks.register(
             self.process_clothing_material,
-            F.data.startswith("clothing_material_"),
-            StateFilter(ProductStates.waiting_for_clothing_material)
+            prefix="clothing_material_",
+            state=ProductStates.waiting_for_clothing_material
         )
 
         # Обработка цвета от производителя для одежды
@@ -72,17 +73,6 @@ class ProductHandlers(BaseHandler):
             StateFilter(ProductStates.waiting_for_clothing_manufacturer_color)
         )
 
-    def _needs_full_clothing_properties(self, category_name: str) -> bool:
-        if not category_name:
-            return False
-        category_lower = category_name.lower()
-        # Категории, для которых НЕ нужны полные свойства
-        excluded_categories = [
-            "нижнее бельё", "нижнее белье", "дублёнки", "дубленки", "шубы", "другое"
-        ]
-
-        return not any(excluded in category_lower for excluded in excluded_categories)
-
     async def _ask_clothing_size(self, message: Message, user_name: str):
         """Запрос размера одежды"""
         from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -174,25 +164,9 @@ class ProductHandlers(BaseHandler):
         )
 
     def _load_clothing_materials(self):
-        """Загрузка материалов для одежды"""
-        try:
-            import xml.etree.ElementTree as ET
-            tree = ET.parse('materials.xml')
-            root = tree.getroot()
-
-            materials = []
-            for material_elem in root.findall('.//MaterialsOdezhda'):
-                materials.append(material_elem.text)
-
-            return materials
-        except Exception as e:
-            print(f"Error loading materials from XML: {e}")
-            # Возвращаем базовый список материалов
-            return [
-                "Хлопок", "Лён", "Шерсть", "Шёлк", "Кашемир", "Вискоза",
-                "Полиэстер", "Нейлон", "Акрил", "Эластан", "Кожа", "Замша",
-                "Джинса", "Флис", "Вельвет", "Бархат", "Атлас", "Сетка"
-            ]
+        """Материалы для одежды из общего каталога"""
+        from bot.services.material_service import MaterialService
+        return MaterialService.get_clothing_materials()
 
     async def process_clothing_size(self, callback: CallbackQuery, state: FSMContext):
             """Обработка выбора размера одежды"""
@@ -206,7 +180,7 @@ class ProductHandlers(BaseHandler):
             # Определяем, нужно ли запрашивать материал
             data = await StateManager.get_data_safe(state)
             category_name = data.get('category_name', '')
-            needs_full_properties = self._needs_full_clothing_properties(category_name)
+            needs_full_properties = CategoryService.get_category_kind(category_name).needs_full_clothing_properties
 
             if needs_full_properties:
                 # Запрашиваем материал
@@ -218,7 +192,7 @@ class ProductHandlers(BaseHandler):
                 await state.set_state(ProductStates.waiting_for_clothing_color)
 
                 # Для исключенных категорий цвет можно пропустить
-                can_skip_color = not self._needs_full_clothing_properties(category_name)
+                can_skip_color = not needs_full_properties
                 await self._ask_clothing_color(callback.message, user_name, can_skip=can_skip_color)
 
     async def process_clothing_material(self, callback: CallbackQuery, state: FSMContext):
@@ -242,7 +216,7 @@ class ProductHandlers(BaseHandler):
             category_name = data.get('category_name', '')
 
             # Для полных свойств цвет обязателен, для исключенных - можно пропустить
-            can_skip_color = not self._needs_full_clothing_properties(category_name)
+            can_skip_color = not CategoryService.get_category_kind(category_name).needs_full_clothing_properties
             await self._ask_clothing_color(callback.message, user_name, can_skip=can_skip_color)
 
     async def process_clothing_color(self, callback: CallbackQuery, state: FSMContext):
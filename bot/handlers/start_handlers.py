@@ -1,5 +1,5 @@
 # bot/handlers/start_handlers.py
-from aiogram import Router, F, Bot
+from aiogram import Router, Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command, CommandStart
 from aiogram.fsm.context import FSMContext
@@ -27,17 +27,17 @@ class StartHandlers(BaseHandler):
         self.router.message.register(self.my_products_command, Command("my_products"))
 
         # Callback обработчики
-        self.router.callback_query.register(self.new_product_callback, F.data == "new_product")
-        self.router.callback_query.register(self.my_products_callback, F.data == "my_products")
-        self.router.callback_query.register(self.help_callback, F.data == "help")
-        self.router.callback_query.register(self.back_to_main_callback, F.data == "back_to_main")
+        self.callbacks.register(self.new_product_callback, equals="new_product")
+        self.callbacks.register(self.my_products_callback, equals="my_products")
+        self.callbacks.register(self.help_callback, equals="help")
+        self.callbacks.register(self.back_to_main_callback, equals="back_to_main")
 
         # Новые обработчики для удаления товаров
-        self.router.callback_query.register(self.show_delete_product_menu, F.data == "delete_product")
-        self.router.callback_query.register(self.select_product_to_delete, F.data.startswith("delete_select_"))
-        self.router.callback_query.register(self.confirm_delete_product, F.data.startswith("confirm_delete_"))
-        self.router.callback_query.register(self.cancel_delete_product, F.data == "cancel_delete")
-        self.router.callback_query.register(self.back_to_products_list, F.data == "back_to_products_list")
+        self.callbacks.register(self.show_delete_product_menu, equals="delete_product")
+        self.callbacks.register(self.select_product_to_delete, prefix="delete_select_")
+        self.callbacks.register(self.confirm_delete_product, prefix="confirm_delete_")
+        self.callbacks.register(self.cancel_delete_product, equals="cancel_delete")
+        self.callbacks.register(self.back_to_products_list, equals="back_to_products_list")
 
     async def start_command(self, message: Message):
         """Обработчик команды /start"""
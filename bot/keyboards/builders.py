@@ -1,6 +1,121 @@
 # bot/keyboards/builders.py
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardMarkup, KeyboardButton
-from typing import List, Tuple, Optional
+from pydantic import ConfigDict
+from typing import Callable, Dict, Hashable, List, Sequence, Tuple, Optional
+
+# Цвета товара (одинаковы для обуви, одежды, сумок и аксессуаров)
+COLORS = [
+    ("🔴 Красный", "red"),
+    ("⚪ Белый", "white"),
+    ("🎀 Розовый", "pink"),
+    ("🍷 Бордовый", "burgundy"),
+    ("🔵 Синий", "blue"),
+    ("🟡 Жёлтый", "yellow"),
+    ("💙 Голубой", "light_blue"),
+    ("🟣 Фиолетовый", "purple"),
+    ("🟠 Оранжевый", "orange"),
+    ("🌈 Разноцветный", "multicolor"),
+    ("⚫ Чёрный", "black"),
+    ("🟤 Коричневый", "brown"),
+    ("🟢 Зелёный", "green"),
+    ("🔘 Серый", "gray"),
+    ("🥚 Бежевый", "beige"),
+    ("💿 Серебряный", "silver"),
+    ("🌟 Золотой", "gold")
+]
+
+# Для кого предназначен товар
+GENDERS = [
+    ("👩 Женщины", "women"),
+    ("👨 Мужчины", "men"),
+    ("👥 Унисекс", "unisex")
+]
+
+# Материалы сумок
+BAG_MATERIALS = [
+    ("🐮 Натуральная кожа", "natural_leather"),
+    ("👞 Искусственная кожа", "artificial_leather"),
+    ("📦 Другой материал", "other")
+]
+
+# Виды сумок
+BAG_TYPES = [
+    ("👜 Через плечо", "shoulder"),
+    ("🎒 Кросс-боди", "crossbody"),
+    ("⚽ Спортивная", "sport"),
+    ("👛 Клатч", "clutch"),
+    ("💫 Поясная", "waist"),
+    ("🛍️ Шопер", "shopper"),
+    ("🏖️ Пляжная", "beach"),
+    ("👜 С ручками", "with_handles"),
+    ("✨ Аксессуар для сумки", "accessory")
+]
+
+# Размеры обуви (от малых к очень большим)
+SHOE_SIZES = [
+    "36", "36,5", "37", "37,5",
+    "38", "38,5", "39", "39,5",
+    "40", "40,5", "41", "41,5",
+    "42", "42,5", "43", "43,5",
+    "44", "44,5", "45", "45,5",
+    "46", "46,5", "47", "47,5", "48+"
+]
+
+# Размеры одежды согласно требованиям Avito
+CLOTHING_SIZES = [
+    "40 (XXS)", "42 (XS)", "44 (XS/S)", "46 (S)", "48 (M)",
+    "50 (L)", "52 (L/XL)", "54 (XL)", "56 (XXL)", "58 (XXL)",
+    "60 (3XL)", "62 (4XL)", "64 (5XL)", "66 (6XL)", "68 (7XL)",
+    "70 (7XL)", "72 (8XL)", "74 (8XL)", "76 (9XL)", "78 (10XL)",
+    "80 (10XL)", "82+ (10XL+)", "One size", "Без размера"
+]
+
+
+class FrozenInlineKeyboardButton(InlineKeyboardButton):
+    """Кнопка общей клавиатуры: изменить после сборки нельзя"""
+    model_config = ConfigDict(frozen=True)
+
+
+class FrozenInlineKeyboardMarkup(InlineKeyboardMarkup):
+    """Общая для всех пользователей клавиатура: изменить после сборки нельзя"""
+    model_config = ConfigDict(frozen=True)
+
+
+class KeyboardRegistry:
+    """
+    Готовые клавиатуры: каждая собирается один раз и затем отдается всем.
+
+    Ключ описывает все, от чего клавиатура зависит (для материалов - сам список),
+    поэтому при изменении справочника просто собирается новая клавиатура.
+    """
+
+    def __init__(self):
+        self._markups: Dict[Hashable, FrozenInlineKeyboardMarkup] = {}
+
+    def get(self, key: Hashable, build: Callable[[], InlineKeyboardBuilder]) -> FrozenInlineKeyboardMarkup:
+        markup = self._markups.get(key)
+        if markup is None:
+            markup = self.freeze(build())
+            self._markups[key] = markup
+        return markup
+
+    @staticmethod
+    def freeze(builder: InlineKeyboardBuilder) -> FrozenInlineKeyboardMarkup:
+        return FrozenInlineKeyboardMarkup(inline_keyboard=[
+            [FrozenInlineKeyboardButton(**button.model_dump(exclude_none=True)) for button in row]
+            for row in builder.export()
+        ])
+
+    def clear(self):
+        self._markups.clear()
+
+    def __len__(self) -> int:
+        return len(self._markups)
+
+
+# Глобальный реестр клавиатур
+keyboard_registry = KeyboardRegistry()
 
 
 class KeyboardBuilder:
@@ -53,39 +168,41 @@ class KeyboardBuilder:
 
 
 class ProductKeyboards:
-    """Клавиатуры для создания товара"""
+    """Клавиатуры для создания товара (собираются один раз, см. KeyboardRegistry)"""
 
     @staticmethod
-    def get_price_type_keyboard() -> InlineKeyboardBuilder:
+    def get_price_type_keyboard() -> InlineKeyboardMarkup:
         """Клавиатура выбора типа цены"""
         buttons = [
             ("💰 Фиксированная цена", "price_fixed"),
             ("📊 Диапазон цен", "price_range"),
             ("⏩ Пропустить", "price_skip")
         ]
-        return KeyboardBuilder.create_inline_keyboard(buttons, adjust=1)
+        return keyboard_registry.get('price_type', lambda: KeyboardBuilder.create_inline_keyboard(buttons, adjust=1))
 
     @staticmethod
-    def get_contact_methods_keyboard() -> InlineKeyboardBuilder:
+    def get_contact_methods_keyboard() -> InlineKeyboardMarkup:
         """Клавиатура выбора способа связи"""
         buttons = [
-            ("📞 По телефону и в сообщении 💬", "contact_both"),
+            ("📞 По телефону и в сообщении", "contact_both"),
             ("📞 По телефону", "contact_phone"),
             ("💬 В сообщении", "contact_message")
         ]
-        return KeyboardBuilder.create_inline_keyboard(buttons, adjust=1)
+        return keyboard_registry.get('contact_methods',
+                                     lambda: KeyboardBuilder.create_inline_keyboard(buttons, adjust=1))
 
     @staticmethod
-    def get_placement_type_keyboard() -> InlineKeyboardBuilder:
+    def get_placement_type_keyboard() -> InlineKeyboardMarkup:
         """Клавиатура выбора типа размещения"""
         buttons = [
             ("🏙️ По городам", "cities"),
             ("🚇 По станциям метро", "metro")
         ]
-        return KeyboardBuilder.create_inline_keyboard(buttons, adjust=1)
+        return keyboard_registry.get('placement_type',
+                                     lambda: KeyboardBuilder.create_inline_keyboard(buttons, adjust=1))
 
     @staticmethod
-    def get_condition_keyboard() -> InlineKeyboardBuilder:
+    def get_condition_keyboard() -> InlineKeyboardMarkup:
         """Клавиатура выбора состояния товара"""
         buttons = [
             ("🆕 Новое с биркой", "condition_new_with_tag"),
@@ -93,4 +210,61 @@ class ProductKeyboards:
             ("👍 Хорошее", "condition_good"),
             ("✅ Удовлетворительное", "condition_satisfactory")
         ]
-        return KeyboardBuilder.create_inline_keyboard(buttons, adjust=1)
\ No newline at end of file
+        return keyboard_registry.get('condition', lambda: KeyboardBuilder.create_inline_keyboard(buttons, adjust=1))
+
+    @staticmethod
+    def get_sale_type_keyboard() -> InlineKeyboardMarkup:
+        """Клавиатура выбора типа продажи"""
+        buttons = [
+            ("🛒 Товар приобретен на продажу", "saletype_resale"),
+            ("🏭 Товар от производителя", "saletype_manufacturer"),
+            ("👤 Продаю своё", "saletype_personal")
+        ]
+        return keyboard_registry.get('sale_type', lambda: KeyboardBuilder.create_inline_keyboard(buttons, adjust=1))
+
+    @staticmethod
+    def get_shoe_size_keyboard() -> InlineKeyboardMarkup:
+        """Клавиатура размеров обуви"""
+        def build():
+            builder = InlineKeyboardBuilder()
+            for size in SHOE_SIZES:
+                builder.button(text=size, callback_data=f"size_{size}")
+            builder.adjust(4, 4, 4, 4, 5, 2)
+            return builder
+
+        return keyboard_registry.get('shoe_size', build)
+
+    @staticmethod
+    def get_clothing_size_keyboard() -> InlineKeyboardMarkup:
+        """Клавиатура размеров одежды"""
+        buttons = [(size, f"clothing_size_{size}") for size in CLOTHING_SIZES]
+        return keyboard_registry.get('clothing_size',
+                                     lambda: KeyboardBuilder.create_inline_keyboard(buttons, adjust=2))
+
+    @staticmethod
+    def get_color_keyboard(prefix: str, skip_text: Optional[str] = None) -> InlineKeyboardMarkup:
+        """Клавиатура цветов с callback_data '{prefix}_{код}' и, если задан skip_text, кнопкой пропуска"""
+        def build():
+            builder = InlineKeyboardBuilder()
+            for color_name, color_code in COLORS:
+                builder.button(text=color_name, callback_data=f"{prefix}_{color_code}")
+            if skip_text:
+                builder.button(text=skip_text, callback_data=f"{prefix}_skip")
+            builder.adjust(3, 3, 3, 3, 3, 1)
+            return builder
+
+        return keyboard_registry.get(('color', prefix, skip_text), build)
+
+    @staticmethod
+    def get_options_keyboard(prefix: str, options: Sequence[Tuple[str, str]], adjust: int = 1,
+                             skip_text: Optional[str] = None) -> InlineKeyboardMarkup:
+        """Клавиатура вариантов (название, код) с callback_data '{prefix}_{код}'"""
+        options = tuple(options)
+
+        def build():
+            buttons = [(name, f"{prefix}_{code}") for name, code in options]
+            if skip_text:
+                buttons.append((skip_text, f"{prefix}_skip"))
+            return KeyboardBuilder.create_inline_keyboard(buttons, adjust=adjust)
+
+        return keyboard_registry.get(('options', prefix, options, adjust, skip_text), build)
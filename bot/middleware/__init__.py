@@ -1,3 +1,4 @@
-from .album_middleware import AlbumMiddleware
+from .album_middleware import AlbumMiddleware, AlbumPhoto
+from .metrics_middleware import HandlerMetricsMiddleware, UpdateMetricsMiddleware
 
-__all__ = ['AlbumMiddleware']
\ No newline at end of file
+__all__ = ['AlbumMiddleware', 'AlbumPhoto', 'HandlerMetricsMiddleware', 'UpdateMetricsMiddleware']
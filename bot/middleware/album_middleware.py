@@ -1,14 +1,91 @@
 # bot/middlewares/album_middleware.py
 from aiogram import BaseMiddleware
 from aiogram.types import Message
-from typing import Dict, Any, Callable, Awaitable
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Awaitable, List, NamedTuple, Optional, Set
 import asyncio
+import time
+
+# Больше фото в одном альбоме Telegram не присылает
+MAX_ALBUM_SIZE = 10
+
+
+class AlbumPhoto(NamedTuple):
+    """Фото альбома: только то, что нужно хендлерам (самый большой размер)"""
+    file_id: str
+    file_unique_id: str
+    width: int
+    height: int
+    file_size: Optional[int]
+
+    @classmethod
+    def from_message(cls, message: Message) -> 'AlbumPhoto':
+        largest = message.photo[-1]
+        return cls(largest.file_id, largest.file_unique_id, largest.width, largest.height, largest.file_size)
+
+
+class PendingAlbum:
+    """Альбом, который еще собирается; сообщение хранится только первое - на него отвечает хендлер"""
+
+    def __init__(self, message: Message, handler: Callable, data: Dict[str, Any]):
+        self.message = message
+        self.handler = handler
+        self.data = data
+        self.photos: List[AlbumPhoto] = []
+        self.started_at = time.monotonic()
+        self.last_message_at = self.started_at
+        self.task: Optional[asyncio.Task] = None
+        # Взводится при каждом новом фото - сбрасывает таймер ожидания
+        self.updated = asyncio.Event()
+
+    def add(self, message: Message):
+        self.photos.append(AlbumPhoto.from_message(message))
+        self.last_message_at = time.monotonic()
+        self.updated.set()
 
 
 class AlbumMiddleware(BaseMiddleware):
-    def __init__(self, latency: float = 1.0):
+    """
+    Собирает фото одного media_group_id и передает их хендлеру одним вызовом (data['album']).
+
+    Альбом отправляется в хендлер, когда:
+    - после последнего фото прошло latency секунд (таймер сбрасывается на каждом фото);
+    - набралось expected_size фото (дальше ждать нечего);
+    - с первого фото прошло max_wait секунд.
+
+    Память ограничена: не больше max_albums альбомов и max_photos фото в сборе,
+    альбомы старше ttl удаляются. Фото сверх лимитов отбрасываются, а пользователь
+    один раз на альбом получает просьбу повторить позже.
+    """
+
+    # Как часто проверять зависшие альбомы
+    SWEEP_INTERVAL = 10.0
+
+    def __init__(self, latency: float = 1.0, max_wait: float = 5.0, max_albums: int = 1000,
+                 max_photos: int = 5000, ttl: float = 60.0, expected_size: int = MAX_ALBUM_SIZE):
         self.latency = latency
-        self.albums: Dict[str, Dict[str, Any]] = {}
+        self.max_wait = max_wait
+        self.max_albums = max_albums
+        self.max_photos = max_photos
+        self.ttl = ttl
+        self.expected_size = expected_size
+        self.albums: Dict[str, PendingAlbum] = {}
+        self.pending_photos = 0
+        # Ссылки на задачи сбора, чтобы их не удалил сборщик мусора
+        self._tasks: Set[asyncio.Task] = set()
+        # Отклоненные альбомы (чтобы предупредить пользователя один раз)
+        self._rejected: OrderedDict = OrderedDict()
+        self._last_sweep = time.monotonic()
+        self.stats = {
+            'albums': 0,
+            'complete': 0,
+            'debounced': 0,
+            'max_wait': 0,
+            'rejected': 0,
+            'expired': 0,
+            'total_wait': 0.0,
+            'longest_wait': 0.0,
+        }
 
     async def __call__(
             self,
@@ -25,56 +102,110 @@ class AlbumMiddleware(BaseMiddleware):
         if not event.media_group_id:
             return await handler(event, data)
 
+        self._sweep()
+
         media_group_id = event.media_group_id
+        album = self.albums.get(media_group_id)
 
-        # Если это новый альбом
-        if media_group_id not in self.albums:
-            self.albums[media_group_id] = {
-                'messages': [event],
-                'handler_called': False
-            }
-
-            # Создаем задачу для обработки альбома через latency секунд
-            asyncio.create_task(
-                self._process_album(media_group_id, handler, data)
-            )
-        else:
-            # Добавляем сообщение в существующий альбом
-            self.albums[media_group_id]['messages'].append(event)
+        if self.pending_photos >= self.max_photos or (album is None and len(self.albums) >= self.max_albums):
+            # Обновление подтверждаем, а фото отбрасываем
+            await self._reject(event)
+            return None
 
-        # Никогда не вызываем хендлер сразу для отдельных сообщений альбома
-        return None
+        if album is None:
+            album = PendingAlbum(event, handler, data)
+            self.albums[media_group_id] = album
+            album.task = asyncio.create_task(self._process_album(media_group_id, album))
+            self._tasks.add(album.task)
+            album.task.add_done_callback(self._tasks.discard)
 
-    async def _process_album(self, media_group_id: str, handler: Callable, data: Dict[str, Any]):
-        """Обработка альбома после задержки"""
-        try:
-            # Ждем указанное время для сбора всех сообщений альбома
-            await asyncio.sleep(self.latency)
+        album.add(event)
+        self.pending_photos += 1
 
-            if media_group_id not in self.albums:
-                return
+        # Никогда не вызываем хендлер сразу для отдельных сообщений альбома
+        return None
 
-            album_data = self.albums[media_group_id]
-            messages = album_data['messages']
+    async def _reject(self, event: Message):
+        self.stats['rejected'] += 1
+        if event.media_group_id in self._rejected:
+            return
 
-            if not messages or album_data['handler_called']:
-                return
+        self._rejected[event.media_group_id] = True
+        while len(self._rejected) > self.max_albums:
+            self._rejected.popitem(last=False)
 
-            # Помечаем как обработанный
-            album_data['handler_called'] = True
+        try:
+            await event.answer("⚠️ Сейчас слишком много загрузок, альбом не принят. Отправьте фото еще раз чуть позже.")
+        except Exception as e:
+            print(f"Error rejecting album: {e}")
+
+    def _forget(self, media_group_id: str, album: PendingAlbum):
+        # Новые фото этой группы пойдут уже в новый альбом
+        if self.albums.get(media_group_id) is album:
+            del self.albums[media_group_id]
+            self.pending_photos -= len(album.photos)
+
+    def _sweep(self):
+        """Удаляет альбомы, которые собираются дольше ttl (например, если задача сбора упала)"""
+        now = time.monotonic()
+        if now - self._last_sweep < self.SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+
+        expired = [(media_group_id, album) for media_group_id, album in self.albums.items()
+                   if now - album.started_at > self.ttl]
+        for media_group_id, album in expired:
+            self.stats['expired'] += 1
+            self._forget(media_group_id, album)
+            if album.task is not None:
+                album.task.cancel()
+
+    async def _wait_album(self, album: PendingAlbum) -> str:
+        """Ждет окончания альбома и возвращает причину"""
+        deadline = album.started_at + self.max_wait
+        while True:
+            if len(album.photos) >= self.expected_size:
+                return 'complete'
+
+            now = time.monotonic()
+            if now >= deadline:
+                return 'max_wait'
+
+            quiet_until = album.last_message_at + self.latency
+            if now >= quiet_until:
+                return 'debounced'
+
+            album.updated.clear()
+            try:
+                await asyncio.wait_for(album.updated.wait(), timeout=min(quiet_until, deadline) - now)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _process_album(self, media_group_id: str, album: PendingAlbum):
+        """Обработка альбома после того, как он собран"""
+        try:
+            reason = await self._wait_album(album)
+        finally:
+            self._forget(media_group_id, album)
 
-            # Берем первое сообщение альбома для обработки
-            first_message = messages[0]
+        wait_time = time.monotonic() - album.started_at
+        self.stats['albums'] += 1
+        self.stats[reason] += 1
+        self.stats['total_wait'] += wait_time
+        self.stats['longest_wait'] = max(self.stats['longest_wait'], wait_time)
 
+        try:
             # Передаем альбом через data, а не через атрибут сообщения
-            data['album'] = messages
-
-            # Передаем в хендлер
-            await handler(first_message, data)
-
+            album.data['album'] = album.photos
+            # Берем первое сообщение альбома для обработки
+            await album.handler(album.message, album.data)
         except Exception as e:
             print(f"Error processing album: {e}")
-        finally:
-            # Удаляем альбом из кэша
-            if media_group_id in self.albums:
-                del self.albums[media_group_id]
\ No newline at end of file
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Счетчики альбомов и среднее/максимальное время ожидания"""
+        metrics = dict(self.stats)
+        metrics['pending'] = len(self.albums)
+        metrics['pending_photos'] = self.pending_photos
+        metrics['average_wait'] = self.stats['total_wait'] / self.stats['albums'] if self.stats['albums'] else 0.0
+        return metrics
@@ -0,0 +1,60 @@
+# bot/middleware/metrics_middleware.py
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from typing import Any, Awaitable, Callable, Dict
+import time
+
+from bot.services.metrics import metrics
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Внешний middleware обновлений: число по типу и состоянию FSM, общее время, ошибки"""
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any]
+    ) -> Any:
+        labels = {'type': event.event_type, 'state': data.get('raw_state') or 'none'}
+        metrics.inc('bot_updates_total', labels)
+
+        started_at = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            metrics.inc('bot_update_errors_total', {'type': event.event_type})
+            raise
+        finally:
+            metrics.observe('bot_update_seconds', time.perf_counter() - started_at, {'type': event.event_type})
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Внутренний middleware: время и ошибки каждого хендлера"""
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        labels = {'handler': self._get_handler_name(data)}
+
+        started_at = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            metrics.inc('bot_handler_errors_total', labels)
+            raise
+        finally:
+            metrics.observe('bot_handler_seconds', time.perf_counter() - started_at, labels)
+
+    @staticmethod
+    def _get_handler_name(data: Dict[str, Any]) -> str:
+        # Для таблицы callback-маршрутов интересен найденный хендлер, а не общий диспетчер
+        route = data.get('callback_route')
+        handler_object = route.handler if route is not None else data.get('handler')
+        if handler_object is None:
+            return 'unknown'
+        callback = handler_object.callback
+        return getattr(callback, '__qualname__', None) or repr(callback)
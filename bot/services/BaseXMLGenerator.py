@@ -1,10 +1,10 @@
 # bot/services/xml_generator.py
-import os
-import shutil
+import asyncio
+import hashlib
 import tempfile
 import xml.etree.ElementTree as ET
 import zipfile
-from io import BytesIO
+from typing import BinaryIO, Optional
 from xml.dom import minidom
 from abc import ABC, abstractmethod
 from datetime import datetime
@@ -12,16 +12,26 @@ import random
 
 import requests
 
+import config
+from bot.services import export_trace
 from bot.services.category_service import CategoryService
+from bot.services.download_policy import ExportReport
 
 
 class BaseXMLGenerator(ABC):
     """Базовый класс для генерации XML"""
 
-    def __init__(self, image_service=None):
+    # Расширения уже сжатых файлов, которые кладем в архив без сжатия
+    STORED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+    def __init__(self, image_service=None, image_pipeline=None, image_hosting=None):
         self.format_version = "3"
         self.target = "Avito.ru"
         self.image_service = image_service
+        self.image_pipeline = image_pipeline
+        self.image_hosting = image_hosting
+        # Отчет о скачивании изображений за последний экспорт
+        self.last_export_report: Optional[ExportReport] = None
 
     def _add_delivery_to_ad(self, ad: ET.Element, product: dict):
         """Добавление информации о доставке в объявление"""
@@ -129,81 +139,68 @@ class BaseXMLGenerator(ABC):
 
         # Добавляем информацию о количестве объявлений
         ET.SubElement(root, "TotalAds").text = str(ad_count)
+        export_trace.annotate(ads=ad_count)
 
         # Конвертируем в красивый XML
-        rough_string = ET.tostring(root, encoding='utf-8')
-        reparsed = minidom.parseString(rough_string)
-        return reparsed.toprettyxml(indent="  ")
+        with export_trace.span('xml_serialize'):
+            rough_string = ET.tostring(root, encoding='utf-8')
+        with export_trace.span('xml_pretty', bytes=len(rough_string)):
+            reparsed = minidom.parseString(rough_string)
+            return reparsed.toprettyxml(indent="  ")
 
-    async def generate_zip_archive(self, products: list) -> BytesIO:
+    async def generate_zip_archive(self, products: list) -> BinaryIO:
         """Генерация ZIP архива с XML и изображениями"""
-        temp_dir = tempfile.mkdtemp()
+        zip_buffer = self._create_archive_buffer()
+        report = ExportReport()
+        self.last_export_report = report
 
         try:
-            zip_buffer = BytesIO()
-
             with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                # Сначала собираем все уникальные изображения для архива
-                all_images_map = {}  # {image_url: filename}
-                image_counter = 1
-
-                # Проходим по всем товарам и собираем изображения
-                for product in products:
-                    images = self._get_product_images_for_archive(product)
-                    for img_url in images:
-                        if img_url and img_url not in all_images_map:
-                            filename = f"{image_counter}.jpg"
-                            all_images_map[img_url] = filename
-                            image_counter += 1
-
-                print(f"📸 Всего уникальных изображений для архива: {len(all_images_map)}")
-
-                # Скачиваем и добавляем изображения в архив
-                successful_downloads = 0
-                for img_url, filename in all_images_map.items():
-                    try:
-                        image_path = os.path.join(temp_dir, filename)
-
-                        print(f"⬇️ Скачиваем изображение {filename}: {img_url[:50]}...")
-
-                        if self.image_service:
-                            image_content = await self.image_service.process_image_for_export(img_url)
-                            if image_content:
-                                with open(image_path, 'wb') as f:
-                                    f.write(image_content)
-
-                                zip_file.write(image_path, filename)
-                                successful_downloads += 1
+                image_refs = self._collect_image_refs(products)
+                print(f"📸 Всего уникальных ссылок на изображения: {len(image_refs)}")
 
+                # Скачиваем изображения параллельно и добавляем в архив по мере готовности.
+                # Одинаковые по содержимому файлы (например, повторно отправленное фото
+                # с новым file_id) попадают в архив один раз.
+                all_images_map = {}  # {image_url: filename}
+                filenames_by_hash = {}  # {sha256: filename}
+                duplicate_images = 0
+
+                with export_trace.span('images', count=len(image_refs)):
+                    async for img_url, image_content in self._download_images(image_refs, report):
+                        content_hash = hashlib.sha256(image_content).hexdigest()
+                        filename = filenames_by_hash.get(content_hash)
+
+                        if filename is None:
+                            filename = f"{len(filenames_by_hash) + 1}.jpg"
+                            filenames_by_hash[content_hash] = filename
+                            with export_trace.span('zip_write', bytes=len(image_content)):
+                                zip_file.writestr(filename, image_content,
+                                                  compress_type=self._get_compress_type(filename))
                         else:
-                            # Логика для URL без image_service
-                            if self._is_url(img_url):
-                                response = requests.get(img_url, timeout=30, stream=True)
-                                if response.status_code == 200:
-                                    with open(image_path, 'wb') as f:
-                                        for chunk in response.iter_content(chunk_size=8192):
-                                            f.write(chunk)
-
-                                    zip_file.write(image_path, filename)
-                                    successful_downloads += 1
-
-                                else:
-                                    print(f"❌ Ошибка скачивания {filename}: статус {response.status_code}")
+                            duplicate_images += 1
 
-                    except Exception as e:
-                        print(f"❌ Ошибка при обработке изображения {filename}: {e}")
-                        continue
+                        all_images_map[img_url] = filename
 
-                print(f"✅ В архив добавлено {successful_downloads} изображений")
+                successful_downloads = len(filenames_by_hash)
+                print(f"✅ В архив добавлено {successful_downloads} изображений "
+                      f"(дубликатов по содержимому: {duplicate_images})")
+                print(f"📊 Изображения - {report.summary()}")
 
                 # Теперь генерируем XML с правильными ссылками на изображения
-                xml_content = self.generate_xml_content(products, all_images_map)
-                zip_file.writestr('avito.xml', xml_content.encode('utf-8'))
+                with export_trace.span('xml'):
+                    xml_content = self.generate_xml_content(products, all_images_map)
+                xml_bytes = xml_content.encode('utf-8')
+                export_trace.add('xml_bytes', len(xml_bytes))
+                with export_trace.span('zip_write', bytes=len(xml_bytes)):
+                    zip_file.writestr('avito.xml', xml_bytes, compress_type=self._get_compress_type('avito.xml'))
 
                 # README - исправленный вызов
-                readme_content = self._generate_readme(products, successful_downloads)
-                zip_file.writestr('README.txt', readme_content.encode('utf-8'))
+                readme_content = self._generate_readme(products, successful_downloads, report)
+                zip_file.writestr('README.txt', readme_content.encode('utf-8'),
+                                  compress_type=self._get_compress_type('README.txt'))
 
+            export_trace.add('archive_bytes', zip_buffer.tell())
             zip_buffer.seek(0)
             return zip_buffer
 
@@ -211,12 +208,143 @@ class BaseXMLGenerator(ABC):
             print(f"❌ Критическая ошибка при создании архива: {e}")
             import traceback
             traceback.print_exc()
+            zip_buffer.close()
             return await self._create_fallback_zip(products)
-        finally:
-            shutil.rmtree(temp_dir, ignore_errors=True)
 
-    def _generate_readme(self, products: list, image_count: int) -> str:
+    async def generate_hosted_xml(self, products: list) -> str:
+        """
+        Генерация XML, в котором изображения ссылаются на внешний хостинг (<Image url=...>).
+        Уже опубликованные изображения повторно не скачиваются.
+        """
+        report = ExportReport()
+        self.last_export_report = report
+
+        image_refs = self._collect_image_refs(products)
+        hosted_images_map = {}  # {image_ref: url}
+        missing_refs = []
+
+        for img_url in image_refs:
+            hosted_url = self.image_hosting.get_published_url(img_url)
+            if hosted_url:
+                hosted_images_map[img_url] = hosted_url
+                report.record_cache_hit(img_url)
+            else:
+                missing_refs.append(img_url)
+        export_trace.add('hosted_cache_hits', len(hosted_images_map))
+
+        print(f"📸 Изображений: {len(image_refs)}, уже опубликовано: {len(hosted_images_map)}, "
+              f"нужно загрузить: {len(missing_refs)}")
+
+        with export_trace.span('images', count=len(missing_refs)):
+            async for img_url, image_content in self._download_images(missing_refs, report):
+                try:
+                    with export_trace.span('publish', bytes=len(image_content)):
+                        hosted_images_map[img_url] = await self.image_hosting.publish(img_url, image_content)
+                except Exception as e:
+                    print(f"❌ Ошибка публикации изображения {img_url[:50]}: {e}")
+                    report.record_skip(img_url, str(e))
+
+        await self.image_hosting.save_index()
+        print(f"📊 Изображения - {report.summary()}")
+
+        with export_trace.span('xml'):
+            return self.generate_xml_content(products, hosted_images_map)
+
+    def _collect_image_refs(self, products: list) -> list:
+        """Уникальные ссылки на изображения всех товаров в исходном порядке"""
+        image_refs = []
+        seen_refs = set()
+
+        for product in products:
+            for img_url in self._get_product_images_for_archive(product):
+                if img_url and img_url not in seen_refs:
+                    seen_refs.add(img_url)
+                    image_refs.append(img_url)
+
+        return image_refs
+
+    async def _download_images(self, image_refs: list, report: ExportReport):
+        """Параллельно скачивает изображения и отдает (ссылка, содержимое) по мере готовности"""
+        semaphore = asyncio.Semaphore(config.EXPORT_IMAGE_CONCURRENCY)
+
+        async def fetch(img_url: str):
+            async with semaphore:
+                return img_url, await self._fetch_image_for_archive(img_url, report)
+
+        tasks = [fetch(img_url) for img_url in image_refs]
+        for next_image in asyncio.as_completed(tasks):
+            img_url, image_content = await next_image
+            if image_content:
+                yield img_url, image_content
+
+    async def _fetch_image_for_archive(self, img_url: str, report: Optional[ExportReport] = None) -> Optional[bytes]:
+        """Скачивает изображение и при необходимости нормализует его"""
+        report = report or ExportReport()
+        with export_trace.span('image', ref=img_url[:40]):
+            return await self._fetch_traced_image(img_url, report)
+
+    async def _fetch_traced_image(self, img_url: str, report: ExportReport) -> Optional[bytes]:
+        try:
+            print(f"⬇️ Скачиваем изображение: {img_url[:50]}...")
+
+            if self.image_service:
+                # image_service сам учитывает повторы, пропуски и кэш в отчете
+                image_content = await self.image_service.process_image_for_export(img_url, report=report)
+            elif self._is_url(img_url):
+                # Логика для URL без image_service
+                image_content = await asyncio.to_thread(self._download_url_sync, img_url)
+                if image_content:
+                    report.record_download(img_url)
+                else:
+                    report.record_skip(img_url, "не удалось скачать")
+            else:
+                image_content = None
+                report.record_skip(img_url, "нет сервиса для загрузки из Telegram")
+
+            if image_content and self.image_pipeline:
+                with export_trace.span('normalize', bytes=len(image_content)):
+                    image_content = await self.image_pipeline.process(image_content)
+
+            if image_content:
+                export_trace.annotate(bytes=len(image_content))
+                export_trace.add('images')
+                export_trace.add('image_bytes', len(image_content))
+            return image_content
+
+        except Exception as e:
+            print(f"❌ Ошибка при обработке изображения {img_url[:50]}: {e}")
+            report.record_skip(img_url, str(e))
+            return None
+
+    def _download_url_sync(self, img_url: str) -> Optional[bytes]:
+        """Синхронное скачивание изображения по URL (выполняется в потоке)"""
+        response = requests.get(img_url, timeout=30)
+        if response.status_code == 200:
+            return response.content
+
+        print(f"❌ Ошибка скачивания {img_url[:50]}: статус {response.status_code}")
+        return None
+
+    def _create_archive_buffer(self) -> BinaryIO:
+        """Создает буфер архива, который переносится на диск при превышении порога"""
+        return tempfile.SpooledTemporaryFile(max_size=config.ZIP_SPOOL_MAX_SIZE, mode='w+b')
+
+    def _get_compress_type(self, filename: str) -> int:
+        """Возвращает способ сжатия для файла архива"""
+        # JPEG/PNG уже сжаты - повторное сжатие только тратит CPU
+        if filename.lower().endswith(self.STORED_EXTENSIONS):
+            return zipfile.ZIP_STORED
+        return zipfile.ZIP_DEFLATED
+
+    def _generate_readme(self, products: list, image_count: int, report: Optional[ExportReport] = None) -> str:
         """Генерирует README файл"""
+        readme = self._generate_readme_header(products, image_count)
+        if report is not None:
+            readme += "\n\n" + report.to_text()
+        return readme
+
+    def _generate_readme_header(self, products: list, image_count: int) -> str:
+        """Основной текст README"""
         return f"""Avito Export Archive
     Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
     Total products: {len(products)}
@@ -238,9 +366,9 @@ class BaseXMLGenerator(ABC):
             """Проверяет, является ли строка URL"""
             return file_reference.startswith(('http://', 'https://'))
 
-    async def _create_fallback_zip(self, products: list) -> BytesIO:
+    async def _create_fallback_zip(self, products: list) -> BinaryIO:
         """Создает архив только с XML (резервный вариант)"""
-        zip_buffer = BytesIO()
+        zip_buffer = self._create_archive_buffer()
 
         with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
             # Генерируем XML без images_map
@@ -477,11 +605,20 @@ class BaseXMLGenerator(ABC):
             return
 
         images_elem = ET.SubElement(ad, "Images")
+        added_filenames = set()
 
         for i, img_url in enumerate(images_for_ad, 1):
             if img_url in images_map:
                 filename = images_map[img_url]
-                ET.SubElement(images_elem, "Image", name=filename)
+                # Разные ссылки могут указывать на один файл после дедупликации
+                if filename in added_filenames:
+                    continue
+                added_filenames.add(filename)
+                if self._is_url(filename):
+                    # Изображение на внешнем хостинге
+                    ET.SubElement(images_elem, "Image", url=filename)
+                else:
+                    ET.SubElement(images_elem, "Image", name=filename)
                 print(f"   ✅ Добавлено изображение {i}: {filename}")
             else:
                 print(f"   ❌ Изображение не найдено в архиве: {img_url[:50]}...")
@@ -1,5 +1,13 @@
 # bot/services/XMLGeneratorFactory.py
 from bot.services.BaseXMLGenerator import BaseXMLGenerator
+from bot.services.category_service import (
+    CategoryService,
+    GENERATOR_ACCESSORIES,
+    GENERATOR_BAGS,
+    GENERATOR_CLOTHING,
+    GENERATOR_MEN_SHOES,
+    GENERATOR_WOMEN_SHOES,
+)
 
 class XMLGeneratorFactory:
     """Фабрика для создания генераторов XML"""
@@ -9,59 +17,34 @@ class XMLGeneratorFactory:
         """Получить генератор по названию категории"""
         if not category_name:
             print("⚠️ Категория не указана, используем DefaultXMLGenerator")
-            from bot.services.DefaultXMLGenerator import DefaultXMLGenerator
-            return DefaultXMLGenerator()
 
-        category_lower = category_name.lower()
-        print(f"🔍 Определение генератора для категории: '{category_name}'")
+        # Тот же вид товара, по которому мастер выбирал шаги
+        kind = CategoryService.get_category_kind(category_name)
+        return XMLGeneratorFactory.create_generator(kind.generator)
 
-        # Аксессуары
-        if any(keyword in category_lower for keyword in ["аксессуар", "аксесуар"]):
-            print("✅ Используем AccessoriesXMLGenerator")
+    @staticmethod
+    def create_generator(generator_kind: str) -> BaseXMLGenerator:
+        """Создать генератор по виду из классификации категорий"""
+        if generator_kind == GENERATOR_ACCESSORIES:
             from bot.services.AccessoriesXMLGenerator import AccessoriesXMLGenerator
             return AccessoriesXMLGenerator()
 
-        # Сумки, рюкзаки, чемоданы
-        elif any(keyword in category_lower for keyword in ["сумк", "рюкзак", "чемодан", "портфел", "борсетк"]):
-            print("✅ Используем BagsXMLGenerator")
+        elif generator_kind == GENERATOR_BAGS:
             from bot.services.BagsXMLGenerator import BagsXMLGenerator
             return BagsXMLGenerator()
 
-        # Мужская обувь
-        elif "мужская обувь" in category_lower:
-            print("✅ Используем MenShoesXMLGenerator")
+        elif generator_kind == GENERATOR_MEN_SHOES:
             from bot.services.MenShoesXMLGenerator import MenShoesXMLGenerator
             return MenShoesXMLGenerator()
 
-        # Женская обувь
-        elif "женская обувь" in category_lower:
-            print("✅ Используем WomenShoesXMLGenerator")
+        elif generator_kind == GENERATOR_WOMEN_SHOES:
             from bot.services.WomenShoesXMLGenerator import WomenShoesXMLGenerator
             return WomenShoesXMLGenerator()
 
-        # Одежда
-        elif any(keyword in category_lower for keyword in ["одежда", "мужская одежда", "женская одежда"]):
-            print("✅ Используем ClothingXMLGenerator")
+        elif generator_kind == GENERATOR_CLOTHING:
             from bot.services.ClothingXMLGenerator import ClothingXMLGenerator
             return ClothingXMLGenerator()
 
-        # Обувь (общее)
-        elif "обувь" in category_lower:
-            # Определяем мужская или женская по контексту
-            if "мужск" in category_lower:
-                print("✅ Используем MenShoesXMLGenerator (по контексту)")
-                from bot.services.MenShoesXMLGenerator import MenShoesXMLGenerator
-                return MenShoesXMLGenerator()
-            elif "женск" in category_lower:
-                print("✅ Используем WomenShoesXMLGenerator (по контексту)")
-                from bot.services.WomenShoesXMLGenerator import WomenShoesXMLGenerator
-                return WomenShoesXMLGenerator()
-            else:
-                print("⚠️ Используем DefaultXMLGenerator для неопределенной обуви")
-                from bot.services.DefaultXMLGenerator import DefaultXMLGenerator
-                return DefaultXMLGenerator()
-
         else:
-            print(f"⚠️ Используем DefaultXMLGenerator (категория '{category_name}' не распознана)")
             from bot.services.DefaultXMLGenerator import DefaultXMLGenerator
-            return DefaultXMLGenerator()
\ No newline at end of file
+            return DefaultXMLGenerator()
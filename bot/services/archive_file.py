@@ -0,0 +1,19 @@
+# bot/services/archive_file.py
+from typing import AsyncGenerator, BinaryIO
+
+from aiogram import Bot
+from aiogram.types.input_file import DEFAULT_CHUNK_SIZE, InputFile
+
+
+class SpooledInputFile(InputFile):
+    """Файл для отправки в Telegram напрямую из открытого файлового объекта"""
+
+    def __init__(self, file: BinaryIO, filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.file = file
+
+    async def read(self, bot: Bot) -> AsyncGenerator[bytes, None]:
+        """Читает файл по частям, не создавая копию всего архива в памяти"""
+        self.file.seek(0)
+        while chunk := self.file.read(self.chunk_size):
+            yield chunk
@@ -0,0 +1,102 @@
+# bot/services/brand_benchmark.py
+"""
+Бенчмарк поиска брендов: точные, префиксные и запросы с опечатками.
+
+Запуск:
+    python -m bot.services.brand_benchmark
+    python -m bot.services.brand_benchmark --brands 50000 --queries 500
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Callable, List
+
+from bot.services.brand_service import BrandCatalog, BrandService
+
+SUFFIXES = ["Kids", "Sport", "Home", "Studio", "Jeans", "Collection", "Original", "Basic", "Lab", "Line"]
+
+
+def build_brand_list(target_size: int) -> List[str]:
+    """Бренды из brands.xml, дополненные синтетическими до target_size"""
+    brands = BrandService.load_brands()
+    result = list(brands)
+    seen = {brand.casefold() for brand in result}
+
+    rng = random.Random(42)
+    while len(result) < target_size:
+        brand = f"{rng.choice(brands)} {rng.choice(SUFFIXES)} {rng.randint(1, 999)}"
+        if brand.casefold() not in seen:
+            seen.add(brand.casefold())
+            result.append(brand)
+
+    return result
+
+
+def make_typo(text: str, rng: random.Random) -> str:
+    """Одна случайная опечатка: перестановка, пропуск или замена буквы"""
+    if len(text) < 3:
+        return text
+    position = rng.randrange(1, len(text) - 1)
+    kind = rng.choice(("swap", "delete", "replace"))
+    if kind == "swap":
+        return text[:position] + text[position + 1] + text[position] + text[position + 2:]
+    if kind == "delete":
+        return text[:position] + text[position + 1:]
+    return text[:position] + rng.choice("aeiouklmnrst") + text[position + 1:]
+
+
+def measure(search: Callable[[str], List[str]], queries: List[str]) -> dict:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        'mean': statistics.mean(timings),
+        'p95': timings[int(len(timings) * 0.95) - 1],
+        'max': timings[-1],
+    }
+
+
+def run(brand_count: int, query_count: int, limit: int = 10):
+    rng = random.Random(7)
+    brands = build_brand_list(brand_count)
+
+    start = time.perf_counter()
+    catalog = BrandCatalog(brands)
+    catalog.search_fuzzy("warmup", limit)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    # Короткие реальные названия - по ним обычно и ищут
+    sample = rng.sample([brand for brand in brands[:brand_count] if 4 <= len(brand) <= 20], query_count)
+
+    cases = {
+        'exact (is_valid)': (lambda q: [q] if q in catalog else [], sample),
+        'prefix': (lambda q: catalog.search(q, limit), [brand[:3] for brand in sample]),
+        'misspelled': (lambda q: catalog.search(q, limit), [make_typo(brand, rng) for brand in sample]),
+    }
+
+    print(f"Брендов: {len(brands)}, запросов в группе: {query_count}, индекс построен за {build_ms:.0f} мс")
+    print(f"{'Запросы':<20}{'mean, мс':>10}{'p95, мс':>10}{'max, мс':>10}")
+    for name, (search, queries) in cases.items():
+        stats = measure(search, queries)
+        print(f"{name:<20}{stats['mean']:>10.3f}{stats['p95']:>10.3f}{stats['max']:>10.3f}")
+
+    # Доля опечаток, для которых исходный бренд оказался в выдаче
+    found = sum(1 for brand in sample if brand in catalog.search(make_typo(brand, rng), limit))
+    print(f"Опечатки: исходный бренд найден в {found}/{len(sample)} запросах")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк поиска брендов")
+    parser.add_argument('--brands', type=int, default=30000, help="Размер каталога")
+    parser.add_argument('--queries', type=int, default=300, help="Запросов в каждой группе")
+    args = parser.parse_args()
+    run(args.brands, args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,132 @@
 # bot/services/brand_service.py
-from typing import List
+import bisect
+from typing import Dict, List, Optional
 import xml.etree.ElementTree as ET
 import re
 
 from aiogram.types import Message
 
+from bot.services.fuzzy_search import TrigramIndex
+from bot.services.reference_data import reference_data
+
+
+class BrandCatalog:
+    """Неизменяемый индекс брендов: точная проверка, поиск по префиксу и подстроке"""
+
+    # Разделитель названий в строке для поиска подстрок (не встречается в названиях)
+    SEPARATOR = "\x00"
+
+    def __init__(self, brands: List[str]):
+        self.brands = brands
+
+        # Точная проверка: casefold -> каноническое название
+        self.by_key: Dict[str, str] = {}
+        for brand in brands:
+            self.by_key.setdefault(self.normalize(brand), brand)
+
+        # Поиск по префиксу: отсортированные ключи и параллельный массив названий
+        sorted_pairs = sorted((self.normalize(brand), brand) for brand in brands)
+        self.sorted_keys = [key for key, _ in sorted_pairs]
+        self.sorted_brands = [brand for _, brand in sorted_pairs]
+
+        # Поиск подстроки: все ключи в одной строке + смещения начала каждого названия
+        keys = [self.normalize(brand) for brand in brands]
+        self.offsets = []
+        position = 0
+        for key in keys:
+            self.offsets.append(position)
+            position += len(key) + 1
+        self.haystack = self.SEPARATOR.join(keys)
+
+        # Индекс триграмм для нечеткого поиска строится при первом обращении
+        self._trigram_index: Optional[TrigramIndex] = None
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return text.strip().casefold()
+
+    def get_canonical(self, brand: str) -> Optional[str]:
+        return self.by_key.get(self.normalize(brand))
+
+    def __contains__(self, brand: str) -> bool:
+        return self.normalize(brand) in self.by_key
+
+    def search_prefix(self, query: str, limit: int = 10) -> List[str]:
+        """Бренды, начинающиеся с query, в алфавитном порядке"""
+        key = self.normalize(query)
+        start = bisect.bisect_left(self.sorted_keys, key)
+
+        result = []
+        for i in range(start, len(self.sorted_keys)):
+            if len(result) >= limit or not self.sorted_keys[i].startswith(key):
+                break
+            result.append(self.sorted_brands[i])
+        return result
+
+    def search_substring(self, query: str, limit: int = 10) -> List[str]:
+        """Бренды, содержащие query, в порядке файла"""
+        key = self.normalize(query)
+        if not key:
+            return self.brands[:limit]
+
+        result = []
+        last_index = -1
+        position = self.haystack.find(key)
+        while position != -1 and len(result) < limit:
+            index = bisect.bisect_right(self.offsets, position) - 1
+            if index != last_index:
+                result.append(self.brands[index])
+                last_index = index
+            # Продолжаем со следующего названия
+            next_start = self.offsets[index + 1] if index + 1 < len(self.offsets) else len(self.haystack)
+            position = self.haystack.find(key, next_start)
+        return result
+
+    def build_fuzzy_index(self):
+        """Строит индекс нечеткого поиска заранее (например, в фоновом потоке)"""
+        if self._trigram_index is None:
+            self._trigram_index = TrigramIndex(self.brands)
+
+    def search_fuzzy(self, query: str, limit: int = 10) -> List[str]:
+        """Бренды, похожие на query с учетом опечаток и транслитерации"""
+        self.build_fuzzy_index()
+        return [self.brands[index] for index, _ in self._trigram_index.search(query, limit)]
+
+    def search(self, query: str, limit: int = 10) -> List[str]:
+        """Сначала совпадения по префиксу, затем по подстроке, затем нечеткие"""
+        result = self.search_prefix(query, limit)
+        seen = set(result)
+
+        for search in (self.search_substring, self.search_fuzzy):
+            if len(result) >= limit:
+                break
+            for brand in search(query, limit):
+                if brand not in seen:
+                    seen.add(brand)
+                    result.append(brand)
+                    if len(result) >= limit:
+                        break
+        return result
+
 
 class BrandService:
     """Сервис для работы с брендами"""
 
+    BRANDS_FILE = 'brands.xml'
+
+    @staticmethod
+    def get_catalog() -> BrandCatalog:
+        """Индекс брендов из реестра справочников"""
+        return reference_data.get('brands')
+
     @staticmethod
     def load_brands() -> List[str]:
         """Загрузка брендов из XML"""
+        return list(BrandService.get_catalog().brands)
+
+    @staticmethod
+    def _load_brands_from_file() -> List[str]:
+        """Парсинг файла брендов"""
         try:
             return BrandService._load_brands_standard()
         except Exception:
@@ -21,7 +136,7 @@ class BrandService:
     def _load_brands_standard() -> List[str]:
         """Стандартный парсинг XML"""
         try:
-            tree = ET.parse('brands.xml')
+            tree = ET.parse(BrandService.BRANDS_FILE)
             root = tree.getroot()
 
             brands = []
@@ -47,7 +162,7 @@ class BrandService:
     def _load_brands_fallback() -> List[str]:
         """Альтернативный способ загрузки"""
         try:
-            with open('brands.xml', 'r', encoding='utf-8') as f:
+            with open(BrandService.BRANDS_FILE, 'r', encoding='utf-8') as f:
                 content = f.read()
 
             brands = []
@@ -77,25 +192,24 @@ class BrandService:
     @staticmethod
     def is_valid_brand(brand: str) -> bool:
         """Проверка валидности бренда"""
-        brands = BrandService.load_brands()
-        brand_lower = brand.lower().strip()
-        return any(existing_brand.lower().strip() == brand_lower for existing_brand in brands)
+        return brand in BrandService.get_catalog()
+
+    @staticmethod
+    def get_canonical_brand(brand: str) -> Optional[str]:
+        """Название бренда в написании из базы (или None)"""
+        return BrandService.get_catalog().get_canonical(brand)
 
     @staticmethod
     def search_brands(query: str, limit: int = 10) -> List[str]:
         """Поиск брендов"""
-        brands = BrandService.load_brands()
-        query_lower = query.lower().strip()
-
-        matches = [brand for brand in brands if query_lower in brand.lower()]
-        return matches[:limit]
+        return BrandService.get_catalog().search(query, limit)
 
     @staticmethod
     async def ask_brand_manual(message: Message, user_name: str = ""):
         """Запрос бренда с ручным вводом и подсказками"""
         greeting = f"{user_name}, " if user_name else ""
 
-        sample_brands = BrandService.load_brands()[:5]
+        sample_brands = BrandService.get_catalog().brands[:5]
         sample_text = "\n".join([f"• {brand}" for brand in sample_brands])
 
         await message.answer(
@@ -1,32 +1,293 @@
 import config
-from typing import Dict, Tuple, Optional
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from bot.services.reference_data import reference_data
+
+# Виды генераторов XML (см. XMLGeneratorFactory)
+GENERATOR_ACCESSORIES = 'accessories'
+GENERATOR_BAGS = 'bags'
+GENERATOR_MEN_SHOES = 'men_shoes'
+GENERATOR_WOMEN_SHOES = 'women_shoes'
+GENERATOR_CLOTHING = 'clothing'
+GENERATOR_DEFAULT = 'default'
+
+
+def classify_generator_kind(category_name: str) -> str:
+    """Вид генератора XML по полному названию категории"""
+    category_lower = (category_name or "").lower()
+
+    if any(keyword in category_lower for keyword in ["аксессуар", "аксесуар"]):
+        return GENERATOR_ACCESSORIES
+    if any(keyword in category_lower for keyword in ["сумк", "рюкзак", "чемодан", "портфел", "борсетк"]):
+        return GENERATOR_BAGS
+    if "мужская обувь" in category_lower:
+        return GENERATOR_MEN_SHOES
+    if "женская обувь" in category_lower:
+        return GENERATOR_WOMEN_SHOES
+    if "одежда" in category_lower:
+        return GENERATOR_CLOTHING
+    if "обувь" in category_lower:
+        # Мужская или женская - по контексту
+        if "мужск" in category_lower:
+            return GENERATOR_MEN_SHOES
+        if "женск" in category_lower:
+            return GENERATOR_WOMEN_SHOES
+    return GENERATOR_DEFAULT
+
+
+class CategoryKind(NamedTuple):
+    """
+    Вид товара: какой генератор XML строит объявление и по какой ветке идет
+    мастер добавления. Ветка мастера выводится из вида генератора, поэтому
+    они всегда совпадают.
+    """
+    generator: str
+    is_sport_shoe: bool
+    is_backpack: bool
+    needs_size: bool
+    needs_full_clothing_properties: bool
+
+    @property
+    def is_shoe(self) -> bool:
+        return self.generator in (GENERATOR_MEN_SHOES, GENERATOR_WOMEN_SHOES)
+
+    @property
+    def is_men_shoe(self) -> bool:
+        return self.generator == GENERATOR_MEN_SHOES
+
+    @property
+    def is_accessory(self) -> bool:
+        return self.generator == GENERATOR_ACCESSORIES
+
+    @property
+    def is_bag(self) -> bool:
+        return self.generator == GENERATOR_BAGS
+
+    @property
+    def is_clothing(self) -> bool:
+        return self.generator == GENERATOR_CLOTHING
+
+
+# Правая часть названия (после последнего дефиса), для которой нужны свои шаги мастера
+SPORT_SHOE_KEYWORDS = ("спортивная обувь", "рабочая обувь", "резиновая обувь", "домашняя обувь", "уход за обувью")
+BACKPACK_KEYWORDS = ("рюкзак", "чемоданы и дорожные сумки", "портфели и борсетки",
+                     "кошельки, визитницы, ключницы", "косметички и бьюти–кейсы")
+# Категории, для которых НЕ нужны полные свойства одежды (материал + размер + цвет)
+PARTIAL_CLOTHING_KEYWORDS = ("нижнее бельё", "нижнее белье", "дублёнки", "дубленки", "шубы", "другое")
+SIZE_CATEGORIES = (
+    "Мужская обувь", "Женская обувь", "Мужская одежда", "Женская одежда",
+    "Брюки", "Джинсы", "Шорты", "Пиджаки и костюмы", "Рубашки", "Платья", "Юбки",
+    "Обувь", "Одежда", "Верхняя одежда", "Нижнее белье", "Головные уборы"
+)
+
+
+def _get_category_right_part(category_name: str) -> str:
+    """Правая часть категории после дефиса"""
+    return category_name.split('-')[-1].strip().lower()
+
+
+def classify_category(category_name: str) -> CategoryKind:
+    """Вид товара по полному названию категории (разбор ключевых слов)"""
+    if not category_name:
+        return CategoryKind(GENERATOR_DEFAULT, False, False, False, False)
+
+    generator = classify_generator_kind(category_name)
+    right_part = _get_category_right_part(category_name)
+    is_shoe = generator in (GENERATOR_MEN_SHOES, GENERATOR_WOMEN_SHOES)
+
+    return CategoryKind(
+        generator=generator,
+        is_sport_shoe=is_shoe and any(keyword in right_part for keyword in SPORT_SHOE_KEYWORDS),
+        is_backpack=generator == GENERATOR_BAGS and any(keyword in right_part for keyword in BACKPACK_KEYWORDS),
+        needs_size=any(size_category in category_name for size_category in SIZE_CATEGORIES),
+        needs_full_clothing_properties=not any(
+            keyword in category_name.lower() for keyword in PARTIAL_CLOTHING_KEYWORDS
+        )
+    )
+
+
+class CategoryNode(NamedTuple):
+    """Категория любого уровня со всем, что о ней нужно знать"""
+    id: str
+    name: str
+    main_id: str
+    parent_id: Optional[str]
+    depth: int
+    levels: Tuple[str, str, str]
+    avito_id: Optional[str]
+    kind: CategoryKind
+    children: Tuple['CategoryNode', ...]
+
+    @property
+    def full_name(self) -> str:
+        """Название в формате category_name товара"""
+        return " - ".join(self.levels[:self.depth])
+
+
+class CategoryIndex:
+    """
+    Плоский индекс дерева AVITO_CATEGORIES, строится один раз при загрузке.
+    ID основных категорий пересекаются с ID подкатегорий сумок ("1"-"6"),
+    поэтому кроме общего поиска по ID есть поиск в пределах основной категории.
+    """
+
+    def __init__(self, categories: Dict, category_ids: Dict[str, str]):
+        self.categories = categories
+        self.category_ids = category_ids
+
+        # Общий поиск по ID: основные категории имеют приоритет, дальше - первое вхождение
+        self._by_id: Dict[str, CategoryNode] = {}
+        # Подкатегории второго уровня по ID (первое вхождение)
+        self._subcategories: Dict[str, CategoryNode] = {}
+        # Второй и третий уровни в пределах основной категории (второй - в приоритете)
+        self._by_main: Dict[str, Dict[str, CategoryNode]] = {}
+        # Только третий уровень в пределах основной категории
+        self._third_level: Dict[str, Dict[str, CategoryNode]] = {}
+        # Полное название (category_name товара) - однозначный ключ категории
+        self._by_full_name: Dict[str, CategoryNode] = {}
+        # Виды для названий не из справочника (товары старых версий)
+        self._unknown_kinds: Dict[str, CategoryKind] = {}
+
+        mains = [self._build_main(main_id, main_cat) for main_id, main_cat in categories.items()]
+        for main in mains:
+            self._by_id[main.id] = main
+        for main in mains:
+            self._register_descendants(main)
+
+    def _build_main(self, main_id: str, main_cat: Dict) -> CategoryNode:
+        main_name = main_cat['name']
+        children = []
+
+        for sub_id, sub_cat in main_cat.get('subcategories', {}).items():
+            if isinstance(sub_cat, dict):
+                sub_name = sub_cat['name']
+                subsub_items = sub_cat.get('subcategories', {}).items()
+            else:
+                sub_name = sub_cat
+                subsub_items = ()
+
+            grandchildren = tuple(
+                self._build_node(subsub_id, subsub_name, main_id, sub_id, 3, (main_name, sub_name, subsub_name))
+                for subsub_id, subsub_name in subsub_items
+            )
+            children.append(self._build_node(sub_id, sub_name, main_id, main_id, 2, (main_name, sub_name, ""),
+                                             grandchildren))
+
+        return CategoryNode(
+            id=main_id,
+            name=main_name,
+            main_id=main_id,
+            parent_id=None,
+            depth=1,
+            levels=(main_name, "", ""),
+            avito_id=self.category_ids.get(main_id, ""),
+            kind=classify_category(main_name),
+            children=tuple(children)
+        )
+
+    def _build_node(self, category_id: str, name: str, main_id: str, parent_id: str, depth: int,
+                    levels: Tuple[str, str, str], children: Tuple[CategoryNode, ...] = ()) -> CategoryNode:
+        full_name = " - ".join(levels[:depth])
+        return CategoryNode(
+            id=category_id,
+            name=name,
+            main_id=main_id,
+            parent_id=parent_id,
+            depth=depth,
+            levels=levels,
+            avito_id=self.category_ids.get(category_id, self.category_ids.get(main_id)),
+            kind=classify_category(full_name),
+            children=children
+        )
+
+    def _register_descendants(self, main: CategoryNode):
+        by_main = self._by_main.setdefault(main.id, {})
+        third_level = self._third_level.setdefault(main.id, {})
+        self._by_full_name.setdefault(main.full_name, main)
+
+        for sub in main.children:
+            self._by_full_name.setdefault(sub.full_name, sub)
+            self._by_id.setdefault(sub.id, sub)
+            self._subcategories.setdefault(sub.id, sub)
+            by_main.setdefault(sub.id, sub)
+
+        for sub in main.children:
+            for subsub in sub.children:
+                self._by_full_name.setdefault(subsub.full_name, subsub)
+                self._by_id.setdefault(subsub.id, subsub)
+                by_main.setdefault(subsub.id, subsub)
+                third_level.setdefault(subsub.id, subsub)
+
+    def get(self, category_id: str) -> Optional[CategoryNode]:
+        return self._by_id.get(category_id)
+
+    def get_main(self, main_category_id: str) -> Optional[CategoryNode]:
+        node = self._by_id.get(main_category_id)
+        return node if node is not None and node.parent_id is None else None
+
+    def get_subcategory(self, subcategory_id: str) -> Optional[CategoryNode]:
+        return self._subcategories.get(subcategory_id)
+
+    def get_in_main(self, main_category_id: str, category_id: str) -> Optional[CategoryNode]:
+        """Подкатегория второго или третьего уровня внутри основной категории"""
+        return self._by_main.get(main_category_id, {}).get(category_id)
+
+    def get_third_level(self, main_category_id: str, category_id: str) -> Optional[CategoryNode]:
+        return self._third_level.get(main_category_id, {}).get(category_id)
+
+    def get_by_name(self, category_name: str) -> Optional[CategoryNode]:
+        return self._by_full_name.get(category_name)
+
+    def get_kind(self, category_name: str) -> CategoryKind:
+        """Вид товара по category_name: готовый вид категории справочника"""
+        node = self._by_full_name.get(category_name)
+        if node is not None:
+            return node.kind
+
+        kind = self._unknown_kinds.get(category_name)
+        if kind is None:
+            kind = classify_category(category_name)
+            self._unknown_kinds[category_name] = kind
+        return kind
+
+    def has_subcategories(self, node: CategoryNode) -> bool:
+        """Есть ли у подкатегории вложенный уровень (как в AVITO_CATEGORIES)"""
+        if node.depth != 2:
+            return False
+        sub_cat = self.categories[node.main_id]['subcategories'][node.id]
+        return isinstance(sub_cat, dict) and 'subcategories' in sub_cat
+
+    def __len__(self) -> int:
+        return len(self._by_id)
 
 
 class CategoryService:
     """Сервис для работы с категориями Avito"""
 
+    @staticmethod
+    def get_index() -> CategoryIndex:
+        """Индекс категорий из реестра справочников"""
+        return reference_data.get('categories')
+
+    @staticmethod
+    def get_category_kind(category_name: str) -> CategoryKind:
+        """Вид товара (генератор XML и ветка мастера) по названию категории"""
+        return CategoryService.get_index().get_kind(category_name)
+
     @staticmethod
     def get_category_by_id(category_id: str) -> Optional[Dict]:
         """Получает категорию по ID"""
-        categories = config.AVITO_CATEGORIES
-
-        # Ищем в основных категориях
-        if category_id in categories:
-            return categories[category_id]
-
-        # Ищем в подкатегориях
-        for main_cat in categories.values():
-            if 'subcategories' in main_cat:
-                for sub_id, sub_cat in main_cat['subcategories'].items():
-                    if sub_id == category_id:
-                        return sub_cat if isinstance(sub_cat, dict) else {'name': sub_cat}
-                    # Ищем в под-подкатегориях
-                    if isinstance(sub_cat, dict) and 'subcategories' in sub_cat:
-                        for subsub_id, subsub_cat in sub_cat['subcategories'].items():
-                            if subsub_id == category_id:
-                                return {'name': subsub_cat}
-
-        return None
+        index = CategoryService.get_index()
+        node = index.get(category_id)
+        if node is None:
+            return None
+
+        if node.depth == 1:
+            return index.categories[node.id]
+        if node.depth == 2:
+            sub_cat = index.categories[node.main_id]['subcategories'][node.id]
+            return sub_cat if isinstance(sub_cat, dict) else {'name': sub_cat}
+        return {'name': node.name}
 
     @staticmethod
     def get_category_levels(category_id: str) -> Tuple[str, str, str]:
@@ -36,41 +297,10 @@ class CategoryService:
         if not category_id:
             return "", "", ""
 
-        categories = config.AVITO_CATEGORIES
-
-        print(f"🔍 Поиск категории по ID: {category_id}")
-
-        # Ищем категорию и ее родителей
-        for main_id, main_cat in categories.items():
-            main_name = main_cat['name']
-
-            # Проверяем основные категории
-            if category_id == main_id:
-                print(f"✅ Найдена основная категория: {main_name}")
-                return main_name, "", ""
-
-            # Ищем в подкатегориях
-            if 'subcategories' in main_cat:
-                for sub_id, sub_cat in main_cat['subcategories'].items():
-                    # Определяем название подкатегории
-                    if isinstance(sub_cat, dict):
-                        sub_name = sub_cat['name']
-                    else:
-                        sub_name = sub_cat
-
-                    if category_id == sub_id:
-                        print(f"✅ Найдена подкатегория: {main_name} - {sub_name}")
-                        return main_name, sub_name, ""
-
-                    # Ищем в под-подкатегориях
-                    if isinstance(sub_cat, dict) and 'subcategories' in sub_cat:
-                        for subsub_id, subsub_name in sub_cat['subcategories'].items():
-                            if category_id == subsub_id:
-                                print(f"✅ Найдена под-подкатегория: {main_name} - {sub_name} - {subsub_name}")
-                                return main_name, sub_name, subsub_name
-
-        print(f"❌ Категория с ID {category_id} не найдена")
-        return "", "", ""
+        node = CategoryService.get_index().get(category_id)
+        if node is None:
+            return "", "", ""
+        return node.levels
 
     @staticmethod
     def get_category_levels_from_name(category_name: str) -> Tuple[str, str, str]:
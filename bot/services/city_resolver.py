@@ -0,0 +1,112 @@
+# bot/services/city_resolver.py
+import re
+from typing import Dict, Optional
+
+from bot.services.location_service import LocationService
+
+# Сокращения и разговорные названия городов (ключи - в виде normalize_city_query)
+CITY_ALIASES = {
+    'мск': 'Москва',
+    'спб': 'Санкт-Петербург',
+    'с пб': 'Санкт-Петербург',
+    'питер': 'Санкт-Петербург',
+    'петербург': 'Санкт-Петербург',
+    'ленинград': 'Санкт-Петербург',
+    'нск': 'Новосибирск',
+    'новосиб': 'Новосибирск',
+    'екб': 'Екатеринбург',
+    'екат': 'Екатеринбург',
+    'ебург': 'Екатеринбург',
+    'нн': 'Нижний Новгород',
+    'нижний': 'Нижний Новгород',
+    'рнд': 'Ростов-на-Дону',
+    'челны': 'Набережные Челны',
+    'владик': 'Владивосток',
+    'комсомольск': 'Комсомольск-на-Амуре',
+    'петропавловск': 'Петропавловск-Камчатский',
+}
+
+# "г. Казань", "город Казань"
+_CITY_PREFIX_RE = re.compile(r'^(г\.?|город)\s+')
+
+# Без геокодера и без подтверждения пользователя принимаются только такие совпадения
+TRUSTED_LOCAL_MATCHES = ('exact', 'alias')
+
+
+def normalize_city_query(city_name: str) -> str:
+    """Ключ запроса как в справочнике, без префикса "г." и точек"""
+    key = LocationService.get_gazetteer().normalize(city_name.replace('.', '. '))
+    return _CITY_PREFIX_RE.sub('', key).replace('.', '').strip()
+
+
+def _to_result(city: Dict, match: str, distance: int = 0) -> dict:
+    """Результат в формате validate_city_nominatim"""
+    region = city.get('region')
+    parts = [city['name']] + ([region] if region and region != city['name'] else []) + ['Россия']
+    return {
+        'valid': True,
+        'data': {
+            'name': city['name'],
+            'full_address': ", ".join(parts),
+            'lat': None,
+            'lon': None,
+            'type': 'city',
+            'region': region,
+            'population': city.get('population'),
+            'source': 'local',
+            'match': match,
+            'distance': distance
+        }
+    }
+
+
+def resolve_city_locally(city_name: str) -> Optional[dict]:
+    """
+    Поиск города в локальном справочнике: точное название, сокращение,
+    затем нечеткое совпадение. Возвращает None, если город не найден.
+    """
+    gazetteer = LocationService.get_gazetteer()
+
+    key = normalize_city_query(city_name)
+    if not key:
+        return None
+
+    city = gazetteer.get(key)
+    if city:
+        return _to_result(city, 'exact')
+
+    alias = CITY_ALIASES.get(key)
+    if alias and gazetteer.get(alias):
+        return _to_result(gazetteer.get(alias), 'alias')
+
+    matches = gazetteer.search_fuzzy(key, limit=2)
+    if matches:
+        best_city, best_distance = matches[0]
+        # Несколько одинаково похожих городов - выбор не однозначен
+        if len(matches) == 1 or matches[1][1] > best_distance:
+            return _to_result(best_city, 'fuzzy', best_distance)
+
+    return None
+
+
+async def validate_city(city_name: str) -> dict:
+    """
+    Проверка города: точное название или сокращение из локального справочника,
+    иначе Nominatim. Если геокодер город не нашел или недоступен, предлагается
+    похожий город из справочника с needs_confirmation - его должен подтвердить
+    пользователь (в справочнике не все города: "Тура" не должна стать Тулой).
+    """
+    local_result = resolve_city_locally(city_name)
+    if local_result and local_result['data']['match'] in TRUSTED_LOCAL_MATCHES:
+        return local_result
+
+    from нф import validate_city_nominatim
+    result = await validate_city_nominatim(city_name)
+
+    if not result['valid'] and local_result:
+        if result.get('error', '').startswith('Ошибка API'):
+            print(f"⚠️ Геокодер недоступен, предлагаем похожий город из справочника для '{city_name}'")
+        local_result['needs_confirmation'] = True
+        return local_result
+
+    return result
@@ -0,0 +1,152 @@
+# bot/services/download_policy.py
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class ImageDownloadError(Exception):
+    """Ошибка скачивания изображения"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class CircuitOpenError(ImageDownloadError):
+    """Хост временно недоступен - запрос отклонен без попытки скачивания"""
+
+    def __init__(self, host: str):
+        super().__init__(f"circuit open for {host}", retryable=False)
+        self.host = host
+
+
+class RetryPolicy:
+    """Политика повторов с экспоненциальной задержкой и полным джиттером"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def get_delay(self, attempt: int) -> float:
+        """Задержка перед повтором после попытки с номером attempt (начиная с 1)"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для одного хоста: после серии ошибок отклоняет запросы на время,
+    затем пропускает ровно один пробный запрос (HALF_OPEN), остальные отклоняются
+    до его результата.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Можно ли сейчас обращаться к хосту"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+
+        if self.state == self.HALF_OPEN:
+            # Пропускаем один пробный запрос, остальные ждут его результата
+            if self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+        return True
+
+    def release_probe(self):
+        """Пробный запрос завершился без вывода о хосте (отмена, 429, неверный file_id)"""
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class CircuitBreakerRegistry:
+    """Набор предохранителей по хостам"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            self._breakers[host] = breaker
+        return breaker
+
+
+class ExportReport:
+    """Итоги скачивания изображений за один экспорт"""
+
+    def __init__(self):
+        self.downloaded = 0
+        self.cached = 0
+        self.retries = 0
+        self.retried: Dict[str, int] = {}  # {image_ref: количество повторов}
+        self.skipped: List[Tuple[str, str]] = []  # [(image_ref, причина)]
+
+    def record_download(self, image_ref: str):
+        self.downloaded += 1
+
+    def record_cache_hit(self, image_ref: str):
+        self.cached += 1
+
+    def record_retry(self, image_ref: str, error: Exception):
+        self.retries += 1
+        self.retried[image_ref] = self.retried.get(image_ref, 0) + 1
+
+    def record_skip(self, image_ref: str, reason: str):
+        self.skipped.append((image_ref, reason))
+
+    @property
+    def has_problems(self) -> bool:
+        return bool(self.skipped or self.retried)
+
+    def summary(self) -> str:
+        """Краткая сводка в одну строку"""
+        return (f"скачано: {self.downloaded}, из кэша: {self.cached}, "
+                f"повторов: {self.retries}, пропущено: {len(self.skipped)}")
+
+    def to_text(self, limit: Optional[int] = 50) -> str:
+        """Подробный отчет для README"""
+        lines = [f"Изображения - {self.summary()}"]
+
+        if self.retried:
+            lines.append("")
+            lines.append("Скачаны после повторов:")
+            for image_ref, count in list(self.retried.items())[:limit]:
+                lines.append(f"- {image_ref[:60]}: повторов {count}")
+
+        if self.skipped:
+            lines.append("")
+            lines.append("Не удалось скачать:")
+            for image_ref, reason in self.skipped[:limit]:
+                lines.append(f"- {image_ref[:60]}: {reason}")
+
+        return "\n".join(lines)
@@ -0,0 +1,186 @@
+# bot/services/export_trace.py
+"""
+Трассировка этапов экспорта (/generate_xml).
+
+Экспорт оборачивается в start_trace(), а код этапов - в span("имя"):
+вложенность спанов берется из contextvars, поэтому параллельные загрузки
+изображений попадают под свой родительский спан. По завершении экспорта
+в EXPORT_TRACE_FILE дописывается одна JSON строка со всеми спанами, а при
+заданном EXPORT_TRACE_PROFILE_DIR - профиль в формате "folded stacks"
+(flamegraph.pl, speedscope, inferno).
+
+Когда трассировка выключена, span() ничего не делает.
+"""
+import contextvars
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import config
+
+_current_trace: contextvars.ContextVar[Optional['ExportTrace']] = contextvars.ContextVar('export_trace', default=None)
+# Путь текущего спана от корня: ('export', 'images', 'image')
+_current_path: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar('export_trace_path', default=())
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('export_trace_span', default=None)
+
+
+class Span:
+    """Этап экспорта: путь от корня, начало и длительность (мс) и атрибуты"""
+
+    __slots__ = ('path', 'start_ms', 'duration_ms', 'attrs')
+
+    def __init__(self, path: Tuple[str, ...], start_ms: float, attrs: Dict):
+        self.path = path
+        self.start_ms = start_ms
+        self.duration_ms = 0.0
+        self.attrs = attrs
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.path[-1],
+            'path': '/'.join(self.path),
+            'start_ms': round(self.start_ms, 3),
+            'duration_ms': round(self.duration_ms, 3),
+            **({'attrs': self.attrs} if self.attrs else {})
+        }
+
+
+class ExportTrace:
+    """Все спаны одного экспорта"""
+
+    def __init__(self, user_id: int, mode: str):
+        self.export_id = uuid.uuid4().hex[:12]
+        self.user_id = user_id
+        self.mode = mode
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self.spans: List[Span] = []
+        self.totals: Dict[str, float] = {}
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def add(self, name: str, value: float = 1):
+        """Суммарный счетчик экспорта (байты, изображения, попадания в кэш)"""
+        self.totals[name] = self.totals.get(name, 0) + value
+
+    def to_record(self, extra: Dict = None) -> Dict:
+        return {
+            'export_id': self.export_id,
+            'user_id': self.user_id,
+            'mode': self.mode,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'duration_ms': round(self.spans[0].duration_ms if self.spans else self.elapsed_ms(), 3),
+            'totals': self.totals,
+            **(extra or {}),
+            'spans': [span.to_dict() for span in self.spans]
+        }
+
+    def to_folded(self) -> str:
+        """Собственное время каждого стека в микросекундах: 'export;images;image 1234'"""
+        children_ms: Dict[Tuple[str, ...], float] = {}
+        for span in self.spans:
+            if len(span.path) > 1:
+                parent = span.path[:-1]
+                children_ms[parent] = children_ms.get(parent, 0.0) + span.duration_ms
+
+        # У одинаковых путей (например, всех image) время суммируется
+        self_ms: Dict[Tuple[str, ...], float] = {}
+        total_ms: Dict[Tuple[str, ...], float] = {}
+        for span in self.spans:
+            total_ms[span.path] = total_ms.get(span.path, 0.0) + span.duration_ms
+
+        for path, duration in total_ms.items():
+            # Параллельные дочерние спаны могут длиться в сумме дольше родителя
+            self_ms[path] = max(0.0, duration - children_ms.get(path, 0.0))
+
+        return ''.join(f"{';'.join(path)} {int(duration * 1000)}\n"
+                       for path, duration in self_ms.items() if duration > 0)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Этап текущего экспорта; yield - Span (или None без трассировки) для атрибутов"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    current = Span(_current_path.get() + (name,), trace.elapsed_ms(), attrs)
+    trace.spans.append(current)
+    path_token = _current_path.set(current.path)
+    span_token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.attrs['error'] = str(e)[:200]
+        raise
+    finally:
+        current.duration_ms = trace.elapsed_ms() - current.start_ms
+        _current_span.reset(span_token)
+        _current_path.reset(path_token)
+
+
+def annotate(**attrs):
+    """Добавляет атрибуты текущему спану"""
+    current = _current_span.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+
+def add(name: str, value: float = 1):
+    """Увеличивает счетчик текущего экспорта"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, value)
+
+
+def get_current_trace() -> Optional[ExportTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(user_id: int, mode: str):
+    """Трассировка одного экспорта; запись сохраняется при выходе из блока"""
+    if not config.EXPORT_TRACE_ENABLED:
+        yield None
+        return
+
+    trace = ExportTrace(user_id, mode)
+    token = _current_trace.set(trace)
+    try:
+        with span('export', mode=mode):
+            yield trace
+    finally:
+        _current_trace.reset(token)
+        _save_trace(trace)
+
+
+def _save_trace(trace: ExportTrace):
+    from bot.services.metrics import metrics
+
+    # Этапы первого уровня - еще и в метрики
+    for stage in trace.spans:
+        if len(stage.path) == 2:
+            metrics.observe('bot_export_stage_seconds', stage.duration_ms / 1000, {'stage': stage.path[-1]})
+
+    try:
+        from bot.services.shared_file import file_lock
+        with file_lock(config.EXPORT_TRACE_FILE):
+            with open(config.EXPORT_TRACE_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(trace.to_record(), ensure_ascii=False) + '\n')
+
+        if config.EXPORT_TRACE_PROFILE_DIR:
+            os.makedirs(config.EXPORT_TRACE_PROFILE_DIR, exist_ok=True)
+            profile_path = os.path.join(config.EXPORT_TRACE_PROFILE_DIR, f"export_{trace.export_id}.folded")
+            with open(profile_path, 'w', encoding='utf-8') as f:
+                f.write(trace.to_folded())
+
+        print(f"🧭 Трасса экспорта {trace.export_id}: {trace.to_record()['duration_ms']:.0f} мс, "
+              f"{len(trace.spans)} этапов")
+    except Exception as e:
+        print(f"⚠️ Не удалось сохранить трассу экспорта: {e}")
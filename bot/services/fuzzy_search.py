@@ -0,0 +1,174 @@
+# bot/services/fuzzy_search.py
+import re
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+
+# Транслитерация кириллицы в латиницу - "Найк" и "Nike" сравниваются в одном алфавите
+TRANSLIT_TABLE = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh',
+    'з': 'z', 'и': 'i', 'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o',
+    'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu',
+    'я': 'ya',
+})
+
+_NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+_VOWELS_RE = re.compile(r"[aeiouy ]+")
+
+
+def transliterate(text: str) -> str:
+    """Переводит кириллицу в латиницу (текст должен быть в нижнем регистре)"""
+    return text.translate(TRANSLIT_TABLE)
+
+
+def fuzzy_key(text: str) -> str:
+    """Ключ для нечеткого сравнения: нижний регистр, латиница, без пунктуации"""
+    key = transliterate(text.casefold())
+    return _NON_ALNUM_RE.sub(' ', key).strip()
+
+
+def consonant_skeleton(key: str) -> str:
+    """Согласные ключа: у "naik" (Найк) и "nike" одинаковый скелет nk"""
+    return key[:1] + _VOWELS_RE.sub('', key[1:])
+
+
+def trigrams(key: str) -> set:
+    """Триграммы ключа с границами слов"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """
+    Расстояние Дамерау-Левенштейна (с перестановкой соседних символов).
+    При max_distance считается только полоса шириной 2 * max_distance + 1 вокруг
+    диагонали, а расчет прекращается, как только расстояние превысило порог.
+    """
+    if a == b:
+        return 0
+
+    len_a, len_b = len(a), len(b)
+    if max_distance is None:
+        max_distance = max(len_a, len_b)
+    if abs(len_a - len_b) > max_distance:
+        return max_distance + 1
+
+    over = max_distance + 1
+    previous_previous = None
+    previous = [j if j <= max_distance else over for j in range(len_b + 1)]
+
+    for i in range(1, len_a + 1):
+        char_a = a[i - 1]
+        current = [over] * (len_b + 1)
+        if i <= max_distance:
+            current[0] = i
+
+        row_min = current[0]
+        low = max(1, i - max_distance)
+        high = min(len_b, i + max_distance)
+
+        for j in range(low, high + 1):
+            value = previous[j - 1] if char_a == b[j - 1] else previous[j - 1] + 1
+            deletion = previous[j] + 1
+            if deletion < value:
+                value = deletion
+            insertion = current[j - 1] + 1
+            if insertion < value:
+                value = insertion
+            if (previous_previous is not None and j > 1
+                    and char_a == b[j - 2] and a[i - 2] == b[j - 1]):
+                transposition = previous_previous[j - 2] + 1
+                if transposition < value:
+                    value = transposition
+            if value > over:
+                value = over
+            current[j] = value
+            if value < row_min:
+                row_min = value
+
+        if row_min > max_distance:
+            return over
+
+        previous_previous, previous = previous, current
+
+    return previous[len_b] if previous[len_b] <= max_distance else over
+
+
+def max_typos(key: str) -> int:
+    """Допустимое число опечаток для запроса такой длины"""
+    if len(key) <= 3:
+        return 1
+    if len(key) <= 7:
+        return 2
+    return 3
+
+
+class TrigramIndex:
+    """Инвертированный индекс триграмм для нечеткого поиска по списку строк"""
+
+    # Сколько кандидатов с наибольшим числом общих триграмм проверять расстоянием
+    MAX_CANDIDATES = 64
+
+    def __init__(self, texts: List[str]):
+        self.keys = [fuzzy_key(text) for text in texts]
+        postings: Dict[str, List[int]] = defaultdict(list)
+        skeletons: Dict[str, List[int]] = defaultdict(list)
+
+        for index, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                postings[gram].append(index)
+            skeletons[consonant_skeleton(key)].append(index)
+
+        self.postings = dict(postings)
+        self.skeletons = dict(skeletons)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, int]]:
+        """
+        Возвращает [(индекс, расстояние)] лучших совпадений.
+        Сравнивается и полное название, и его начало длиной с запрос.
+        """
+        key = fuzzy_key(query)
+        if len(key) < 2:
+            return []
+
+        # Кандидаты - строки с наибольшим числом общих триграмм
+        query_grams = trigrams(key)
+        overlap = Counter(chain.from_iterable(self.postings.get(gram, ()) for gram in query_grams))
+        allowed = max_typos(key)
+
+        # Каждая опечатка (включая перестановку) портит не больше четырех триграмм - остальные кандидаты заведомо далеки
+        min_shared = len(query_grams) - 4 * allowed
+        candidates = [(index, shared) for index, shared in overlap.most_common(self.MAX_CANDIDATES)
+                      if shared >= min_shared]
+
+        # Плюс строки с теми же согласными - ловят фонетическое написание ("Найк", "Левайс")
+        skeleton = consonant_skeleton(key)
+        sounds_alike = set(self.skeletons.get(skeleton, ())) if len(skeleton) >= 2 else set()
+        candidate_indexes = {index for index, _ in candidates}
+        candidates.extend((index, overlap.get(index, 0)) for index in sounds_alike
+                          if index not in candidate_indexes)
+
+        scored = []
+        for index, shared in candidates:
+            if index in sounds_alike:
+                # Совпадение по звучанию считаем одной опечаткой
+                distance = min(1, edit_distance(key, self.keys[index], 1))
+                scored.append((distance, False, -shared, len(self.keys[index]), index))
+                continue
+
+            candidate = self.keys[index]
+            distance = edit_distance(key, candidate, allowed)
+            if distance > allowed:
+                if len(candidate) <= len(key):
+                    continue
+                # Пользователь мог ввести только начало названия
+                prefix_distance = edit_distance(key, candidate[:len(key)], allowed)
+                if prefix_distance > allowed:
+                    continue
+                # Совпадение по началу ранжируем ниже полного
+                distance = prefix_distance + 1
+            scored.append((distance, True, -shared, len(candidate), index))
+
+        scored.sort()
+        return [(index, distance) for distance, _, _, _, index in scored[:limit]]
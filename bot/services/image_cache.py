@@ -0,0 +1,46 @@
+# bot/services/image_cache.py
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class BytesLRUCache:
+    """LRU кэш байтовых данных с ограничением по суммарному размеру"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._size = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Возвращает значение и помечает его как недавно использованное"""
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: bytes):
+        """Добавляет значение, вытесняя самые старые записи"""
+        if len(value) > self.max_bytes:
+            return
+
+        previous = self._items.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+
+        self._items[key] = value
+        self._size += len(value)
+
+        while self._size > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self._size -= len(evicted)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def size(self) -> int:
+        """Суммарный размер данных в кэше"""
+        return self._size
@@ -0,0 +1,171 @@
+# bot/services/image_hosting.py
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, Optional
+
+import config
+from bot.services.shared_file import update_json_file
+
+
+class ImageHosting:
+    """
+    Публикация изображений в локальную папку, которую раздает статический сервер.
+    Пути адресуются содержимым (sha256), поэтому каждое фото загружается один раз.
+    Индекс (file_id Telegram -> файл) хранится вне папки и наружу не раздается.
+    """
+
+    # Индекс прежних версий лежал в самой папке изображений
+    LEGACY_INDEX_FILENAME = "index.json"
+
+    def __init__(self, root_dir: str, base_url: str, index_path: str):
+        self.root_dir = root_dir
+        self.base_url = base_url.rstrip('/')
+        self.index_path = index_path
+        self._index: Optional[Dict[str, str]] = None  # {image_ref: relative_path}
+        self._index_dirty = False
+        self._lock = asyncio.Lock()
+
+    def get_relative_path(self, content_hash: str) -> str:
+        """Путь файла относительно корня: ab/abcdef....jpg"""
+        return f"{content_hash[:2]}/{content_hash}.jpg"
+
+    def get_url(self, relative_path: str) -> str:
+        return f"{self.base_url}/{relative_path}"
+
+    def get_published_url(self, image_ref: str) -> Optional[str]:
+        """URL уже опубликованного изображения - без повторного скачивания"""
+        relative_path = self._get_index().get(image_ref)
+        if relative_path and os.path.exists(os.path.join(self.root_dir, relative_path)):
+            return self.get_url(relative_path)
+        return None
+
+    async def publish(self, image_ref: str, image_bytes: bytes) -> str:
+        """Сохраняет изображение (если его еще нет) и возвращает публичный URL"""
+        content_hash = hashlib.sha256(image_bytes).hexdigest()
+        relative_path = self.get_relative_path(content_hash)
+
+        await asyncio.to_thread(self._write_file, relative_path, image_bytes)
+
+        self._get_index()[image_ref] = relative_path
+        self._index_dirty = True
+        return self.get_url(relative_path)
+
+    async def save_index(self):
+        """Сохраняет соответствие ссылок и файлов на диск"""
+        async with self._lock:
+            if not self._index_dirty:
+                return
+            index = dict(self._get_index())
+            self._index_dirty = False
+            await asyncio.to_thread(self._write_index, index)
+
+    def _write_file(self, relative_path: str, image_bytes: bytes):
+        """Атомарная запись файла - сервер никогда не отдаст недописанное изображение"""
+        path = os.path.join(self.root_dir, relative_path)
+        if os.path.exists(path):
+            return
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(image_bytes)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _get_index(self) -> Dict[str, str]:
+        if self._index is None:
+            self._index = self._load_index()
+        return self._index
+
+    def _get_legacy_index_path(self) -> str:
+        return os.path.join(self.root_dir, self.LEGACY_INDEX_FILENAME)
+
+    def _load_index(self) -> Dict[str, str]:
+        for index_path in (self.index_path, self._get_legacy_index_path()):
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                print(f"⚠️ Не удалось прочитать индекс изображений: {e}")
+                return {}
+        return {}
+
+    def _write_index(self, index: Dict[str, str]):
+        index_dir = os.path.dirname(self.index_path)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+
+        # Старый индекс из раздаваемой папки переносится в новый и удаляется
+        legacy_path = self._get_legacy_index_path()
+        legacy_index = self._read_legacy_index() if os.path.exists(legacy_path) else {}
+
+        # Индекс общий для всех процессов бота - объединяем с записанным
+        update_json_file(self.index_path, lambda current: {**legacy_index, **(current or {}), **index}, default={})
+
+        if os.path.exists(legacy_path):
+            for path in (legacy_path, legacy_path + '.lock'):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _read_legacy_index(self) -> Dict[str, str]:
+        try:
+            with open(self._get_legacy_index_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+class ImageHostingServer:
+    """
+    Простой HTTP сервер для папки с изображениями. Отдает только файлы вида
+    ab/<sha256>.jpg - служебные и временные файлы наружу не попадают.
+    """
+
+    def __init__(self, root_dir: str, host: str, port: int):
+        self.root_dir = root_dir
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self):
+        from aiohttp import web
+
+        os.makedirs(self.root_dir, exist_ok=True)
+        root_dir = os.path.abspath(self.root_dir)
+
+        async def handle(request: web.Request) -> web.StreamResponse:
+            path = os.path.join(root_dir, request.match_info['prefix'], request.match_info['filename'])
+            if not os.path.isfile(path):
+                raise web.HTTPNotFound()
+            return web.FileResponse(path)
+
+        app = web.Application()
+        app.router.add_get('/{prefix:[0-9a-f]{2}}/{filename:[0-9a-f]{64}\\.jpg}', handle)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        print(f"🖼️ Сервер изображений запущен на http://{self.host}:{self.port}/")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+# Глобальный экземпляр хостинга изображений
+image_hosting = ImageHosting(config.IMAGE_HOSTING_DIR, config.IMAGE_HOSTING_BASE_URL, config.IMAGE_HOSTING_INDEX_FILE)
@@ -0,0 +1,170 @@
+# bot/services/image_pipeline.py
+import asyncio
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import config
+from bot.services.image_cache import BytesLRUCache
+
+
+class ImageNormalizationError(Exception):
+    """Изображение не удалось привести к требованиям Avito - в экспорт оно не попадает"""
+    pass
+
+
+class ImageNormalizationSettings(NamedTuple):
+    """Параметры нормализации изображения"""
+    max_dimension: int = 1600
+    jpeg_quality: int = 85
+    max_bytes: int = 1024 * 1024
+    min_jpeg_quality: int = 50
+
+
+def normalize_image(image_bytes: bytes, settings: ImageNormalizationSettings) -> bytes:
+    """
+    Приводит изображение к требованиям Avito: уменьшает до max_dimension,
+    удаляет EXIF, сохраняет как progressive JPEG и укладывается в max_bytes.
+    Выполняется в отдельном процессе.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(image_bytes)) as source:
+        # Поворачиваем по EXIF до того, как метаданные будут удалены
+        image = ImageOps.exif_transpose(source)
+
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        image.thumbnail((settings.max_dimension, settings.max_dimension), Image.LANCZOS)
+
+        quality = settings.jpeg_quality
+        while True:
+            output = BytesIO()
+            # Новый объект без info - EXIF и прочие метаданные не сохраняются
+            image.save(output, format='JPEG', quality=quality, optimize=True, progressive=True)
+            result = output.getvalue()
+
+            if len(result) <= settings.max_bytes:
+                return result
+
+            if quality > settings.min_jpeg_quality:
+                quality = max(settings.min_jpeg_quality, quality - 10)
+            else:
+                # Качество уже минимальное - уменьшаем размеры
+                width, height = image.size
+                if width <= 64 or height <= 64:
+                    return result
+                image = image.resize((int(width * 0.85), int(height * 0.85)), Image.LANCZOS)
+
+
+class ImagePipeline:
+    """Нормализация изображений для экспорта в пуле процессов с кэшем результатов"""
+
+    def __init__(self, settings: ImageNormalizationSettings, max_workers: Optional[int] = None,
+                 cache_max_bytes: int = 256 * 1024 * 1024):
+        self.settings = settings
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._cache = BytesLRUCache(cache_max_bytes)
+        self._in_flight: Dict[Tuple[str, ImageNormalizationSettings], asyncio.Future] = {}
+        self._pillow_available: Optional[bool] = None
+
+    def is_available(self) -> bool:
+        """Проверяет, установлен ли Pillow"""
+        if self._pillow_available is None:
+            try:
+                import PIL  # noqa: F401
+                self._pillow_available = True
+            except ImportError:
+                print("⚠️ Pillow не установлен, нормализация изображений отключена")
+                self._pillow_available = False
+        return self._pillow_available
+
+    async def process(self, image_bytes: bytes) -> bytes:
+        """
+        Нормализует изображение, используя кэш по (хэш исходника, настройки).
+        Если нормализовать не удалось, бросает ImageNormalizationError:
+        исходник мог бы превысить лимит размера или сохранить EXIF.
+        """
+        if not image_bytes or not self.is_available():
+            return image_bytes
+
+        key = (hashlib.sha256(image_bytes).hexdigest(), self.settings)
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Одинаковое изображение, которое уже обрабатывается - ждем тот же результат
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            try:
+                return await asyncio.shield(in_flight)
+            except Exception as e:
+                raise ImageNormalizationError(f"не удалось нормализовать ({type(e).__name__})") from e
+
+        future = asyncio.ensure_future(self._run(image_bytes))
+        self._in_flight[key] = future
+
+        try:
+            result = await future
+        except Exception as e:
+            # Ошибки не кэшируются - при следующем экспорте будет новая попытка
+            print(f"❌ Ошибка нормализации изображения: {e}")
+            raise ImageNormalizationError(f"не удалось нормализовать ({type(e).__name__})") from e
+        finally:
+            self._in_flight.pop(key, None)
+
+        self._cache.put(key, result)
+        return result
+
+    async def _run(self, image_bytes: bytes) -> bytes:
+        """normalize_image в пуле; если процесс пула умер, пул пересоздается и задача повторяется один раз"""
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                return await loop.run_in_executor(executor, normalize_image, image_bytes, self.settings)
+            except BrokenProcessPool:
+                print("⚠️ Процесс нормализации изображений завершился аварийно, пересоздаем пул")
+                self._discard_executor(executor)
+                if attempt:
+                    raise
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        # Пул мог уже пересоздать другой вызов, получивший ту же ошибку
+        if self._executor is executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Ленивое создание пула процессов"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def shutdown(self):
+        """Остановка пула процессов"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Глобальный экземпляр конвейера изображений
+image_pipeline = ImagePipeline(
+    ImageNormalizationSettings(
+        max_dimension=config.IMAGE_MAX_DIMENSION,
+        jpeg_quality=config.IMAGE_JPEG_QUALITY,
+        max_bytes=config.IMAGE_MAX_BYTES
+    ),
+    max_workers=config.IMAGE_PIPELINE_WORKERS,
+    cache_max_bytes=config.IMAGE_CACHE_MAX_BYTES
+)
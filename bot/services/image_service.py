@@ -1,38 +1,161 @@
 # bot/services/image_service.py
-from typing import Optional
+import asyncio
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlparse
 
+import aiohttp
 from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramNotFound, TelegramRetryAfter
+
+import config
+from bot.services import export_trace
+from bot.services.download_policy import (
+    CircuitBreakerRegistry, CircuitOpenError, ExportReport, ImageDownloadError, RetryPolicy
+)
+from bot.services.image_cache import BytesLRUCache
 
 
 class ImageService:
     """Сервис для работы с изображениями"""
 
-    def __init__(self, bot: Bot):
+    # Ключ предохранителя для загрузок из Telegram
+    TELEGRAM_HOST = "telegram"
+
+    def __init__(self, bot: Bot, retry_policy: Optional[RetryPolicy] = None,
+                 breakers: Optional[CircuitBreakerRegistry] = None):
         self.bot = bot
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_attempts=config.IMAGE_DOWNLOAD_ATTEMPTS,
+            base_delay=config.IMAGE_DOWNLOAD_BACKOFF_BASE,
+            max_delay=config.IMAGE_DOWNLOAD_BACKOFF_MAX
+        )
+        self.breakers = breakers or CircuitBreakerRegistry(
+            failure_threshold=config.IMAGE_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=config.IMAGE_BREAKER_RESET_TIMEOUT
+        )
+        self.timeout = config.IMAGE_DOWNLOAD_TIMEOUT
+        self.cache = BytesLRUCache(config.IMAGE_DOWNLOAD_CACHE_MAX_BYTES)
+        self._session: Optional[aiohttp.ClientSession] = None
 
-    async def process_image_for_export(self, image_ref: str) -> Optional[bytes]:
+    async def process_image_for_export(self, image_ref: str, report: Optional[ExportReport] = None) -> Optional[bytes]:
         """Обрабатывает изображение для экспорта"""
-        try:
-            if self.is_telegram_file_id(image_ref):
-                return await self.download_telegram_image(image_ref)
-            elif self.is_url(image_ref):
-                return await self.download_url_image_async(image_ref)
+        report = report or ExportReport()
+
+        cached = self.cache.get(image_ref)
+        if cached is not None:
+            report.record_cache_hit(image_ref)
+            export_trace.annotate(cache='hit')
+            export_trace.add('cache_hits')
+            return cached
+
+        if self.is_telegram_file_id(image_ref):
+            host = self.TELEGRAM_HOST
+            fetch = lambda: self._fetch_telegram_image(image_ref)
+        elif self.is_url(image_ref):
+            host = urlparse(image_ref).netloc
+            fetch = lambda: self._fetch_url_image(image_ref)
+        else:
+            report.record_skip(image_ref, "неизвестный формат ссылки")
             return None
+
+        export_trace.annotate(cache='miss')
+        try:
+            with export_trace.span('download', host=host):
+                image_bytes = await self._download_with_retry(image_ref, host, fetch, report)
+            export_trace.add('downloaded_bytes', len(image_bytes))
         except Exception as e:
             print(f"Error processing image {image_ref}: {e}")
+            report.record_skip(image_ref, str(e))
             return None
 
+        self.cache.put(image_ref, image_bytes)
+        report.record_download(image_ref)
+        return image_bytes
+
+    async def _download_with_retry(self, image_ref: str, host: str,
+                                   fetch: Callable[[], Awaitable[bytes]], report: ExportReport) -> bytes:
+        """Скачивание с повторами и предохранителем для хоста"""
+        breaker = self.breakers.get(host)
+        attempt = 0
+
+        while True:
+            attempt += 1
+
+            if not breaker.allow_request():
+                raise CircuitOpenError(host)
+            is_probe = breaker.state == breaker.HALF_OPEN
+
+            try:
+                image_bytes = await fetch()
+                breaker.record_success()
+                return image_bytes
+
+            except TelegramRetryAfter as e:
+                # Telegram сам сообщает, сколько ждать - не считаем это отказом хоста
+                error, delay = e, float(e.retry_after)
+
+            except ImageDownloadError as e:
+                if not e.retryable:
+                    raise
+                breaker.record_failure()
+                error, delay = e, self.retry_policy.get_delay(attempt)
+
+            except (TelegramBadRequest, TelegramNotFound):
+                # Неверный или устаревший file_id - повтор не поможет
+                raise
+
+            except Exception as e:
+                # Сетевые ошибки, таймауты и ошибки сервера Telegram
+                breaker.record_failure()
+                error, delay = e, self.retry_policy.get_delay(attempt)
+
+            finally:
+                # Проба без успеха или отказа не должна навсегда закрыть хост
+                if is_probe:
+                    breaker.release_probe()
+
+            if attempt >= self.retry_policy.max_attempts:
+                raise error
+
+            report.record_retry(image_ref, error)
+            print(f"🔁 Повтор {attempt}/{self.retry_policy.max_attempts - 1} для {image_ref[:50]} "
+                  f"через {delay:.1f} с: {error}")
+            await asyncio.sleep(delay)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Общая HTTP сессия для всех загрузок"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def _fetch_url_image(self, image_url: str) -> bytes:
+        """Одна попытка скачать изображение по URL"""
+        session = await self._get_session()
+        async with session.get(image_url) as response:
+            if response.status == 200:
+                return await response.read()
+
+            # 4xx (кроме 408 и 429) - ошибка на нашей стороне, повторять бессмысленно
+            retryable = response.status >= 500 or response.status in (408, 429)
+            raise ImageDownloadError(f"HTTP {response.status}", retryable=retryable)
+
+    async def _fetch_telegram_image(self, file_id: str) -> bytes:
+        """Одна попытка скачать изображение из Telegram"""
+        file = await self.bot.get_file(file_id, request_timeout=self.timeout)
+        file_io = await self.bot.download_file(file.file_path, timeout=self.timeout)
+
+        if not file_io:
+            raise ImageDownloadError("пустой ответ Telegram")
+
+        file_io.seek(0)
+        image_bytes = file_io.read()
+        file_io.close()
+        return image_bytes
+
     async def download_url_image_async(self, image_url: str) -> Optional[bytes]:
         """Скачивает изображение по URL (асинхронно)"""
         try:
-            import aiohttp
-            async with aiohttp.ClientSession() as session:
-                async with session.get(image_url, timeout=30) as response:
-                    if response.status == 200:
-                        return await response.read()
-                    else:
-                        print(f"Error downloading URL image {image_url}: status {response.status}")
-                        return None
+            return await self._fetch_url_image(image_url)
         except Exception as e:
             print(f"Error downloading URL image {image_url}: {e}")
             return None
@@ -40,23 +163,19 @@ class ImageService:
     async def download_telegram_image(self, file_id: str) -> Optional[bytes]:
         """Скачивает изображение из Telegram по file_id"""
         try:
-            file = await self.bot.get_file(file_id)
-            file_io = await self.bot.download_file(file.file_path)
-
-            if file_io:
-                file_io.seek(0)
-                image_bytes = file_io.read()
-                file_io.close()
-                return image_bytes
-            return None
-
+            return await self._fetch_telegram_image(file_id)
         except Exception as e:
             print(f"Error downloading Telegram image {file_id}: {e}")
             return None
 
+    async def close(self):
+        """Закрытие HTTP сессии"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
     def is_telegram_file_id(self, file_reference: str) -> bool:
         telegram_prefixes = ['AgAC', 'BAAC', 'CAAC', 'DAAC', 'AQAD', 'BQAD', 'CQAD', 'DQAD']
         return any(file_reference.startswith(prefix) for prefix in telegram_prefixes) if file_reference else False
 
     def is_url(self, file_reference: str) -> bool:
-        return file_reference.startswith(('http://', 'https://')) if file_reference else False
\ No newline at end of file
+        return file_reference.startswith(('http://', 'https://')) if file_reference else False
@@ -5,17 +5,88 @@ import random
 
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, Message
 
+from .fuzzy_search import TrigramIndex
 from .metro_data import generate_metro_address
+from .reference_data import reference_data
+
+
+class CityGazetteer:
+    """Справочник городов с индексами по названию и региону (только для чтения)"""
+
+    def __init__(self, cities: List[Dict]):
+        # Самые крупные города - первыми
+        self.cities = sorted(cities, key=lambda city: city['population'], reverse=True)
+        self.names = [city['name'] for city in self.cities]
+        self._search_keys = [self.normalize(name) for name in self.names]
+
+        self.by_name: Dict[str, Dict] = {}
+        self.by_region: Dict[str, List[Dict]] = {}
+        for city in self.cities:
+            # При совпадении названий остается самый крупный город
+            self.by_name.setdefault(self.normalize(city['name']), city)
+            if city['region']:
+                self.by_region.setdefault(city['region'], []).append(city)
+
+        self.regions = sorted(self.by_region)
+
+        # Индекс для нечеткого поиска строится при первом обращении
+        self._trigram_index: Optional[TrigramIndex] = None
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        """Ключ названия: без регистра, ё -> е, дефис равен пробелу"""
+        return ' '.join(name.casefold().replace('ё', 'е').replace('-', ' ').split())
+
+    def get(self, name: str) -> Optional[Dict]:
+        """Город по точному названию без учета регистра"""
+        return self.by_name.get(self.normalize(name))
+
+    def top(self, count: int) -> List[Dict]:
+        """Самые крупные города"""
+        return self.cities[:count]
+
+    def search(self, query: str) -> List[Dict]:
+        """Города, в названии которых есть query"""
+        key = self.normalize(query)
+        return [self.cities[i] for i, name_key in enumerate(self._search_keys) if key in name_key]
+
+    def build_fuzzy_index(self):
+        """Строит индекс нечеткого поиска заранее (например, в фоновом потоке)"""
+        if self._trigram_index is None:
+            self._trigram_index = TrigramIndex(self.names)
+
+    def search_fuzzy(self, query: str, limit: int = 5) -> List[tuple]:
+        """Похожие города с учетом опечаток: [(город, расстояние)]"""
+        self.build_fuzzy_index()
+        return [(self.cities[index], distance) for index, distance in self._trigram_index.search(query, limit)]
+
+    def get_region_cities(self, region: str) -> List[Dict]:
+        return self.by_region.get(region, [])
+
+    def __len__(self) -> int:
+        return len(self.cities)
 
 
 class LocationService:
     """Сервис для работы с локациями"""
 
+    CITIES_FILE = 'cities.xml'
+
+    @staticmethod
+    def get_gazetteer() -> CityGazetteer:
+        """Справочник городов из реестра справочников"""
+        return reference_data.get('cities')
+
     @staticmethod
     def load_cities_from_xml() -> List[Dict]:
         """Загрузка городов из XML"""
+        return list(LocationService.get_gazetteer().cities)
+
+    @staticmethod
+    def _parse_cities_xml() -> List[Dict]:
+        """Парсинг файла городов"""
         try:
-            tree = ET.parse('cities.xml')
+            tree = ET.parse(LocationService.CITIES_FILE)
             root = tree.getroot()
 
             cities = []
@@ -29,13 +100,12 @@ class LocationService:
                         city_data = {
                             'name': name_elem.text.strip(),
                             'population': int(population_elem.text) if population_elem.text else 0,
-                            'region': region_elem.text if region_elem else ''
+                            'region': region_elem.text.strip() if region_elem is not None and region_elem.text else ''
                         }
                         cities.append(city_data)
                 except (ValueError, AttributeError):
                     continue
 
-            cities.sort(key=lambda x: x['population'], reverse=True)
             return cities
 
         except Exception as e:
@@ -57,8 +127,9 @@ class LocationService:
         metro_cities = ['Москва', 'Санкт-Петербург', 'Нижний Новгород', 'Новосибирск',
                         'Самара', 'Екатеринбург', 'Казань']
 
-        all_cities = LocationService.load_cities_from_xml()
-        return [city for city in all_cities if city['name'] in metro_cities]
+        gazetteer = LocationService.get_gazetteer()
+        cities = [gazetteer.get(name) for name in metro_cities]
+        return sorted((city for city in cities if city), key=lambda city: city['population'], reverse=True)
 
     @staticmethod
     def generate_address(city: str, ad_number: int = 1, metro_station: str = None) -> str:
@@ -100,10 +171,10 @@ class LocationService:
     @staticmethod
     async def ask_quantity_from_xml(message: Message, user_name: str = ""):
         """Запрос количества объявлений для метода из XML"""
-        cities = LocationService.load_cities_from_xml()
-        total_cities = len(cities)
+        gazetteer = LocationService.get_gazetteer()
+        total_cities = len(gazetteer)
 
-        sample_cities = ", ".join([city['name'] for city in cities[:5]])
+        sample_cities = ", ".join(gazetteer.names[:5])
 
         greeting = f"{user_name}, " if user_name else ""
         await message.answer(
@@ -227,16 +298,12 @@ class LocationService:
     @staticmethod
     async def search_cities(query: str) -> list:
         """Поиск городов по запросу"""
-        # Реализация поиска городов
-        cities = LocationService.load_cities_from_xml()
-        return [city for city in cities if query.lower() in city['name'].lower()]
+        return LocationService.get_gazetteer().search(query)
 
     @staticmethod
     def get_available_regions() -> list:
         """Получение списка доступных регионов"""
-        cities = LocationService.load_cities_from_xml()
-        regions = list(set(city['region'] for city in cities if 'region' in city))
-        return sorted(regions)
+        return list(LocationService.get_gazetteer().regions)
 
     @staticmethod
     async def ask_single_city_for_multiple(message: Message, user_name: str = ""):
@@ -279,10 +346,10 @@ class LocationService:
     @staticmethod
     async def ask_quantity_from_xml(message: Message, user_name: str = ""):
         """Запрос количества объявлений для метода из XML"""
-        cities = LocationService.load_cities_from_xml()
-        total_cities = len(cities)
+        gazetteer = LocationService.get_gazetteer()
+        total_cities = len(gazetteer)
 
-        sample_cities = ", ".join([city['name'] for city in cities[:5]])
+        sample_cities = ", ".join(gazetteer.names[:5])
 
         greeting = f"{user_name}, " if user_name else ""
         await message.answer(
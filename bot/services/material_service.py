@@ -0,0 +1,64 @@
+# bot/services/material_service.py
+import xml.etree.ElementTree as ET
+from typing import NamedTuple, Tuple
+
+from bot.services.reference_data import reference_data
+
+
+class MaterialsCatalog(NamedTuple):
+    """Материалы по товарным группам (неизменяемые списки)"""
+    clothing: Tuple[str, ...]
+    shoes: Tuple[str, ...]
+
+
+class MaterialService:
+    """Сервис для работы с материалами"""
+
+    MATERIALS_FILE = 'materials.xml'
+
+    # Базовые списки на случай ошибки чтения файла
+    DEFAULT_CLOTHING_MATERIALS = (
+        "Хлопок", "Лён", "Шерсть", "Шёлк", "Кашемир", "Вискоза",
+        "Полиэстер", "Нейлон", "Акрил", "Эластан", "Кожа", "Замша",
+        "Джинса", "Флис", "Вельвет", "Бархат", "Атлас", "Сетка"
+    )
+    DEFAULT_SHOE_MATERIALS = (
+        "Алова", "Атлас", "Байка", "Бархат", "Велюр",
+        "Войлок", "Дерево", "Кожа", "Замша", "Текстиль"
+    )
+
+    @staticmethod
+    def get_catalog() -> MaterialsCatalog:
+        """Каталог материалов из реестра справочников"""
+        return reference_data.get('materials')
+
+    @staticmethod
+    def get_clothing_materials() -> Tuple[str, ...]:
+        return MaterialService.get_catalog().clothing
+
+    @staticmethod
+    def get_shoe_materials() -> Tuple[str, ...]:
+        return MaterialService.get_catalog().shoes
+
+    @staticmethod
+    def _load_catalog() -> MaterialsCatalog:
+        """Загрузка материалов из materials.xml"""
+        try:
+            tree = ET.parse(MaterialService.MATERIALS_FILE)
+            root = tree.getroot()
+
+            materials = tuple(
+                material_elem.text.strip()
+                for material_elem in root.findall('.//MaterialsOdezhda')
+                if material_elem.text and material_elem.text.strip()
+            )
+
+            # В Avito одежда и обувь используют один справочник MaterialsOdezhda
+            return MaterialsCatalog(clothing=materials, shoes=materials)
+
+        except Exception as e:
+            print(f"Error loading materials from XML: {e}")
+            return MaterialsCatalog(
+                clothing=MaterialService.DEFAULT_CLOTHING_MATERIALS,
+                shoes=MaterialService.DEFAULT_SHOE_MATERIALS
+            )
@@ -0,0 +1,174 @@
+# bot/services/metrics.py
+"""
+Метрики бота в текстовом формате Prometheus.
+
+Счетчики и гистограммы хранятся в памяти процесса; MetricsServer отдает
+их по HTTP на /metrics. При BOT_WORKERS > 1 у каждого процесса-обработчика
+свой сервер (см. bot/sharding.py).
+"""
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Границы гистограмм длительности (секунды): от быстрых хендлеров до долгих экспортов
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Гистограмма одного набора меток"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Счетчики, текущие значения (gauge) и гистограммы с метками"""
+
+    def __init__(self):
+        # имя -> (тип, описание)
+        self._descriptions: Dict[str, Tuple[str, str]] = {}
+        self._values: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._buckets: Dict[str, Sequence[float]] = {}
+
+    def describe(self, name: str, metric_type: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self._descriptions[name] = (metric_type, help_text)
+        if metric_type == 'histogram':
+            self._histograms.setdefault(name, {})
+            self._buckets[name] = buckets
+        else:
+            self._values.setdefault(name, {})
+
+    @staticmethod
+    def _labels(labels: Optional[Dict[str, object]]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in (labels or {}).items()))
+
+    def inc(self, name: str, labels: Dict[str, object] = None, value: float = 1.0):
+        series = self._values.setdefault(name, {})
+        key = self._labels(labels)
+        series[key] = series.get(key, 0.0) + value
+
+    def dec(self, name: str, labels: Dict[str, object] = None, value: float = 1.0):
+        self.inc(name, labels, -value)
+
+    def observe(self, name: str, value: float, labels: Dict[str, object] = None):
+        series = self._histograms.setdefault(name, {})
+        key = self._labels(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(self._buckets.get(name, DEFAULT_BUCKETS))
+        histogram.observe(value)
+
+    @contextmanager
+    def track(self, name: str, labels: Dict[str, object] = None):
+        """Длительность блока в гистограмму {name}_seconds, число выполняющихся - в {name}_in_progress"""
+        self.inc(f"{name}_in_progress", labels)
+        started_at = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(f"{name}_errors_total", labels)
+            raise
+        finally:
+            self.dec(f"{name}_in_progress", labels)
+            self.observe(f"{name}_seconds", time.perf_counter() - started_at, labels)
+
+    def get_value(self, name: str, labels: Dict[str, object] = None) -> float:
+        return self._values.get(name, {}).get(self._labels(labels), 0.0)
+
+    def get_histogram(self, name: str, labels: Dict[str, object] = None) -> Optional[Histogram]:
+        return self._histograms.get(name, {}).get(self._labels(labels))
+
+    @staticmethod
+    def _format_labels(labels: Labels, extra: Tuple[str, str] = None) -> str:
+        pairs = list(labels) + ([extra] if extra else [])
+        if not pairs:
+            return ''
+        escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+    @staticmethod
+    def _format_number(value: float) -> str:
+        return str(int(value)) if float(value).is_integer() else repr(value)
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        lines: List[str] = []
+        names = sorted(set(self._values) | set(self._histograms))
+        for name in names:
+            metric_type, help_text = self._descriptions.get(name, ('histogram' if name in self._histograms
+                                                                   else 'untyped', ''))
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+            for labels, value in sorted(self._values.get(name, {}).items()):
+                lines.append(f"{name}{self._format_labels(labels)} {self._format_number(value)}")
+
+            for labels, histogram in sorted(self._histograms.get(name, {}).items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self._format_labels(labels, ('le', repr(float(bound))))} {cumulative}")
+                lines.append(f"{name}_bucket{self._format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                lines.append(f"{name}_sum{self._format_labels(labels)} {repr(histogram.sum)}")
+                lines.append(f"{name}_count{self._format_labels(labels)} {histogram.count}")
+
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """HTTP сервер с метриками на /metrics"""
+
+    def __init__(self, registry: MetricsRegistry, host: str, port: int):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self):
+        from aiohttp import web
+
+        async def handle(request: web.Request) -> web.Response:
+            return web.Response(text=self.registry.render(), content_type='text/plain', charset='utf-8',
+                                headers={'X-Content-Type-Options': 'nosniff'})
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        print(f"📈 Метрики доступны на http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+# Глобальный реестр метрик
+metrics = MetricsRegistry()
+metrics.describe('bot_updates_total', 'counter', 'Обновления по типу и состоянию FSM')
+metrics.describe('bot_update_seconds', 'histogram', 'Полное время обработки обновления')
+metrics.describe('bot_update_errors_total', 'counter', 'Обновления, завершившиеся ошибкой')
+metrics.describe('bot_handler_seconds', 'histogram', 'Время работы хендлера')
+metrics.describe('bot_handler_errors_total', 'counter', 'Ошибки в хендлерах')
+metrics.describe('bot_export_in_progress', 'gauge', 'Выполняющиеся экспорты')
+metrics.describe('bot_export_seconds', 'histogram', 'Длительность экспорта')
+metrics.describe('bot_export_errors_total', 'counter', 'Экспорты, завершившиеся ошибкой')
+metrics.describe('bot_export_stage_seconds', 'histogram', 'Длительность этапов экспорта (см. export_trace)')
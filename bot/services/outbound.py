@@ -0,0 +1,232 @@
+# bot/services/outbound.py
+"""
+Единая очередь исходящих запросов к Bot API.
+
+Подключается как middleware сессии бота, поэтому обработчики по-прежнему
+вызывают message.answer / edit_text / answer_document, а все запросы
+проходят через общий и поканальный ограничители частоты.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional, Tuple
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerCallbackQuery, EditMessageCaption, EditMessageText, GetUpdates, SendChatAction
+
+from bot.services.rate_limit import TokenBucket
+
+# Меньше - раньше
+PRIORITY_CALLBACK = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BULK = 2
+
+# Правки сообщений и "печатает..." - прогресс, их можно задержать
+_BULK_METHODS = (EditMessageText, EditMessageCaption, SendChatAction)
+
+# Сколько чатов держать в памяти, прежде чем удалять простаивающие
+MAX_IDLE_CHATS = 10000
+
+
+def get_priority(method) -> int:
+    if isinstance(method, AnswerCallbackQuery):
+        return PRIORITY_CALLBACK
+    if isinstance(method, _BULK_METHODS):
+        return PRIORITY_BULK
+    return PRIORITY_INTERACTIVE
+
+
+class PriorityTokenBucket:
+    """TokenBucket, который выдает токены ожидающим в порядке приоритета"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.bucket = TokenBucket(rate=rate, capacity=capacity)
+        self.paused_until = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._pump_task: Optional[asyncio.Task] = None
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, priority: int):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        await future
+
+    async def _pump(self):
+        while self._waiters:
+            pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+
+            wait_time = self.bucket.get_wait_time()
+            if wait_time > 0:
+                await asyncio.sleep(wait_time)
+                continue
+
+            _, _, future = heapq.heappop(self._waiters)
+            # Отмененные ожидающие токен не забирают
+            if not future.done():
+                self.bucket.try_acquire()
+                future.set_result(None)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+
+class ChatChannel:
+    """Очередь одного чата: запросы уходят по одному и не чаще лимита чата"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.bucket = TokenBucket(rate=rate, capacity=capacity)
+        self.lock = asyncio.Lock()
+        self.paused_until = 0.0
+
+    @property
+    def idle(self) -> bool:
+        return not self.lock.locked() and self.paused_until <= time.monotonic()
+
+
+class _CoalescedEdit:
+    """
+    Правка, ожидающая отправки; более новая правка того же сообщения заменяет method.
+    Отправляет ее отдельная задача, поэтому отмена первого вызова не оставляет
+    без ответа тех, чьи правки с ней склеились.
+    """
+
+    def __init__(self, method):
+        self.method = method
+        self.started = False
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+
+
+class OutboundScheduler(BaseRequestMiddleware):
+    """
+    Планировщик исходящих запросов:
+    - общий лимит на бота и отдельный на каждый чат (TokenBucket);
+    - ответы пользователю и на callback раньше правок прогресса;
+    - 429 (retry_after) - пауза чата и повтор вместо ошибки в обработчике;
+    - частые edit_text одного сообщения склеиваются: уходит последний текст.
+    """
+
+    def __init__(self, global_rate: float = 30.0, chat_rate: float = 1.0, chat_burst: float = 3.0,
+                 max_retries: int = 3):
+        self.global_bucket = PriorityTokenBucket(rate=global_rate, capacity=global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._chats: Dict[object, ChatChannel] = {}
+        self._pending_edits: Dict[tuple, _CoalescedEdit] = {}
+        self.stats = {'sent': 0, 'retried': 0, 'coalesced': 0}
+
+    async def __call__(self, make_request, bot, method):
+        if isinstance(method, GetUpdates):
+            # Long polling не ограничиваем
+            return await make_request(bot, method)
+
+        edit_key = self._get_edit_key(method)
+        if edit_key is None:
+            return await self._send(make_request, bot, method)
+
+        pending = self._pending_edits.get(edit_key)
+        if pending is not None and not pending.started:
+            # Предыдущая правка еще в очереди - отправится только новый текст
+            pending.method = method
+            self.stats['coalesced'] += 1
+            return await self._wait_edit(pending)
+
+        edit = _CoalescedEdit(method)
+        self._pending_edits[edit_key] = edit
+        edit.task = asyncio.ensure_future(self._send_edit(make_request, bot, edit, edit_key))
+        return await self._wait_edit(edit)
+
+    async def _send_edit(self, make_request, bot, edit: _CoalescedEdit, edit_key: tuple):
+        try:
+            return await self._send(make_request, bot, edit, edit_key=edit_key)
+        finally:
+            if self._pending_edits.get(edit_key) is edit:
+                del self._pending_edits[edit_key]
+
+    @staticmethod
+    async def _wait_edit(edit: _CoalescedEdit):
+        """Результат правки; отправка отменяется, только когда ее больше никто не ждет"""
+        edit.waiters += 1
+        try:
+            return await asyncio.shield(edit.task)
+        except asyncio.CancelledError:
+            if edit.waiters == 1 and not edit.task.done():
+                edit.task.cancel()
+            raise
+        finally:
+            edit.waiters -= 1
+
+    @staticmethod
+    def _get_edit_key(method) -> Optional[tuple]:
+        if not isinstance(method, EditMessageText):
+            return None
+        if method.inline_message_id:
+            return ('inline', method.inline_message_id)
+        return (method.chat_id, method.message_id)
+
+    def _get_chat(self, chat_id) -> Optional[ChatChannel]:
+        if chat_id is None:
+            return None
+
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            if len(self._chats) >= MAX_IDLE_CHATS:
+                self._chats = {key: value for key, value in self._chats.items() if not value.idle}
+            chat = ChatChannel(self.chat_rate, self.chat_burst)
+            self._chats[chat_id] = chat
+        return chat
+
+    async def _send(self, make_request, bot, method_or_edit, edit_key: tuple = None):
+        method = method_or_edit.method if edit_key else method_or_edit
+        chat = self._get_chat(getattr(method, 'chat_id', None))
+        priority = get_priority(method)
+
+        if chat is None:
+            return await self._request(make_request, bot, method_or_edit, None, priority)
+
+        async with chat.lock:
+            return await self._request(make_request, bot, method_or_edit, chat, priority)
+
+    async def _request(self, make_request, bot, method_or_edit, chat: Optional[ChatChannel], priority: int):
+        attempt = 0
+        while True:
+            if chat is not None:
+                pause = chat.paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                await chat.bucket.acquire()
+            await self.global_bucket.acquire(priority)
+
+            if isinstance(method_or_edit, _CoalescedEdit):
+                # Дальше текст правки не меняется
+                method_or_edit.started = True
+                method = method_or_edit.method
+            else:
+                method = method_or_edit
+
+            try:
+                result = await make_request(bot, method)
+                self.stats['sent'] += 1
+                return result
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                self.stats['retried'] += 1
+                print(f"⏳ Telegram просит подождать {e.retry_after} с ({type(method).__name__})")
+                if chat is not None:
+                    chat.paused_until = time.monotonic() + e.retry_after
+                else:
+                    self.global_bucket.pause(e.retry_after)
@@ -6,6 +6,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from bot.calendar import ProductCalendar
+from bot.keyboards.builders import ProductKeyboards
 from bot.handlers.base import StateManager
 from bot.states import ProductStates
 
@@ -75,39 +76,30 @@ class ProductService:
     @staticmethod
     async def show_subsubcategories(message: Message, subcategory_id: str, user_name: str = ""):
         """Показать подкатегории третьего уровня"""
-        import config
-
-        # Ищем подкатегорию во всех категориях
-        subcategory_data = None
-        parent_category_name = ""
+        from bot.services.category_service import CategoryService
 
-        for cat_id, cat_data in config.AVITO_CATEGORIES.items():
-            subcategories = cat_data.get("subcategories", {})
-            if subcategory_id in subcategories:
-                subcategory_data = subcategories[subcategory_id]
-                parent_category_name = cat_data["name"]
-                break
+        index = CategoryService.get_index()
+        subcategory = index.get_subcategory(subcategory_id)
 
-        if not subcategory_data or not isinstance(subcategory_data, dict):
+        if not subcategory or not index.has_subcategories(subcategory):
             await message.answer("Ошибка: подкатегория не найдена или не имеет вложенных категорий")
             return
 
-        subsubcategories = subcategory_data.get("subcategories", {})
-        if not subsubcategories:
+        if not subcategory.children:
             await message.answer("В этой подкатегории нет дополнительных категорий")
             return
 
         builder = InlineKeyboardBuilder()
 
-        for subsubcat_id, subsubcat_name in subsubcategories.items():
-            builder.button(text=subsubcat_name, callback_data=f"sub_{subsubcat_id}")
+        for subsubcategory in subcategory.children:
+            builder.button(text=subsubcategory.name, callback_data=f"sub_{subsubcategory.id}")
 
         builder.button(text="🔙 Назад к подкатегориям", callback_data=f"back_sub_{subcategory_id}")
         builder.adjust(1)
 
         greeting = f"{user_name}, " if user_name else ""
         await message.answer(
-            f"{greeting}выберите тип {subcategory_data['name']} для {parent_category_name}:",
+            f"{greeting}выберите тип {subcategory.name} для {subcategory.levels[0]}:",
             reply_markup=builder.as_markup()
         )
 
@@ -120,101 +112,51 @@ class ProductService:
     @staticmethod
     def process_subcategory_selection(main_category_id: str, subcategory_id: str):
         """Обработка выбора подкатегории"""
-        import config
+        from bot.services.category_service import CategoryService
 
-        category_data = config.AVITO_CATEGORIES.get(main_category_id)
-        if not category_data:
+        index = CategoryService.get_index()
+        if index.get_main(main_category_id) is None:
             return None
 
-        # Ищем подкатегорию в основном списке и во вложенных подкатегориях
-        subcategories = category_data.get("subcategories", {})
+        # Подкатегория второго уровня или, если такой нет, третьего
+        category = index.get_in_main(main_category_id, subcategory_id)
+        if category is None:
+            return None
 
-        # Сначала проверяем прямые подкатегории
-        subcategory_data = subcategories.get(subcategory_id)
+        if index.has_subcategories(category):
+            # Это категория с подкатегориями - возвращаем специальный маркер
+            return {
+                'has_subcategories': True,
+                'subcategory_id': subcategory_id,
+                'category_name': category.full_name,
+                'subcategory_name': category.name
+            }
 
-        if subcategory_data:
-            if isinstance(subcategory_data, dict) and "subcategories" in subcategory_data:
-                # Это категория с подкатегориями - возвращаем специальный маркер
-                return {
-                    'has_subcategories': True,
-                    'subcategory_id': subcategory_id,
-                    'category_name': f"{category_data['name']} - {subcategory_data['name']}",
-                    'subcategory_name': subcategory_data['name']
-                }
-            else:
-                # Это конечная подкатегория второго уровня
-                subcategory_name = subcategory_data
-
-                if not subcategory_name:
-                    return None
-
-                # Получаем ID категории для Avito
-                avito_category_id = config.CATEGORY_IDS.get(
-                    subcategory_id,
-                    config.CATEGORY_IDS.get(main_category_id)
-                )
-
-                return {
-                    'has_subcategories': False,
-                    'category': avito_category_id,
-                    'category_name': f"{category_data['name']} - {subcategory_name}",
-                    'subcategory_name': subcategory_name
-                }
-
-        # Если не нашли в прямых подкатегориях, ищем во вложенных
-        for subcat_id, subcat_data in subcategories.items():
-            if isinstance(subcat_data, dict) and "subcategories" in subcat_data:
-                subsubcategories = subcat_data.get("subcategories", {})
-                if subcategory_id in subsubcategories:
-                    # Нашли подкатегорию третьего уровня
-                    subsubcategory_name = subsubcategories[subcategory_id]
-
-                    # Получаем ID категории для Avito
-                    avito_category_id = config.CATEGORY_IDS.get(
-                        subcategory_id,
-                        config.CATEGORY_IDS.get(main_category_id)
-                    )
-
-                    return {
-                        'has_subcategories': False,
-                        'category': avito_category_id,
-                        'category_name': f"{category_data['name']} - {subcat_data['name']} - {subsubcategory_name}",
-                        'subcategory_name': subsubcategory_name
-                    }
-
-        return None
+        if not category.name:
+            return None
+
+        return {
+            'has_subcategories': False,
+            'category': category.avito_id,
+            'category_name': category.full_name,
+            'subcategory_name': category.name
+        }
 
     @staticmethod
     def find_subsubcategory(main_category_id: str, subsubcategory_id: str):
         """Поиск подкатегории третьего уровня"""
-        import config
+        from bot.services.category_service import CategoryService
 
-        category_data = config.AVITO_CATEGORIES.get(main_category_id)
-        if not category_data:
+        category = CategoryService.get_index().get_third_level(main_category_id, subsubcategory_id)
+        if category is None:
             return None
 
-        subcategories = category_data.get("subcategories", {})
-
-        for subcat_id, subcat_data in subcategories.items():
-            if isinstance(subcat_data, dict) and "subcategories" in subcat_data:
-                subsubcategories = subcat_data.get("subcategories", {})
-                if subsubcategory_id in subsubcategories:
-                    subsubcategory_name = subsubcategories[subsubcategory_id]
-
-                    # Получаем ID категории для Avito
-                    avito_category_id = config.CATEGORY_IDS.get(
-                        subsubcategory_id,
-                        config.CATEGORY_IDS.get(main_category_id)
-                    )
-
-                    return {
-                        'category': avito_category_id,
-                        'category_name': f"{category_data['name']} - {subcat_data['name']} - {subsubcategory_name}",
-                        'subcategory_name': subsubcategory_name,
-                        'parent_subcategory_name': subcat_data['name']
-                    }
-
-        return None
+        return {
+            'category': category.avito_id,
+            'category_name': category.full_name,
+            'subcategory_name': category.name,
+            'parent_subcategory_name': category.levels[1]
+        }
 
     @staticmethod
     def get_subcategory_name(main_category_id: str, subcategory_id: str) -> str:
@@ -257,17 +199,10 @@ class ProductService:
     @staticmethod
     async def show_contact_methods(message: Message, user_name: str = ""):
         """Показать варианты способов связи"""
-        builder = InlineKeyboardBuilder()
-
-        builder.button(text="📞 По телефону и в сообщении", callback_data="contact_both")
-        builder.button(text="📞 По телефону", callback_data="contact_phone")
-        builder.button(text="💬 В сообщении", callback_data="contact_message")
-        builder.adjust(1)
-
         greeting = f"{user_name}, " if user_name else ""
         await message.answer(
             f"{greeting}выберите предпочтительный способ связи:",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_contact_methods_keyboard()
         )
 
     @staticmethod
@@ -296,107 +231,38 @@ class ProductService:
     @staticmethod
     async def ask_size(message: Message, user_name: str = ""):
         """Запрос размера товара"""
-        builder = InlineKeyboardBuilder()
-
-        # Группируем размеры по диапазонам для лучшего отображения
-        size_ranges = [
-            # Малые размеры
-            ["36", "36,5", "37", "37,5"],
-            # Средние размеры
-            ["38", "38,5", "39", "39,5"],
-            ["40", "40,5", "41", "41,5"],
-            # Большие размеры
-            ["42", "42,5", "43", "43,5"],
-            ["44", "44,5", "45", "45,5"],
-            # Очень большие размеры
-            ["46", "46,5", "47", "47,5", "48+"]
-        ]
-
-        # Добавляем кнопки размеров по группам
-        for size_group in size_ranges:
-            for size in size_group:
-                builder.button(text=size, callback_data=f"size_{size}")
-
-        # Первые 4 группы по 4 кнопки, последняя группа 5 кнопок, затем 2 кнопки действий
-        builder.adjust(4, 4, 4, 4, 5, 2)
-
         greeting = f"{user_name}, " if user_name else ""
         await message.answer(
             f"{greeting}выберите размер обуви:",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_shoe_size_keyboard()
         )
 
     @staticmethod
     async def ask_condition(message: Message, user_name: str = ""):
         """Запрос состояния товара"""
-        builder = InlineKeyboardBuilder()
-
-        conditions = [
-            ("🆕 Новое с биркой", "new_with_tag"),
-            ("⭐ Отличное", "excellent"),
-            ("👍 Хорошее", "good"),
-            ("✅ Удовлетворительное", "satisfactory")
-        ]
-
-        for condition_name, condition_code in conditions:
-            builder.button(text=condition_name, callback_data=f"condition_{condition_code}")
-
-        builder.adjust(1)
-
         greeting = f"{user_name}, " if user_name else ""
         await message.answer(
             f"{greeting}выберите состояние товара:",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_condition_keyboard()
         )
 
     @staticmethod
     async def ask_clothing_size(message: Message, user_name: str = ""):
         """Запрос размера одежды"""
-        from aiogram.utils.keyboard import InlineKeyboardBuilder
-
-        builder = InlineKeyboardBuilder()
-
-        # Размеры одежды согласно требованиям Avito
-        clothing_sizes = [
-            "40 (XXS)", "42 (XS)", "44 (XS/S)", "46 (S)", "48 (M)",
-            "50 (L)", "52 (L/XL)", "54 (XL)", "56 (XXL)", "58 (XXL)",
-            "60 (3XL)", "62 (4XL)", "64 (5XL)", "66 (6XL)", "68 (7XL)",
-            "70 (7XL)", "72 (8XL)", "74 (8XL)", "76 (9XL)", "78 (10XL)",
-            "80 (10XL)", "82+ (10XL+)", "One size", "Без размера"
-        ]
-
-        for size in clothing_sizes:
-            builder.button(text=size, callback_data=f"clothing_size_{size}")
-
-        builder.adjust(2)  # 2 кнопки в ряду
-
         greeting = f"{user_name}, " if user_name else ""
 
         await message.answer(
             f"{greeting}выберите размер одежды:",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_clothing_size_keyboard()
         )
 
     @staticmethod
     async def ask_sale_type(message: Message, user_name: str = ""):
         """Запрос типа продажи"""
-        builder = InlineKeyboardBuilder()
-
-        sale_types = [
-            ("🛒 Товар приобретен на продажу", "resale"),
-            ("🏭 Товар от производителя", "manufacturer"),
-            ("👤 Продаю своё", "personal")
-        ]
-
-        for sale_name, sale_code in sale_types:
-            builder.button(text=sale_name, callback_data=f"saletype_{sale_code}")
-
-        builder.adjust(1)
-
         greeting = f"{user_name}, " if user_name else ""
         await message.answer(
             f"{greeting}выберите тип продажи:",
-            reply_markup=builder.as_markup()
+            reply_markup=ProductKeyboards.get_sale_type_keyboard()
         )
 
     @staticmethod
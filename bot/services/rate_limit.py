@@ -0,0 +1,40 @@
+# bot/services/rate_limit.py
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Асинхронный ограничитель частоты: rate токенов в секунду, запас до capacity"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Забирает токены, если они есть, без ожидания"""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def get_wait_time(self, tokens: float = 1.0) -> float:
+        """Сколько секунд ждать, пока накопится нужное количество токенов"""
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1.0):
+        """Ждет, пока токены станут доступны (запросы обслуживаются по очереди)"""
+        async with self._lock:
+            while not self.try_acquire(tokens):
+                await asyncio.sleep(self.get_wait_time(tokens))
@@ -0,0 +1,228 @@
+# bot/services/reference_data.py
+import asyncio
+import os
+import runpy
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import config
+
+
+class ReferenceDataset:
+    """Описание набора справочных данных: как загрузить и от каких файлов он зависит"""
+
+    def __init__(self, name: str, loader: Callable[[], Any], sources: List[str],
+                 on_swap: Optional[Callable[[Any], None]] = None, builders: Optional[List[str]] = None):
+        self.name = name
+        self.loader = loader
+        self.sources = sources
+        self.on_swap = on_swap
+        # Модули с классами справочника: их изменение делает блок снимка устаревшим
+        self.builders = builders or []
+
+    @property
+    def snapshot_sources(self) -> List[str]:
+        return self.sources + self.builders
+
+
+class ReferenceDataRegistry:
+    """
+    Реестр справочников (бренды, города, материалы, метро, категории).
+    Каждый набор загружается один раз в неизменяемую индексированную структуру.
+    При изменении исходных файлов новая версия строится в отдельном потоке
+    и подменяет старую одной операцией присваивания - обработчики, которые уже
+    получили старую версию, дорабатывают с ней.
+    """
+
+    def __init__(self):
+        self._datasets: Dict[str, ReferenceDataset] = {}
+        self._values: Dict[str, Any] = {}
+        self._mtimes: Dict[str, Tuple[Optional[float], ...]] = {}
+        self._load_lock = threading.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+        self._snapshot = None
+
+    def use_snapshot(self, snapshot):
+        """Готовые структуры из бинарного снимка вместо разбора исходников (см. reference_snapshot)"""
+        self._snapshot = snapshot
+
+    def get_dataset(self, name: str) -> ReferenceDataset:
+        return self._datasets[name]
+
+    def register(self, name: str, loader: Callable[[], Any], sources: List[str],
+                 on_swap: Optional[Callable[[Any], None]] = None, builders: Optional[List[str]] = None):
+        self._datasets[name] = ReferenceDataset(name, loader, sources, on_swap, builders)
+
+    def get(self, name: str) -> Any:
+        """Текущая версия набора; первая загрузка происходит при первом обращении"""
+        value = self._values.get(name)
+        if value is None:
+            with self._load_lock:
+                value = self._values.get(name)
+                if value is None:
+                    value = self._load(self._datasets[name])
+        return value
+
+    def _get_mtimes(self, dataset: ReferenceDataset) -> Tuple[Optional[float], ...]:
+        mtimes = []
+        for path in dataset.sources:
+            try:
+                mtimes.append(os.path.getmtime(path))
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _load(self, dataset: ReferenceDataset) -> Any:
+        """Строит новую версию набора и атомарно подменяет текущую"""
+        mtimes = self._get_mtimes(dataset)
+
+        value = self._snapshot.get(dataset.name, dataset.snapshot_sources) if self._snapshot else None
+        if value is None:
+            value = dataset.loader()
+            if self._snapshot and self._snapshot.invalid:
+                self._store_snapshot(dataset, value)
+
+        self._values[dataset.name] = value
+        self._mtimes[dataset.name] = mtimes
+        if dataset.on_swap:
+            dataset.on_swap(value)
+        return value
+
+    def _store_snapshot(self, dataset: ReferenceDataset, value: Any):
+        """Устаревший или поврежденный блок снимка пересобирается, а не используется"""
+        try:
+            self._snapshot.store(dataset.name, dataset.snapshot_sources, value)
+            print(f"📦 Справочник '{dataset.name}' пересобран в снимке")
+        except Exception as e:
+            print(f"⚠️ Не удалось обновить снимок справочников: {e}")
+
+    def get_changed(self) -> List[str]:
+        """Загруженные наборы, исходные файлы которых изменились"""
+        return [
+            name for name, dataset in self._datasets.items()
+            if name in self._values and self._get_mtimes(dataset) != self._mtimes.get(name)
+        ]
+
+    async def reload(self, names: Optional[List[str]] = None) -> List[str]:
+        """Перезагрузка наборов (по умолчанию - всех) без блокировки цикла событий"""
+        names = names or list(self._datasets)
+        reloaded = []
+
+        for name in names:
+            dataset = self._datasets.get(name)
+            if dataset is None:
+                continue
+            try:
+                await asyncio.to_thread(self._reload_locked, dataset)
+                reloaded.append(name)
+                print(f"🔄 Справочник '{name}' перезагружен")
+            except Exception as e:
+                # Старая версия остается рабочей
+                print(f"❌ Ошибка перезагрузки справочника '{name}': {e}")
+
+        return reloaded
+
+    def _reload_locked(self, dataset: ReferenceDataset):
+        with self._load_lock:
+            self._load(dataset)
+
+    async def watch(self, interval: float):
+        """Периодически проверяет mtime исходных файлов и перезагружает изменившиеся"""
+        while True:
+            await asyncio.sleep(interval)
+            changed = self.get_changed()
+            if changed:
+                await self.reload(changed)
+
+    def start_watching(self, interval: float):
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self.watch(interval))
+
+    def stop_watching(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._datasets)
+
+
+def _load_brands():
+    from bot.services.brand_service import BrandCatalog, BrandService
+    catalog = BrandCatalog(BrandService._load_brands_from_file())
+    catalog.build_fuzzy_index()
+    return catalog
+
+
+def _load_cities():
+    from bot.services.location_service import CityGazetteer, LocationService
+    gazetteer = CityGazetteer(LocationService._parse_cities_xml())
+    gazetteer.build_fuzzy_index()
+    return gazetteer
+
+
+def _load_materials():
+    from bot.services.material_service import MaterialService
+    return MaterialService._load_catalog()
+
+
+def _get_metro_data_path() -> str:
+    from bot.services import metro_data
+    return metro_data.__file__
+
+
+def _load_metro():
+    # Исполняем файл заново, не трогая уже импортированный модуль
+    return runpy.run_path(_get_metro_data_path())['METRO_CITIES']
+
+
+def _swap_metro(metro_cities: dict):
+    from bot.services import metro_data
+    metro_data.METRO_CITIES = metro_cities
+
+
+def _get_builder_paths(*modules: str) -> List[str]:
+    services_dir = os.path.dirname(os.path.abspath(__file__))
+    return [os.path.join(services_dir, module) for module in modules]
+
+
+def _get_config_path() -> str:
+    return config.__file__
+
+
+def _load_categories():
+    # Берем из config.py только категории - остальные настройки не меняются
+    from bot.services.category_service import CategoryIndex
+    namespace = runpy.run_path(_get_config_path())
+    return CategoryIndex(namespace['AVITO_CATEGORIES'], namespace['CATEGORY_IDS'])
+
+
+def _swap_categories(index):
+    config.AVITO_CATEGORIES = index.categories
+    config.AVITO_CONFIG['categories'] = index.categories
+    config.CATEGORY_IDS = index.category_ids
+    config.AVITO_CONFIG['category_ids'] = index.category_ids
+
+
+def _create_registry() -> ReferenceDataRegistry:
+    registry = ReferenceDataRegistry()
+    registry.register('brands', _load_brands, ['brands.xml'],
+                      builders=_get_builder_paths('brand_service.py', 'fuzzy_search.py'))
+    registry.register('cities', _load_cities, ['cities.xml'],
+                      builders=_get_builder_paths('location_service.py', 'fuzzy_search.py'))
+    registry.register('materials', _load_materials, ['materials.xml'],
+                      builders=_get_builder_paths('material_service.py'))
+    registry.register('metro', _load_metro, [_get_metro_data_path()], on_swap=_swap_metro)
+    registry.register('categories', _load_categories, [_get_config_path()], on_swap=_swap_categories,
+                      builders=_get_builder_paths('category_service.py'))
+
+    if config.REFERENCE_SNAPSHOT_FILE:
+        from bot.services.reference_snapshot import ReferenceSnapshot
+        registry.use_snapshot(ReferenceSnapshot(config.REFERENCE_SNAPSHOT_FILE, config.REFERENCE_SNAPSHOT_MMAP))
+
+    return registry
+
+
+# Глобальный реестр справочников
+reference_data = _create_registry()
@@ -0,0 +1,197 @@
+# bot/services/reference_snapshot.py
+"""
+Бинарный снимок справочников для быстрого старта.
+
+Сборка (после изменения brands.xml, cities.xml и т.п.):
+    python -m bot.services.reference_snapshot
+
+Формат файла: MAGIC, длина заголовка (8 байт), заголовок (pickle) и затем
+отдельные pickle-блоки готовых структур каждого справочника. В заголовке для
+каждого набора хранятся sha256 исходных файлов и модулей, которые его строят:
+если изменились данные или классы справочника, набор строится из исходников,
+а его блок в снимке пересобирается.
+
+Снимок собирается локально и читается через pickle - не подкладывайте
+файлы из недоверенных источников.
+"""
+import gc
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+MAGIC = b"AVXSNAP1"
+# Меняется при несовместимых изменениях формата или классов справочников
+SNAPSHOT_FORMAT_VERSION = 3
+
+
+def hash_sources(paths: List[str]) -> List[Optional[str]]:
+    """sha256 исходных файлов (None для отсутствующих)"""
+    hashes = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                hashes.append(hashlib.sha256(f.read()).hexdigest())
+        except OSError:
+            hashes.append(None)
+    return hashes
+
+
+def _get_runtime_tag() -> str:
+    return f"{SNAPSHOT_FORMAT_VERSION}:{sys.version_info.major}.{sys.version_info.minor}"
+
+
+class ReferenceSnapshot:
+    """Чтение снимка: заголовок сразу, блоки справочников - по требованию"""
+
+    def __init__(self, path: str, use_mmap: bool = True):
+        self.path = path
+        self.use_mmap = use_mmap
+        self._data = None
+        self._file = None
+        self._header: Optional[Dict[str, Any]] = None
+        # Файл снимка есть, но устарел или поврежден - его нужно пересобрать
+        self.invalid = False
+
+    def open(self) -> bool:
+        """Открывает снимок; False, если файла нет или он несовместим"""
+        if self._header is not None:
+            return True
+        if self.invalid:
+            return False
+
+        try:
+            self._file = open(self.path, 'rb')
+            if self.use_mmap:
+                self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                # Один вызов read на весь файл
+                self._data = self._file.read()
+                self._file.close()
+                self._file = None
+
+            if self._data[:len(MAGIC)] != MAGIC:
+                raise ValueError("неизвестный формат")
+
+            start = len(MAGIC) + 8
+            (header_length,) = struct.unpack('<Q', self._data[len(MAGIC):start])
+            header = pickle.loads(self._data[start:start + header_length])
+
+            if header.get('runtime') != _get_runtime_tag():
+                raise ValueError("снимок собран другой версией")
+
+            header['data_offset'] = start + header_length
+            self._header = header
+            return True
+
+        except FileNotFoundError:
+            self.close()
+            return False
+        except Exception as e:
+            print(f"⚠️ Снимок справочников {self.path} не используется: {e}")
+            self.close()
+            self.invalid = True
+            return False
+
+    def get(self, name: str, sources: List[str]) -> Optional[Any]:
+        """Готовая структура справочника, если исходные файлы и модули не менялись"""
+        if not self.open():
+            return None
+
+        entry = self._header['datasets'].get(name)
+        if entry is None or entry['hashes'] != hash_sources(sources):
+            self.invalid = True
+            return None
+
+        offset = self._header['data_offset'] + entry['offset']
+        # Сборщик мусора на десятках тысяч новых объектов только тратит время
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return pickle.loads(self._data[offset:offset + entry['length']])
+        except Exception as e:
+            print(f"⚠️ Не удалось прочитать '{name}' из снимка: {e}")
+            self.invalid = True
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def store(self, name: str, sources: List[str], value: Any):
+        """Пересобирает блок одного справочника, сохраняя актуальные блоки остальных"""
+        blobs = {}
+        if self.open():
+            data_offset = self._header['data_offset']
+            for other, entry in self._header['datasets'].items():
+                if other != name:
+                    start = data_offset + entry['offset']
+                    blobs[other] = (entry['hashes'], bytes(self._data[start:start + entry['length']]))
+        blobs[name] = (hash_sources(sources), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+        # Старый mmap остается на прежнем inode, os.replace его не затрагивает
+        self.close()
+        _write_snapshot(self.path, blobs)
+        self.invalid = False
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._header = None
+
+
+def _write_snapshot(path: str, blobs: Dict[str, Tuple[List[Optional[str]], bytes]]):
+    """Атомарно записывает снимок из готовых блоков {имя: (хэши, pickle)}"""
+    datasets = {}
+    offset = 0
+    for name, (hashes, blob) in blobs.items():
+        datasets[name] = {'hashes': hashes, 'offset': offset, 'length': len(blob)}
+        offset += len(blob)
+
+    header = pickle.dumps({'runtime': _get_runtime_tag(), 'datasets': datasets},
+                          protocol=pickle.HIGHEST_PROTOCOL)
+
+    # Свой временный файл у каждого процесса (при BOT_WORKERS > 1 снимок могут пересобирать несколько)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for _, blob in blobs.values():
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+
+def build_snapshot(registry, path: str) -> Dict[str, int]:
+    """Собирает снимок всех справочников реестра; возвращает размеры блоков"""
+    blobs = {}
+
+    for name in registry.names:
+        dataset = registry.get_dataset(name)
+        # Строим из исходников, а не из текущего снимка
+        value = dataset.loader()
+        blobs[name] = (hash_sources(dataset.snapshot_sources),
+                       pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    _write_snapshot(path, blobs)
+    return {name: len(blob) for name, (_, blob) in blobs.items()}
+
+
+def main():
+    import config
+    from bot.services.reference_data import reference_data
+
+    sizes = build_snapshot(reference_data, config.REFERENCE_SNAPSHOT_FILE)
+    for name, size in sizes.items():
+        print(f"📦 {name}: {size / 1024:.0f} КБ")
+    print(f"✅ Снимок справочников сохранен в {config.REFERENCE_SNAPSHOT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
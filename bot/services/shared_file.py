@@ -0,0 +1,60 @@
+# bot/services/shared_file.py
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path: str):
+    """Межпроцессная блокировка на файле path + '.lock'"""
+    with open(path + '.lock', 'a+b') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            # Блокирующий вариант повторяет попытку 10 раз; ждем дольше сами
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def update_json_file(path: str, update: Callable[[Any], Any], default: Any = None, indent: int = None) -> Any:
+    """
+    Чтение-изменение-запись JSON файла под блокировкой, чтобы несколько
+    процессов не затирали изменения друг друга. Запись атомарная.
+    """
+    with file_lock(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                current = json.load(f)
+        except FileNotFoundError:
+            current = default
+        except ValueError as e:
+            print(f"⚠️ Файл {path} поврежден и будет перезаписан: {e}")
+            current = default
+
+        data = update(current)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+        os.replace(tmp_path, path)
+        return data
@@ -0,0 +1,91 @@
+# bot/services/update_replay.py
+"""
+Отправка записанных обновлений Telegram на локальный вебхук.
+
+    python -m bot.services.update_replay updates.jsonl --concurrency 10
+
+Файл - JSON Lines (одно обновление в строке), JSON-массив или сохраненный
+ответ getUpdates ({"ok": true, "result": [...]}).
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import aiohttp
+
+import config
+
+
+def load_updates(path: str) -> List[Dict]:
+    """Читает записанные обновления"""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read().strip()
+
+    if not content:
+        return []
+
+    if content[0] in '[{':
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict) and 'result' in data:
+            return data['result']
+        if isinstance(data, list):
+            return data
+        if isinstance(data, dict):
+            return [data]
+
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+async def post_updates(url: str, updates: List[Dict], secret_token: str = '',
+                       concurrency: int = 1) -> Dict[str, float]:
+    """Отправляет обновления на вебхук; возвращает статистику"""
+    headers = {'X-Telegram-Bot-Api-Secret-Token': secret_token} if secret_token else {}
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = 0
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async def post(update: Dict):
+            nonlocal failed
+            async with semaphore:
+                try:
+                    async with session.post(url, json=update) as response:
+                        if response.status != 200:
+                            failed += 1
+                except aiohttp.ClientError:
+                    failed += 1
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(post(update) for update in updates))
+        elapsed = time.perf_counter() - started_at
+
+    return {
+        'sent': len(updates),
+        'failed': failed,
+        'elapsed': elapsed,
+        'rps': len(updates) / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Отправка записанных обновлений на вебхук")
+    parser.add_argument('path', help="файл с обновлениями")
+    parser.add_argument('--url', default=f"http://127.0.0.1:{config.WEBHOOK_PORT}{config.WEBHOOK_PATH}")
+    parser.add_argument('--secret', default=config.WEBHOOK_SECRET)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=1, help="сколько раз повторить набор")
+    args = parser.parse_args()
+
+    updates = load_updates(args.path) * args.repeat
+    stats = asyncio.run(post_updates(args.url, updates, args.secret, args.concurrency))
+
+    print(f"📤 Отправлено: {stats['sent']}, ошибок: {stats['failed']}")
+    print(f"⏱️ {stats['elapsed']:.2f} с, {stats['rps']:.0f} обновлений/с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# bot/services/user_state_cache.py
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+import config
+
+# Отличает "в кэше нет записи" от закэшированного None (у пользователя нет состояния)
+MISSING = object()
+
+
+class UserStateCache:
+    """LRU кэш состояний пользователей со сроком жизни записей"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key: Hashable) -> Any:
+        """Значение из кэша или MISSING"""
+        item = self._items.get(key)
+        if item is not None:
+            value, expires_at = item
+            if expires_at > time.monotonic():
+                self._items.move_to_end(key)
+                self.stats['hits'] += 1
+                return value
+            del self._items[key]
+
+        self.stats['misses'] += 1
+        return MISSING
+
+    def put(self, key: Hashable, value: Any):
+        """Записывает значение (в том числе None), вытесняя самые старые записи"""
+        if self.max_size <= 0:
+            return
+
+        self._items[key] = (value, time.monotonic() + self.ttl)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def invalidate(self, key: Hashable):
+        self._items.pop(key, None)
+
+    def clear(self):
+        self._items.clear()
+
+    async def get_or_load(self, key: Hashable, load: Callable[[Hashable], Awaitable[Any]]) -> Any:
+        """Значение из кэша, а при промахе - из load(key) с сохранением в кэш"""
+        value = self.get(key)
+        if value is MISSING:
+            value = await load(key)
+            self.put(key, value)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# Глобальный экземпляр кэша состояний
+user_state_cache = UserStateCache(config.USER_STATE_CACHE_SIZE, config.USER_STATE_CACHE_TTL)
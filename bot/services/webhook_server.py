@@ -0,0 +1,89 @@
+# bot/services/webhook_server.py
+import asyncio
+from typing import Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+# Сколько ждать обработки уже принятых обновлений при остановке
+SHUTDOWN_TIMEOUT = 10.0
+
+
+class BackgroundRequestHandler(SimpleRequestHandler):
+    """
+    Отвечает Telegram сразу, обновление обрабатывается в фоновой задаче.
+    При остановке дожидается принятых обновлений, чтобы не потерять их.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, secret_token: Optional[str] = None):
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, secret_token=secret_token)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._background_feed_update_tasks)
+
+    async def close(self):
+        pending = set(self._background_feed_update_tasks)
+        if pending:
+            print(f"⏳ Ожидаем обработки {len(pending)} обновлений...")
+            await asyncio.wait(pending, timeout=SHUTDOWN_TIMEOUT)
+        await super().close()
+
+
+class WebhookServer:
+    """aiohttp сервер, принимающий обновления Telegram через вебхук"""
+
+    def __init__(self, bot: Bot, dp: Dispatcher, host: str, port: int, path: str,
+                 secret_token: str = '', base_url: str = ''):
+        self.bot = bot
+        self.dp = dp
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.base_url = base_url
+        self._runner: Optional[web.AppRunner] = None
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        handler = BackgroundRequestHandler(self.dp, self.bot, secret_token=self.secret_token or None)
+        handler.register(app, path=self.path)
+        # startup/shutdown диспетчера (закрытие сессий сервисов и т.п.) - вместе с приложением
+        setup_application(app, self.dp, bot=self.bot)
+        return app
+
+    @property
+    def webhook_url(self) -> str:
+        return self.base_url.rstrip('/') + self.path
+
+    async def start(self):
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        print(f"🌐 Вебхук принимает обновления на http://{self.host}:{self.port}{self.path}")
+
+        if self.base_url:
+            await self.bot.set_webhook(
+                url=self.webhook_url,
+                secret_token=self.secret_token or None,
+                allowed_updates=self.dp.resolve_used_update_types(),
+                drop_pending_updates=True
+            )
+            print(f"✅ Вебхук зарегистрирован: {self.webhook_url}")
+        else:
+            print("⚠️ WEBHOOK_BASE_URL не задан - вебхук в Telegram не регистрируется (локальный режим)")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def serve_forever(self):
+        """Запускает сервер и работает до отмены задачи"""
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
@@ -0,0 +1,238 @@
+# bot/sharding.py
+"""
+Работа бота в несколько процессов (BOT_WORKERS > 1).
+
+Один процесс принимает обновления (long polling или вебхук) и раздает их
+процессам-обработчикам по hash(user_id): все обновления пользователя
+попадают в один и тот же процесс и обрабатываются по очереди, поэтому FSM
+(MemoryStorage) и порядок шагов мастера сохраняются. Каждый обработчик
+хранит в памяти только своих пользователей, а общие файлы (bot_data.json,
+кэш геокодера, индекс изображений) пишет через shared_file.update_json_file.
+"""
+import asyncio
+import multiprocessing
+import secrets
+import zlib
+from typing import Dict, List, Optional
+
+from aiogram.methods import TelegramMethod
+
+# Ключи обновления, не являющиеся событиями
+_SERVICE_KEYS = ('update_id',)
+
+
+def get_update_user_id(update: Dict) -> Optional[int]:
+    """ID пользователя (или чата), от которого пришло обновление"""
+    for key, event in update.items():
+        if key in _SERVICE_KEYS or not isinstance(event, dict):
+            continue
+        user = event.get('from') or event.get('user')
+        if user:
+            return user['id']
+        chat = event.get('chat')
+        if chat:
+            return chat['id']
+    return None
+
+
+def shard_for_user(user_id: Optional[int], shard_count: int) -> int:
+    """Номер шарда пользователя; одинаков во всех процессах и между запусками"""
+    if user_id is None or shard_count <= 1:
+        return 0
+    return zlib.crc32(str(user_id).encode()) % shard_count
+
+
+class ShardWorker:
+    """Процесс-обработчик: свой Dispatcher, обновления одного пользователя - строго по очереди"""
+
+    def __init__(self, shard_index: int, shard_count: int, queue, events=None):
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.queue = queue
+        # Необязательная очередь событий ('ready' / 'done') для замеров
+        self.events = events
+        self._user_tails: Dict[Optional[int], asyncio.Task] = {}
+
+    async def run(self):
+        import config
+        from bot.database import db
+        from bot.services.reference_data import reference_data
+        from main import create_bot, create_dispatcher, start_metrics_server
+
+        db.use_shard(self.shard_index, self.shard_count)
+        await db.create_pool()
+
+        await reference_data.reload()
+        if config.REFERENCE_DATA_WATCH_INTERVAL > 0:
+            reference_data.start_watching(config.REFERENCE_DATA_WATCH_INTERVAL)
+
+        bot = create_bot()
+        dp = create_dispatcher(bot)
+        # У каждого обработчика свои метрики: порт METRICS_PORT + 1 + номер шарда
+        metrics_server = await start_metrics_server(config.METRICS_PORT + 1 + self.shard_index)
+        await dp.emit_startup(bot=bot)
+        print(f"👷 Обработчик {self.shard_index + 1}/{self.shard_count} запущен")
+        self._notify('ready')
+
+        try:
+            while True:
+                update = await asyncio.to_thread(self.queue.get)
+                if update is None:
+                    break
+                self._schedule(bot, dp, update)
+
+            # Дорабатываем принятые обновления
+            pending = list(self._user_tails.values())
+            if pending:
+                await asyncio.wait(pending)
+        finally:
+            reference_data.stop_watching()
+            await dp.emit_shutdown(bot=bot)
+            await db.close()
+            await bot.session.close()
+
+            if metrics_server is not None:
+                await metrics_server.stop()
+
+            if config.IMAGE_NORMALIZATION_ENABLED:
+                from bot.services.image_pipeline import image_pipeline
+                image_pipeline.shutdown()
+
+    def _schedule(self, bot, dp, update: Dict):
+        user_id = get_update_user_id(update)
+        previous = self._user_tails.get(user_id)
+        task = asyncio.create_task(self._process(bot, dp, update, previous))
+        self._user_tails[user_id] = task
+
+        def forget(finished: asyncio.Task):
+            if self._user_tails.get(user_id) is finished:
+                del self._user_tails[user_id]
+
+        task.add_done_callback(forget)
+
+    async def _process(self, bot, dp, update: Dict, previous: Optional[asyncio.Task]):
+        if previous is not None:
+            # Ждем предыдущее обновление пользователя (его ошибки нас не касаются)
+            await asyncio.wait([previous])
+        try:
+            result = await dp.feed_raw_update(bot, update)
+            if isinstance(result, TelegramMethod):
+                await dp.silent_call_request(bot, result)
+        except Exception as e:
+            print(f"❌ Ошибка обработки обновления {update.get('update_id')}: {e}")
+        finally:
+            self._notify('done')
+
+    def _notify(self, event: str):
+        if self.events is not None:
+            self.events.put((event, self.shard_index))
+
+
+def run_worker(shard_index: int, shard_count: int, queue, events=None):
+    """Точка входа процесса-обработчика"""
+    try:
+        asyncio.run(ShardWorker(shard_index, shard_count, queue, events).run())
+    except KeyboardInterrupt:
+        pass
+
+
+class ShardedRuntime:
+    """Прием обновлений в этом процессе и раздача их процессам-обработчикам"""
+
+    # Сколько ждать завершения обработчиков при остановке
+    STOP_TIMEOUT = 30.0
+
+    def __init__(self, worker_count: int, events=None):
+        self.worker_count = worker_count
+        self.events = events
+        # spawn - одинаково на Linux и Windows, обработчики не наследуют состояние приема
+        self._context = multiprocessing.get_context('spawn')
+        self.queues = [self._context.Queue() for _ in range(worker_count)]
+        self.processes: List[multiprocessing.Process] = []
+
+    def start_workers(self):
+        for index, queue in enumerate(self.queues):
+            process = self._context.Process(
+                target=run_worker,
+                args=(index, self.worker_count, queue, self.events),
+                name=f"bot-worker-{index}"
+            )
+            process.start()
+            self.processes.append(process)
+
+    def dispatch(self, update: Dict):
+        """Передает обновление обработчику шарда его пользователя"""
+        shard = shard_for_user(get_update_user_id(update), self.worker_count)
+        self.queues[shard].put(update)
+
+    async def stop_workers(self):
+        for queue in self.queues:
+            queue.put(None)
+
+        for process in self.processes:
+            await asyncio.to_thread(process.join, self.STOP_TIMEOUT)
+            if process.is_alive():
+                print(f"⚠️ Обработчик {process.name} не завершился, останавливаем принудительно")
+                process.terminate()
+        self.processes = []
+
+    async def run_polling(self, bot, timeout: int = 30):
+        """Long polling: сырые обновления getUpdates сразу уходят обработчикам"""
+        import aiohttp
+
+        await bot.delete_webhook(drop_pending_updates=True)
+        url = bot.session.api.api_url(token=bot.token, method='getUpdates')
+        offset = None
+        retry_delay = 1.0
+
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout + 10)) as session:
+            while True:
+                try:
+                    params = {'timeout': timeout}
+                    if offset is not None:
+                        params['offset'] = offset
+                    async with session.get(url, params=params) as response:
+                        data = await response.json()
+
+                    if not data.get('ok'):
+                        raise RuntimeError(data.get('description', 'getUpdates failed'))
+
+                    for update in data['result']:
+                        self.dispatch(update)
+                        offset = update['update_id'] + 1
+                    retry_delay = 1.0
+
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"⚠️ Ошибка получения обновлений: {e}; повтор через {retry_delay:.0f} с")
+                    await asyncio.sleep(retry_delay)
+                    retry_delay = min(retry_delay * 2, 30.0)
+
+    async def run_webhook(self, bot, host: str, port: int, path: str, secret_token: str = '', base_url: str = ''):
+        """Вебхук: отвечаем Telegram сразу после передачи обновления обработчику"""
+        from aiohttp import web
+
+        async def handle(request: web.Request) -> web.Response:
+            if secret_token and not secrets.compare_digest(
+                    request.headers.get('X-Telegram-Bot-Api-Secret-Token', ''), secret_token):
+                return web.Response(body="Unauthorized", status=401)
+            self.dispatch(await request.json())
+            return web.json_response({})
+
+        app = web.Application()
+        app.router.add_post(path, handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, host, port).start()
+            print(f"🌐 Вебхук принимает обновления на http://{host}:{port}{path}")
+
+            if base_url:
+                webhook_url = base_url.rstrip('/') + path
+                await bot.set_webhook(url=webhook_url, secret_token=secret_token or None, drop_pending_updates=True)
+                print(f"✅ Вебхук зарегистрирован: {webhook_url}")
+
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
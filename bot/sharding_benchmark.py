@@ -0,0 +1,147 @@
+# bot/sharding_benchmark.py
+"""
+Замер пропускной способности в зависимости от числа процессов-обработчиков.
+
+    python -m bot.sharding_benchmark --workers 1 2 4
+    python -m bot.sharding_benchmark --updates updates.jsonl --workers 1 4
+
+Обновления (записанные или сгенерированные) подаются прямо в очереди
+ShardedRuntime, ответы Bot API отдает локальная заглушка в отдельном
+процессе. База данных пишется во временный файл.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+from typing import Dict, List
+
+# Методы Bot API, которые возвращают True, а не сообщение
+_BOOLEAN_METHODS = {
+    'answercallbackquery', 'deletemessage', 'deletewebhook', 'setwebhook',
+    'sendchataction', 'setmycommands', 'deletemessages'
+}
+
+
+def _run_fake_api(port: int):
+    """Заглушка Bot API: на любой метод отвечает успехом"""
+    from aiohttp import web
+
+    async def handle(request: web.Request) -> web.Response:
+        method = request.match_info['method'].lower()
+        if method in _BOOLEAN_METHODS:
+            return web.json_response({'ok': True, 'result': True})
+        if method == 'getme':
+            return web.json_response({'ok': True, 'result': {
+                'id': 1, 'is_bot': True, 'first_name': 'bench', 'username': 'bench_bot'
+            }})
+        return web.json_response({'ok': True, 'result': {
+            'message_id': 1, 'date': int(time.time()), 'chat': {'id': 1, 'type': 'private'}, 'text': ''
+        }})
+
+    app = web.Application()
+    app.router.add_post('/bot{token}/{method}', handle)
+    web.run_app(app, host='127.0.0.1', port=port, print=None)
+
+
+def _get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def generate_updates(count: int, users: int) -> List[Dict]:
+    """Команды мастера от users разных пользователей"""
+    commands = ['/start', '/help', '/new_product', '/about']
+    updates = []
+    for update_id in range(count):
+        user_id = 100000 + update_id % users
+        updates.append({
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': {'id': user_id, 'is_bot': False, 'first_name': f'Seller{user_id}'},
+                'text': commands[update_id % len(commands)],
+                'entities': [{'type': 'bot_command', 'offset': 0,
+                              'length': len(commands[update_id % len(commands)])}]
+            }
+        })
+    return updates
+
+
+def _wait_events(events, event: str, count: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    received = 0
+    while received < count:
+        name, _ = events.get(timeout=max(0.1, deadline - time.monotonic()))
+        if name == event:
+            received += 1
+
+
+async def measure(worker_count: int, updates: List[Dict]) -> float:
+    """Обновлений в секунду при worker_count обработчиках"""
+    from bot.sharding import ShardedRuntime
+
+    context = multiprocessing.get_context('spawn')
+    events = context.Queue()
+    runtime = ShardedRuntime(worker_count, events=events)
+    runtime.start_workers()
+    try:
+        # Запуск обработчиков (загрузка справочников) в замер не входит
+        await asyncio.to_thread(_wait_events, events, 'ready', worker_count, 120)
+
+        started_at = time.perf_counter()
+        for update in updates:
+            runtime.dispatch(update)
+        await asyncio.to_thread(_wait_events, events, 'done', len(updates), 600)
+        elapsed = time.perf_counter() - started_at
+    finally:
+        await runtime.stop_workers()
+
+    return len(updates) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пропускная способность по числу обработчиков")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--updates', help="файл с записанными обновлениями (см. update_replay)")
+    parser.add_argument('--count', type=int, default=2000, help="сколько обновлений сгенерировать")
+    parser.add_argument('--users', type=int, default=200, help="сколько разных пользователей")
+    args = parser.parse_args()
+
+    port = _get_free_port()
+    data_dir = tempfile.mkdtemp(prefix='sharding_benchmark_')
+    # Настройки для процессов-обработчиков (spawn читает config заново)
+    os.environ.update({
+        'BOT_TOKEN': '123456:benchmark',
+        'TELEGRAM_API_BASE': f'http://127.0.0.1:{port}',
+        'DATA_FILE': os.path.join(data_dir, 'bot_data.json'),
+        'REFERENCE_DATA_WATCH_INTERVAL': '0',
+    })
+
+    if args.updates:
+        from bot.services.update_replay import load_updates
+        updates = load_updates(args.updates)
+    else:
+        updates = generate_updates(args.count, args.users)
+
+    fake_api = multiprocessing.get_context('spawn').Process(target=_run_fake_api, args=(port,), daemon=True)
+    fake_api.start()
+    time.sleep(1.0)
+
+    try:
+        baseline = None
+        for worker_count in args.workers:
+            rate = asyncio.run(measure(worker_count, updates))
+            baseline = baseline or rate
+            print(f"👷 {worker_count} обработчик(ов): {rate:.0f} обновлений/с (x{rate / baseline:.2f})")
+    finally:
+        fake_api.terminate()
+
+
+if __name__ == "__main__":
+    main()
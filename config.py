@@ -182,4 +182,103 @@ AVITO_CONFIG = {
         'commercial': 'Товар от коммерческого продавца',
         'part': 'Запчасти'
     }
-}
\ No newline at end of file
+}
+
+# Настройки экспорта архива
+# Порог (в байтах), после которого ZIP архив переносится из памяти на диск
+ZIP_SPOOL_MAX_SIZE = int(os.getenv('ZIP_SPOOL_MAX_SIZE', str(32 * 1024 * 1024)))
+
+# Параллельная загрузка изображений при экспорте
+EXPORT_IMAGE_CONCURRENCY = int(os.getenv('EXPORT_IMAGE_CONCURRENCY', '8'))
+
+# Нормализация изображений перед добавлением в архив
+IMAGE_NORMALIZATION_ENABLED = os.getenv('IMAGE_NORMALIZATION_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', '1600'))
+IMAGE_JPEG_QUALITY = int(os.getenv('IMAGE_JPEG_QUALITY', '85'))
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', str(1024 * 1024)))
+IMAGE_PIPELINE_WORKERS = int(os.getenv('IMAGE_PIPELINE_WORKERS', '0')) or None  # None - по числу ядер
+IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+# Повторы и предохранители при скачивании изображений
+IMAGE_DOWNLOAD_TIMEOUT = int(os.getenv('IMAGE_DOWNLOAD_TIMEOUT', '10'))
+IMAGE_DOWNLOAD_ATTEMPTS = int(os.getenv('IMAGE_DOWNLOAD_ATTEMPTS', '3'))
+IMAGE_DOWNLOAD_BACKOFF_BASE = float(os.getenv('IMAGE_DOWNLOAD_BACKOFF_BASE', '0.5'))
+IMAGE_DOWNLOAD_BACKOFF_MAX = float(os.getenv('IMAGE_DOWNLOAD_BACKOFF_MAX', '8'))
+IMAGE_BREAKER_FAILURE_THRESHOLD = int(os.getenv('IMAGE_BREAKER_FAILURE_THRESHOLD', '5'))
+IMAGE_BREAKER_RESET_TIMEOUT = float(os.getenv('IMAGE_BREAKER_RESET_TIMEOUT', '30'))
+IMAGE_DOWNLOAD_CACHE_MAX_BYTES = int(os.getenv('IMAGE_DOWNLOAD_CACHE_MAX_BYTES', str(128 * 1024 * 1024)))
+
+# Адрес Bot API (например, локальный сервер для тестов); пусто - api.telegram.org
+TELEGRAM_API_BASE = os.getenv('TELEGRAM_API_BASE', '')
+
+# Внешний хостинг изображений: в XML попадают ссылки <Image url=...> вместо файлов в архиве
+IMAGE_HOSTING_ENABLED = os.getenv('IMAGE_HOSTING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+IMAGE_HOSTING_DIR = os.getenv('IMAGE_HOSTING_DIR', 'hosted_images')
+IMAGE_HOSTING_BASE_URL = os.getenv('IMAGE_HOSTING_BASE_URL', 'http://127.0.0.1:8081')
+# Соответствие ссылок Telegram и опубликованных файлов - вне раздаваемой папки
+IMAGE_HOSTING_INDEX_FILE = os.getenv('IMAGE_HOSTING_INDEX_FILE', 'hosted_images_index.json')
+# Раздавать IMAGE_HOSTING_DIR встроенным HTTP сервером (если нет nginx и т.п.)
+IMAGE_HOSTING_SERVE = os.getenv('IMAGE_HOSTING_SERVE', 'false').lower() in ('1', 'true', 'yes')
+IMAGE_HOSTING_HOST = os.getenv('IMAGE_HOSTING_HOST', '0.0.0.0')
+IMAGE_HOSTING_PORT = int(os.getenv('IMAGE_HOSTING_PORT', '8081'))
+
+# Геокодер Nominatim: кэш ответов и ограничение частоты на весь бот (политика сервиса - 1 запрос в секунду;
+# при BOT_WORKERS > 1 лимит делится между процессами-обработчиками)
+NOMINATIM_URL = os.getenv('NOMINATIM_URL', 'https://nominatim.openstreetmap.org/search')
+NOMINATIM_USER_AGENT = os.getenv('NOMINATIM_USER_AGENT', 'YourBot/1.0 (your@email.com)')
+NOMINATIM_RATE_LIMIT = float(os.getenv('NOMINATIM_RATE_LIMIT', '1'))
+GEOCODE_CACHE_FILE = os.getenv('GEOCODE_CACHE_FILE', 'geocode_cache.json')
+GEOCODE_CACHE_TTL = int(os.getenv('GEOCODE_CACHE_TTL', str(30 * 24 * 3600)))
+GEOCODE_NEGATIVE_TTL = int(os.getenv('GEOCODE_NEGATIVE_TTL', str(24 * 3600)))
+
+# Администраторы бота (через запятую), например для /reload_data
+ADMIN_IDS = {int(user_id) for user_id in os.getenv('ADMIN_IDS', '').split(',') if user_id.strip()}
+# Проверка изменений справочников (brands.xml, cities.xml, ...) раз в N секунд; 0 - отключено
+REFERENCE_DATA_WATCH_INTERVAL = float(os.getenv('REFERENCE_DATA_WATCH_INTERVAL', '30'))
+# Бинарный снимок справочников (python -m bot.services.reference_snapshot); пусто - не использовать
+REFERENCE_SNAPSHOT_FILE = os.getenv('REFERENCE_SNAPSHOT_FILE', 'reference_data.snapshot')
+REFERENCE_SNAPSHOT_MMAP = os.getenv('REFERENCE_SNAPSHOT_MMAP', 'true').lower() in ('1', 'true', 'yes')
+
+# Получение обновлений: 'polling' (long polling) или 'webhook' (aiohttp сервер)
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+# Публичный адрес (https://example.com) для setWebhook; пусто - вебхук не регистрируется (локальная отладка)
+WEBHOOK_BASE_URL = os.getenv('WEBHOOK_BASE_URL', '')
+# Заголовок X-Telegram-Bot-Api-Secret-Token; запросы без него отклоняются
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+# Процессы-обработчики: обновления распределяются по hash(user_id); 1 - все в одном процессе
+BOT_WORKERS = int(os.getenv('BOT_WORKERS', '1'))
+# Файловая база данных (общая для всех процессов-обработчиков)
+DATA_FILE = os.getenv('DATA_FILE', 'bot_data.json')
+
+# Очередь исходящих запросов к Bot API (лимиты Telegram: ~30 сообщений/с на бота, ~1/с в чат)
+OUTBOUND_QUEUE_ENABLED = os.getenv('OUTBOUND_QUEUE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+OUTBOUND_GLOBAL_RATE = float(os.getenv('OUTBOUND_GLOBAL_RATE', '30'))
+OUTBOUND_CHAT_RATE = float(os.getenv('OUTBOUND_CHAT_RATE', '1'))
+OUTBOUND_CHAT_BURST = float(os.getenv('OUTBOUND_CHAT_BURST', '3'))
+OUTBOUND_MAX_RETRIES = int(os.getenv('OUTBOUND_MAX_RETRIES', '3'))
+
+# Сбор альбомов: пауза после последнего фото, предельное ожидание, лимиты альбомов и фото в сборе, срок жизни
+ALBUM_LATENCY = float(os.getenv('ALBUM_LATENCY', '0.5'))
+ALBUM_MAX_WAIT = float(os.getenv('ALBUM_MAX_WAIT', '5'))
+ALBUM_MAX_PENDING = int(os.getenv('ALBUM_MAX_PENDING', '1000'))
+ALBUM_MAX_PHOTOS = int(os.getenv('ALBUM_MAX_PHOTOS', '5000'))
+ALBUM_TTL = float(os.getenv('ALBUM_TTL', '60'))
+
+# Кэш состояний пользователей перед базой данных (записей, секунд)
+USER_STATE_CACHE_SIZE = int(os.getenv('USER_STATE_CACHE_SIZE', '10000'))
+USER_STATE_CACHE_TTL = float(os.getenv('USER_STATE_CACHE_TTL', '300'))
+
+# Метрики Prometheus на http://METRICS_HOST:METRICS_PORT/metrics
+# (при BOT_WORKERS > 1 - у каждого обработчика свой порт: METRICS_PORT + 1 + номер)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))
+
+# Трассировка этапов экспорта: JSON строка на экспорт в EXPORT_TRACE_FILE и,
+# если задан EXPORT_TRACE_PROFILE_DIR, профиль "folded stacks" для flamegraph
+EXPORT_TRACE_ENABLED = os.getenv('EXPORT_TRACE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+EXPORT_TRACE_FILE = os.getenv('EXPORT_TRACE_FILE', 'export_traces.jsonl')
+EXPORT_TRACE_PROFILE_DIR = os.getenv('EXPORT_TRACE_PROFILE_DIR', '')
@@ -7,7 +7,7 @@ from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 
 from bot.database import db  # ✅ Импортируем глобальный экземпляр
-from bot.middleware import AlbumMiddleware  # ✅ Импортируем middleware
+from bot.middleware import AlbumMiddleware, HandlerMetricsMiddleware, UpdateMetricsMiddleware  # ✅ Импортируем middleware
 import config
 from bot.handlers import initialize_handlers
 
@@ -22,33 +22,82 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def main():
-    """Основная функция запуска бота"""
-    try:
-        await db.create_pool()
-        logger.info("File database initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize database: {e}")
-        return
+def create_bot() -> Bot:
+    """Экземпляр бота с настройками из config"""
+    bot_kwargs = {}
+    if config.TELEGRAM_API_BASE:
+        # Локальный Bot API сервер (или тестовая заглушка) вместо api.telegram.org
+        from aiogram.client.session.aiohttp import AiohttpSession
+        from aiogram.client.telegram import TelegramAPIServer
+        bot_kwargs['session'] = AiohttpSession(api=TelegramAPIServer.from_base(config.TELEGRAM_API_BASE))
 
-    # Инициализация бота
     bot = Bot(
         token=config.BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        **bot_kwargs
     )
 
+    if config.OUTBOUND_QUEUE_ENABLED:
+        # Все запросы к Bot API - через общую очередь с лимитами и обработкой 429
+        from bot.services.outbound import OutboundScheduler
+        bot.session.middleware(OutboundScheduler(
+            # Общий лимит бота делится между процессами-обработчиками
+            global_rate=config.OUTBOUND_GLOBAL_RATE / max(1, config.BOT_WORKERS),
+            chat_rate=config.OUTBOUND_CHAT_RATE,
+            chat_burst=config.OUTBOUND_CHAT_BURST,
+            max_retries=config.OUTBOUND_MAX_RETRIES
+        ))
+
+    return bot
+
+
+def create_dispatcher(bot: Bot) -> Dispatcher:
+    """Диспетчер со всеми middleware и роутерами"""
     storage = MemoryStorage()
     dp = Dispatcher(storage=storage)
 
     # ✅ РЕГИСТРИРУЕМ MIDDLEWARE ДО регистрации роутеров
-    dp.message.middleware(AlbumMiddleware(latency=1.0))
+    dp.message.middleware(AlbumMiddleware(
+        latency=config.ALBUM_LATENCY,
+        max_wait=config.ALBUM_MAX_WAIT,
+        max_albums=config.ALBUM_MAX_PENDING,
+        max_photos=config.ALBUM_MAX_PHOTOS,
+        ttl=config.ALBUM_TTL
+    ))
     logger.info("AlbumMiddleware registered")
 
+    if config.METRICS_ENABLED:
+        # Внешний middleware - после FSM, чтобы видеть состояние; внутренние - после сбора альбомов
+        dp.update.outer_middleware(UpdateMetricsMiddleware())
+        handler_metrics = HandlerMetricsMiddleware()
+        dp.message.middleware(handler_metrics)
+        dp.callback_query.middleware(handler_metrics)
+
     routers = initialize_handlers(db, bot)
     for router in routers:
         dp.include_router(router)
 
     logger.info(f"Total routers registered: {len(routers)}")
+    return dp
+
+
+async def main():
+    """Основная функция запуска бота"""
+    if config.BOT_WORKERS > 1:
+        # Здесь только прием обновлений, обработка - в процессах по шардам пользователей
+        await start_sharded(create_bot())
+        return
+
+    try:
+        await db.create_pool()
+        logger.info("File database initialized successfully")
+    except Exception as e:
+        logger.error(f"Failed to initialize database: {e}")
+        return
+
+    # Инициализация бота
+    bot = create_bot()
+    dp = create_dispatcher(bot)
 
     # Запуск бота
     await start_bot(bot, dp)
@@ -66,12 +115,52 @@ async def register_routers(dp: Dispatcher):
         raise
 
 
+async def start_image_server():
+    """Статический сервер для изображений, опубликованных при экспорте (если включен)"""
+    if not (config.IMAGE_HOSTING_ENABLED and config.IMAGE_HOSTING_SERVE):
+        return None
+
+    from bot.services.image_hosting import ImageHostingServer
+    image_server = ImageHostingServer(config.IMAGE_HOSTING_DIR, config.IMAGE_HOSTING_HOST, config.IMAGE_HOSTING_PORT)
+    await image_server.start()
+    return image_server
+
+
+async def start_metrics_server(port: int):
+    """HTTP сервер метрик Prometheus (если включен)"""
+    if not config.METRICS_ENABLED:
+        return None
+
+    from bot.services.metrics import MetricsServer, metrics
+    metrics_server = MetricsServer(metrics, config.METRICS_HOST, port)
+    await metrics_server.start()
+    return metrics_server
+
+
 async def start_bot(bot: Bot, dp: Dispatcher):
     """Запуск бота"""
+    image_server = None
+    metrics_server = None
     try:
-        logger.info("Starting bot...")
-        await bot.delete_webhook(drop_pending_updates=True)
-        await dp.start_polling(bot)
+        image_server = await start_image_server()
+        metrics_server = await start_metrics_server(config.METRICS_PORT)
+
+        # Справочники загружаем заранее и следим за изменением их файлов
+        from bot.services.reference_data import reference_data
+        await reference_data.reload()
+        if config.REFERENCE_DATA_WATCH_INTERVAL > 0:
+            reference_data.start_watching(config.REFERENCE_DATA_WATCH_INTERVAL)
+
+        if config.BOT_MODE == 'webhook':
+            logger.info("Starting bot (webhook)...")
+            from bot.services.webhook_server import WebhookServer
+            webhook_server = WebhookServer(bot, dp, config.WEBHOOK_HOST, config.WEBHOOK_PORT, config.WEBHOOK_PATH,
+                                           secret_token=config.WEBHOOK_SECRET, base_url=config.WEBHOOK_BASE_URL)
+            await webhook_server.serve_forever()
+        else:
+            logger.info("Starting bot (polling)...")
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot)
     except Exception as e:
         logger.error(f"Error starting bot: {e}")
     finally:
@@ -80,6 +169,44 @@ async def start_bot(bot: Bot, dp: Dispatcher):
         await db.close()
         await bot.session.close()
 
+        if image_server is not None:
+            await image_server.stop()
+
+        if metrics_server is not None:
+            await metrics_server.stop()
+
+        if config.IMAGE_NORMALIZATION_ENABLED:
+            from bot.services.image_pipeline import image_pipeline
+            image_pipeline.shutdown()
+
+
+async def start_sharded(bot: Bot):
+    """Прием обновлений (long polling или вебхук) и BOT_WORKERS процессов-обработчиков"""
+    from bot.sharding import ShardedRuntime
+
+    runtime = ShardedRuntime(config.BOT_WORKERS)
+    image_server = None
+    try:
+        image_server = await start_image_server()
+        runtime.start_workers()
+
+        if config.BOT_MODE == 'webhook':
+            logger.info(f"Starting bot (webhook, {config.BOT_WORKERS} workers)...")
+            await runtime.run_webhook(bot, config.WEBHOOK_HOST, config.WEBHOOK_PORT, config.WEBHOOK_PATH,
+                                      secret_token=config.WEBHOOK_SECRET, base_url=config.WEBHOOK_BASE_URL)
+        else:
+            logger.info(f"Starting bot (polling, {config.BOT_WORKERS} workers)...")
+            await runtime.run_polling(bot)
+    except Exception as e:
+        logger.error(f"Error starting bot: {e}")
+    finally:
+        logger.info("Bot stopped")
+        await runtime.stop_workers()
+        await bot.session.close()
+
+        if image_server is not None:
+            await image_server.stop()
+
 
 if __name__ == "__main__":
     try:
@@ -1,11 +1,119 @@
+import asyncio
+import json
+import time
+from typing import Dict, Optional
+
 import aiohttp
-import urllib.parse
+
+import config
+from bot.services.rate_limit import TokenBucket
+from bot.services.shared_file import update_json_file
+
+
+class GeocodeCache:
+    """Постоянный кэш ответов геокодера с TTL, включая отрицательные ответы"""
+
+    def __init__(self, path: str, ttl: float, negative_ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: Optional[Dict[str, dict]] = None
+        self._save_lock = asyncio.Lock()
+
+    @staticmethod
+    def normalize_query(city_name: str) -> str:
+        return ' '.join(city_name.casefold().replace('ё', 'е').split())
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._get_entries().get(key)
+        if entry is None:
+            return None
+        if entry['expires_at'] < time.time():
+            del self._entries[key]
+            return None
+        return entry['result']
+
+    async def put(self, key: str, result: dict):
+        ttl = self.ttl if result.get('valid') else self.negative_ttl
+        self._get_entries()[key] = {'result': result, 'expires_at': time.time() + ttl}
+
+        async with self._save_lock:
+            entries = dict(self._entries)
+            await asyncio.to_thread(self._write, entries)
+
+    def _get_entries(self) -> Dict[str, dict]:
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"⚠️ Не удалось прочитать кэш геокодера: {e}")
+            return {}
+
+        now = time.time()
+        return {key: entry for key, entry in entries.items() if entry.get('expires_at', 0) >= now}
+
+    def _write(self, entries: Dict[str, dict]):
+        # Файл общий для всех процессов бота - дописываем свои записи к чужим
+        def merge(current: Dict[str, dict]) -> Dict[str, dict]:
+            now = time.time()
+            merged = {key: entry for key, entry in (current or {}).items() if entry.get('expires_at', 0) >= now}
+            merged.update(entries)
+            return merged
+
+        update_json_file(self.path, merge, default={})
+
+
+# Общие для всех пользователей кэш, ограничитель частоты и запросы "в полете"
+geocode_cache = GeocodeCache(config.GEOCODE_CACHE_FILE, config.GEOCODE_CACHE_TTL, config.GEOCODE_NEGATIVE_TTL)
+# У каждого процесса-обработчика свой ограничитель - общий лимит делится между ними (BOT_WORKERS)
+nominatim_rate_limiter = TokenBucket(rate=config.NOMINATIM_RATE_LIMIT / max(1, config.BOT_WORKERS), capacity=1)
+_in_flight: Dict[str, asyncio.Future] = {}
 
 
 async def validate_city_nominatim(city_name: str) -> dict:
-    """Проверка города через Nominatim (OpenStreetMap)"""
-    encoded_city = urllib.parse.quote(city_name)
-    url = f"https://nominatim.openstreetmap.org/search"
+    """Проверка города через Nominatim (OpenStreetMap) с кэшем и ограничением частоты"""
+    key = GeocodeCache.normalize_query(city_name)
+
+    cached = geocode_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Такой же запрос уже выполняется - ждем его результат
+    in_flight = _in_flight.get(key)
+    if in_flight is not None:
+        return await asyncio.shield(in_flight)
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[key] = future
+    try:
+        result = await _request_nominatim(city_name)
+        future.set_result(result)
+
+        # Ошибки сети не кэшируем - при следующей попытке сервис может ответить
+        if not result.get('error', '').startswith('Ошибка API'):
+            try:
+                await geocode_cache.put(key, result)
+            except Exception as e:
+                # Город уже найден - без записи в кэш проверка все равно успешна
+                print(f"⚠️ Не удалось сохранить кэш геокодера: {e}")
+        return result
+    finally:
+        _in_flight.pop(key, None)
+        if not future.done():
+            # Запрос отменен - ожидающие тоже получат отмену
+            future.cancel()
+
+
+async def _request_nominatim(city_name: str) -> dict:
+    """Один запрос к Nominatim (не чаще NOMINATIM_RATE_LIMIT в секунду)"""
+    url = config.NOMINATIM_URL
 
     params = {
         'q': f"{city_name}, Россия",
@@ -16,11 +124,13 @@ async def validate_city_nominatim(city_name: str) -> dict:
     }
 
     headers = {
-        'User-Agent': 'YourBot/1.0 (your@email.com)'  # Обязательно укажите User-Agent
+        'User-Agent': config.NOMINATIM_USER_AGENT  # Обязательно укажите User-Agent
     }
 
     try:
-        async with aiohttp.ClientSession() as session:
+        await nominatim_rate_limiter.acquire()
+
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
             async with session.get(url, params=params, headers=headers) as response:
                 if response.status == 200:
                     data = await response.json()
@@ -38,7 +148,11 @@ async def validate_city_nominatim(city_name: str) -> dict:
                         }
                         return {'valid': True, 'data': city_info}
 
-        return {'valid': False, 'error': 'Город не найден'}
+                    # Кэшируется как отрицательный ответ только пустой результат 200
+                    return {'valid': False, 'error': 'Город не найден'}
+
+                # 403 (заблокирован User-Agent), 429, 5xx и т.п. - не ответ о городе
+                return {'valid': False, 'error': f'Ошибка API: HTTP {response.status}'}
 
     except Exception as e:
         return {'valid': False, 'error': f'Ошибка API: {str(e)}'}